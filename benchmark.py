@@ -0,0 +1,328 @@
+"""
+End-to-end latency benchmark for the train query pipeline
+
+Runs sanitize_input -> extract_query_details_async -> AsyncTrainService -> template or
+stream_train_response_async the way VoiceAssistant.process_train_query does, against the
+local stand-in (mock_irctc_server) for both the IRCTC API and OpenAI, and reports
+p50/p95/p99 per stage, to the first spoken sentence, and end to end.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import math
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer
+from typing import Dict, Any, List, Optional
+
+STAGES = ['sanitize', 'extract', 'fetch', 'respond', 'first_sentence', 'total']
+
+SAMPLE_QUERIES = [
+    "Find trains from New Delhi to Mumbai Central tomorrow",
+    "Check PNR status 1234567890",
+    "What is the live running status of train 12952",
+    "Show me the schedule of train 12952",
+    "Fare for train 12952 from New Delhi to Mumbai Central",
+    "Are seats available in 12952 from New Delhi to Mumbai Central",
+    "Which day is best for seats on 12952 from New Delhi to Mumbai Central",
+    "Trains from Howrah to Chennai Central next monday",
+    "Tell me about train 12002"
+]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of values"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(timings: Dict[str, List[float]]) -> Dict[str, Dict[str, float]]:
+    """Count, mean, p50/p95/p99 and max per stage, in milliseconds"""
+    summary = {}
+    for stage in STAGES:
+        values = [t * 1000 for t in timings.get(stage, [])]
+        if not values:
+            continue
+        summary[stage] = {
+            'count': len(values),
+            'mean': round(sum(values) / len(values), 2),
+            'p50': round(percentile(values, 50), 2),
+            'p95': round(percentile(values, 95), 2),
+            'p99': round(percentile(values, 99), 2),
+            'max': round(max(values), 2)
+        }
+    return summary
+
+
+def start_stand_in(latency: str, llm_latency: str, llm_token_ms: float) -> str:
+    """Serve synthetic IRCTC and OpenAI responses on a free local port, return its base URL"""
+    from mock_irctc_server import StandInState, make_handler, parse_latency
+
+    state = StandInState({}, parse_latency(latency), 0.0, 0.0, False, True, parse_latency(llm_latency),
+                         llm_token_ms / 1000)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+async def run_query(query: str, train_service, use_cache: bool, budget_seconds: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Run one query through the pipeline, timing each stage
+    With budget_seconds, stages are cancelled the way VoiceAssistant does and the
+    outcome records which stage fell back
+    """
+    # Imported after the environment points the clients at the stand-in
+    from services.openai_service import extract_query_details_async, query_cache, stream_train_response_async
+    from services.query_router import fetch_train_data
+    from services.response_templates import render_fallback_response, render_template_response
+    from services.date_service import date_cache
+    from services.train_service import response_cache
+    from services.turn_budget import BudgetExceeded, TurnBudget
+    from utils.helpers import sanitize_input
+
+    if not use_cache:
+        response_cache.clear()
+        query_cache.clear()
+        date_cache.clear()
+
+    timings = {}
+    outcome = 'ok'
+    started = time.perf_counter()
+    budget = TurnBudget(budget_seconds if budget_seconds is not None else math.inf)
+
+    stage_start = time.perf_counter()
+    clean_query = sanitize_input(query)
+    timings['sanitize'] = time.perf_counter() - stage_start
+
+    stage_start = time.perf_counter()
+    try:
+        query_details = await budget.run('extract', extract_query_details_async(clean_query), reserve_answer=True)
+    except BudgetExceeded:
+        query_details = {'query_type': 'error'}
+        outcome = 'fallback_extract'
+    timings['extract'] = time.perf_counter() - stage_start
+
+    if outcome != 'ok':
+        pass
+    elif query_details.get('query_type') == 'error':
+        outcome = 'extract_error'
+    else:
+        stage_start = time.perf_counter()
+        try:
+            result = await budget.run('fetch', fetch_train_data(train_service, query_details), reserve_answer=True)
+        except BudgetExceeded:
+            result = None
+            outcome = 'fallback_fetch'
+        timings['fetch'] = time.perf_counter() - stage_start
+
+        if outcome != 'ok':
+            pass
+        elif not result:
+            outcome = 'no_result'
+        elif not result.get('success', False):
+            outcome = 'api_error'
+        else:
+            query_type = query_details.get('query_type')
+            stage_start = time.perf_counter()
+            response = render_template_response(query_type, result, query_details)
+            if response is None:
+                async def stream():
+                    async for _ in stream_train_response_async(result, query_type, clean_query):
+                        timings.setdefault('first_sentence', time.perf_counter() - started)
+                try:
+                    await budget.run('respond', stream())
+                except BudgetExceeded:
+                    outcome = 'fallback_respond'
+                    if 'first_sentence' not in timings:
+                        render_fallback_response(query_type, result, query_details)
+                        timings['first_sentence'] = time.perf_counter() - started
+            else:
+                outcome = 'template'
+                timings['first_sentence'] = time.perf_counter() - started
+            timings['respond'] = time.perf_counter() - stage_start
+
+    timings['total'] = time.perf_counter() - started
+    return {'query': query, 'outcome': outcome, 'timings': timings}
+
+
+async def run_benchmark(queries: List[str], iterations: int, concurrency: int, warmup: int,
+                        use_cache: bool, budget_seconds: Optional[float] = None) -> Dict[str, Any]:
+    """Run every query iterations times with at most concurrency in flight"""
+    from services import llm_metrics, turn_budget
+    from services.async_train_service import AsyncTrainService
+    from services.date_service import date_cache_stats
+    from services.openai_service import query_cache_stats
+    from services.train_service import TrainService
+
+    train_service = AsyncTrainService()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded(query: str) -> Dict[str, Any]:
+        async with semaphore:
+            return await run_query(query, train_service, use_cache, budget_seconds)
+
+    try:
+        for query in queries[:warmup]:
+            await run_query(query, train_service, use_cache)
+
+        llm_metrics.reset()
+        turn_budget.reset_fallback_stats()
+        started = time.perf_counter()
+        runs = await asyncio.gather(*(bounded(q) for _ in range(iterations) for q in queries))
+        elapsed = time.perf_counter() - started
+    finally:
+        await train_service.close()
+
+    timings: Dict[str, List[float]] = {}
+    outcomes: Dict[str, int] = {}
+    for run in runs:
+        outcomes[run['outcome']] = outcomes.get(run['outcome'], 0) + 1
+        for stage, seconds in run['timings'].items():
+            timings.setdefault(stage, []).append(seconds)
+
+    return {
+        'requests': len(runs),
+        'elapsed_seconds': round(elapsed, 3),
+        'throughput_qps': round(len(runs) / elapsed, 2) if elapsed else 0.0,
+        'outcomes': outcomes,
+        'caches': {'query': query_cache_stats(), 'response': TrainService.cache_stats(), 'date': date_cache_stats()},
+        'stages_ms': summarize(timings),
+        'llm': llm_metrics.snapshot(),
+        'turns': turn_budget.fallback_stats()
+    }
+
+
+def compare_runs(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float,
+                 min_delta_ms: float = 1.0) -> List[str]:
+    """
+    Stage percentiles that grew by more than threshold (a fraction) over the baseline
+    Growth under min_delta_ms is ignored so sub-millisecond stages don't flag noise
+    """
+    regressions = []
+    for stage, stats in current['stages_ms'].items():
+        before = baseline.get('stages_ms', {}).get(stage)
+        if not before:
+            continue
+        for key in ('p50', 'p95', 'p99'):
+            grew_by = stats[key] - before[key]
+            if before[key] > 0 and grew_by > before[key] * threshold and grew_by >= min_delta_ms:
+                regressions.append(f"{stage} {key}: {before[key]:.2f}ms -> {stats[key]:.2f}ms "
+                                   f"(+{(stats[key] / before[key] - 1) * 100:.0f}%)")
+    return regressions
+
+
+def print_report(report: Dict[str, Any]):
+    """Print the per-stage table"""
+    print(f"\n{report['requests']} queries in {report['elapsed_seconds']}s "
+          f"({report['throughput_qps']} q/s, concurrency {report['config']['concurrency']})")
+    print(f"Outcomes: {json.dumps(report['outcomes'])}")
+    if report['config'].get('budget_seconds') is not None:
+        turns = report['turns']
+        print(f"Turn budget {report['config']['budget_seconds']}s: fallbacks {json.dumps(turns['fallbacks'])} "
+              f"({turns['fallback_rate'] * 100:.1f}% of turns)")
+    for name, stats in report['caches'].items():
+        print(f"{name.capitalize()} cache: {stats['hits']} hits, {stats['misses']} misses "
+              f"(hit rate {stats['hit_rate'] * 100:.1f}%)")
+    print(f"\n{'stage':<16}{'count':>7}{'mean':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}")
+    for stage, stats in report['stages_ms'].items():
+        print(f"{stage:<16}{stats['count']:>7}{stats['mean']:>10.2f}{stats['p50']:>10.2f}"
+              f"{stats['p95']:>10.2f}{stats['p99']:>10.2f}{stats['max']:>10.2f}")
+    print("(milliseconds)")
+
+    if report.get('llm'):
+        print(f"\n{'llm call':<48}{'calls':>7}{'wall p50':>10}{'wall p95':>10}{'ttft p50':>10}"
+              f"{'prompt':>9}{'compl':>8}{'cost $':>9}")
+        for name, stats in report['llm'].items():
+            ttft = f"{stats['ttft_ms']['p50']:>10.0f}" if stats['ttft_ms']['count'] else f"{'-':>10}"
+            print(f"{name:<48}{stats['calls']:>7}{stats['wall_ms']['p50']:>10.0f}{stats['wall_ms']['p95']:>10.0f}"
+                  f"{ttft}{stats['prompt_tokens']:>9}{stats['completion_tokens']:>8}{stats['cost_usd']:>9.4f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the train query pipeline end to end')
+    parser.add_argument('--queries', help='File with one query per line (default: built-in samples)')
+    parser.add_argument('-n', '--iterations', type=int, default=5, help='Times each query is run')
+    parser.add_argument('-c', '--concurrency', type=int, default=4, help='Queries in flight at once')
+    parser.add_argument('--warmup', type=int, default=2, help='Untimed queries run first')
+    parser.add_argument('--latency', default='lognormal:250,0.5', help='Stand-in IRCTC latency (see mock_irctc_server)')
+    parser.add_argument('--llm-latency', default='lognormal:900,0.4', help='Stand-in OpenAI time to first token')
+    parser.add_argument('--llm-token-ms', type=float, default=25.0, help='Stand-in delay between streamed words')
+    parser.add_argument('--upstream', help='Use an already running stand-in at this URL instead')
+    parser.add_argument('--no-cache', action='store_true', help='Clear the response, query and date caches before every query')
+    parser.add_argument('--budget', type=float, help='Per-turn latency budget in seconds (default: unbounded)')
+    parser.add_argument('-o', '--output', help='Write the results as JSON')
+    parser.add_argument('--compare', help='Baseline JSON from an earlier run')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='Allowed growth per percentile before --compare fails (0.10 = 10%%)')
+    parser.add_argument('--min-delta', type=float, default=1.0,
+                        help='Ignore percentile growth smaller than this many milliseconds')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Keep the pipeline\'s own output')
+    args = parser.parse_args()
+
+    if args.queries:
+        with open(args.queries, 'r', encoding='utf-8') as f:
+            queries = [line.strip() for line in f if line.strip()]
+    else:
+        queries = SAMPLE_QUERIES
+
+    # Point every client at the stand-in before the services are imported
+    base_url = args.upstream.rstrip('/') if args.upstream else start_stand_in(args.latency, args.llm_latency, args.llm_token_ms)
+    os.environ['IRCTC_BASE_URL'] = base_url
+    os.environ['OPENAI_BASE_URL'] = f"{base_url}/v1"
+    os.environ['DEBUG_MODE'] = 'false'
+    os.environ.setdefault('TIMETABLE_DB_PATH', os.path.join(tempfile.mkdtemp(), 'timetable.db'))
+    os.environ.pop('IRCTC_RECORD_DIR', None)
+    os.environ['OPENAI_API_KEY'] = 'stand-in'  # Never send the real key to the stand-in
+
+    output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    with output:
+        report = asyncio.run(run_benchmark(queries, args.iterations, args.concurrency, args.warmup,
+                                           not args.no_cache, args.budget))
+
+    report['config'] = {
+        'upstream': args.upstream or 'in-process stand-in',
+        'latency': None if args.upstream else args.latency,
+        'llm_latency': None if args.upstream else args.llm_latency,
+        'llm_token_ms': None if args.upstream else args.llm_token_ms,
+        'concurrency': args.concurrency,
+        'iterations': args.iterations,
+        'queries': len(queries),
+        'cache': not args.no_cache,
+        'budget_seconds': args.budget,
+        'timestamp': int(time.time())
+    }
+    print_report(report)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved results to {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_runs(report, baseline, args.threshold, args.min_delta)
+        if regressions:
+            print(f"\nRegressions beyond {args.threshold * 100:.0f}% against {args.compare}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nNo regressions beyond {args.threshold * 100:.0f}% against {args.compare}")
+
+if __name__ == "__main__":
+    main()
+
+# Example usage:
+# python benchmark.py -n 10 -c 8 -o baseline.json
+# python benchmark.py -n 10 -c 8 --compare baseline.json --threshold 0.15
+# python benchmark.py --no-cache --latency fixed:300 --llm-latency fixed:0
+# python benchmark.py --budget 2.5 --llm-latency lognormal:1500,0.6
+# python mock_irctc_server.py fixtures --synthetic & python benchmark.py --upstream http://127.0.0.1:8089
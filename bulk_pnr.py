@@ -0,0 +1,35 @@
+import argparse
+import sys
+import time
+from dotenv import load_dotenv
+from services.bulk_pnr_service import run_bulk_check
+from utils.constants import LIMITS
+
+# Load environment variables
+load_dotenv()
+
+def main():
+    parser = argparse.ArgumentParser(description='Check PNR status for a list of PNRs')
+    parser.add_argument('input', nargs='?', default='pnrs.txt', help='File with one PNR per line (- for stdin)')
+    parser.add_argument('-o', '--output', default='pnr_results.jsonl', help='JSONL file to append results to')
+    parser.add_argument('--workers', type=int, default=LIMITS['BULK_MAX_WORKERS'], help='Concurrent lookups')
+    args = parser.parse_args()
+
+    source = sys.stdin if args.input == '-' else args.input
+    start_time = time.time()
+    summary = run_bulk_check(source, args.output, max_workers=args.workers)
+
+    print(f"\nChecked {summary['succeeded'] + summary['failed']} PNRs in {time.time() - start_time:.2f} seconds")
+    print(f"Succeeded: {summary['succeeded']}, failed: {summary['failed']}, "
+          f"invalid: {summary['invalid']}, skipped (already done): {summary['skipped']}")
+    print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\nInterrupted - rerun the same command to resume")
+
+# Example usage:
+# python bulk_pnr.py pnrs.txt -o pnr_results.jsonl
+# cat pnrs.txt | python bulk_pnr.py - --workers 8
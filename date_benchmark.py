@@ -0,0 +1,76 @@
+"""
+Microbenchmark for parse_date_time: the fast path against plain dateparser
+
+Times every sample input through dateparser, the fast path and the memo, and
+reports microseconds per call, the speedup, and the inputs whose parsed date
+differs between dateparser and the fast path.
+"""
+import argparse
+import time
+from typing import Dict, List
+
+from services.date_service import parse_date_time
+
+SAMPLE_DATES = [
+    'today', 'tomorrow', 'day after tomorrow', 'monday', 'next friday', 'this sunday',
+    '2025-02-26', '26-02-2025', '26/02/2025', '26.2.25', '5/3',
+    '25 february', '25th feb 2026', 'march 3rd', '25th', 'on the 12th',
+    'आज', 'कल', 'परसों', 'सोमवार', 'अगले शुक्रवार', '25 फ़रवरी', 'kal', 'agle somvar ko',
+    'in 3 days'
+]
+
+
+def time_parse(date_string: str, iterations: int, use_fast_path: bool, use_cache: bool) -> float:
+    """Microseconds per parse_date_time call"""
+    started = time.perf_counter()
+    for _ in range(iterations):
+        parse_date_time(date_string, use_fast_path=use_fast_path, use_cache=use_cache)
+    return (time.perf_counter() - started) / iterations * 1_000_000
+
+
+def run(samples: List[str], iterations: int) -> List[Dict]:
+    rows = []
+    for sample in samples:
+        fast = parse_date_time(sample)
+        slow = parse_date_time(sample, use_fast_path=False)
+        rows.append({
+            'input': sample,
+            'fast_us': time_parse(sample, iterations, True, False),
+            'cached_us': time_parse(sample, iterations, True, True),
+            'dateparser_us': time_parse(sample, iterations, False, False),
+            'fast_date': fast['formatted']['api_format'] if fast['success'] else '-',
+            'dateparser_date': slow['formatted']['api_format'] if slow['success'] else '-',
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the parse_date_time fast path with dateparser')
+    parser.add_argument('-n', '--iterations', type=int, default=200, help='Calls per input and path')
+    parser.add_argument('dates', nargs='*', help='Inputs to time (default: built-in samples)')
+    args = parser.parse_args()
+
+    # First calls load dateparser's language data; keep that out of the timings
+    parse_date_time('next week', use_fast_path=False)
+
+    rows = run(args.dates or SAMPLE_DATES, args.iterations)
+    print(f"{'input':<22}{'memo us':>9}{'fast us':>10}{'dateparser us':>15}{'speedup':>9}  {'fast':<12}{'dateparser':<12}")
+    for row in rows:
+        print(f"{row['input']:<22}{row['cached_us']:>9.1f}{row['fast_us']:>10.1f}{row['dateparser_us']:>15.1f}"
+              f"{row['dateparser_us'] / row['fast_us']:>8.0f}x  {row['fast_date']:<12}{row['dateparser_date']:<12}")
+
+    fast_total = sum(row['fast_us'] for row in rows)
+    slow_total = sum(row['dateparser_us'] for row in rows)
+    cached_total = sum(row['cached_us'] for row in rows)
+    print(f"\nMean per call: fast path {fast_total / len(rows):.1f}us, dateparser {slow_total / len(rows):.1f}us "
+          f"({slow_total / fast_total:.0f}x faster), memo hit {cached_total / len(rows):.1f}us")
+    differing = [row['input'] for row in rows if row['fast_date'] != row['dateparser_date']]
+    if differing:
+        print(f"Parsed differently (dateparser fails or resolves to another day): {', '.join(differing)}")
+
+if __name__ == "__main__":
+    main()
+
+# Example usage:
+# python date_benchmark.py
+# python date_benchmark.py -n 1000 "next monday" "25 feb"
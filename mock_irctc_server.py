@@ -0,0 +1,352 @@
+"""
+Local stand-in for the IRCTC RapidAPI that replays recorded fixtures
+
+Record fixtures by running anything that uses TrainService with IRCTC_RECORD_DIR set,
+then start this server and point the services at it with IRCTC_BASE_URL.
+
+With --synthetic it serves built-in payloads instead, and POST /v1/chat/completions
+answers like the OpenAI API (point the client at it with OPENAI_BASE_URL), so the whole
+query pipeline can run without any upstream.
+"""
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Any, Optional
+from urllib.parse import urlparse, parse_qsl
+
+from services.api_recorder import load_fixtures
+from services.cache import make_cache_key
+from utils.helpers import extract_station_code
+
+SYNTHETIC_TRAIN = {
+    'train_number': '12952',
+    'train_name': 'MUMBAI RAJDHANI',
+    'from_station_code': 'NDLS',
+    'to_station_code': 'MMCT',
+    'from_std': '16:55',
+    'to_sta': '08:35',
+    'duration': '15:40',
+    'run_days': ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'],
+    'class_type': ['1A', '2A', '3A']
+}
+
+SYNTHETIC_ROUTE = [
+    {'station_code': 'NDLS', 'station_name': 'NEW DELHI', 'sta': '--', 'std': '16:55', 'day': 1},
+    {'station_code': 'KOTA', 'station_name': 'KOTA JN', 'sta': '21:40', 'std': '21:50', 'day': 1},
+    {'station_code': 'BRC', 'station_name': 'VADODARA JN', 'sta': '03:48', 'std': '03:58', 'day': 2},
+    {'station_code': 'MMCT', 'station_name': 'MUMBAI CENTRAL', 'sta': '08:35', 'std': '--', 'day': 2}
+]
+
+# Plausible responses per endpoint for --synthetic runs
+SYNTHETIC_RESPONSES = {
+    'api/v1/searchTrain': {'data': [SYNTHETIC_TRAIN]},
+    'api/v1/searchStation': {'data': [{'code': 'NDLS', 'name': 'New Delhi'}]},
+    'api/v3/trainBetweenStations': {'data': [SYNTHETIC_TRAIN, dict(SYNTHETIC_TRAIN, train_number='12954',
+                                                                   train_name='AUGUST KRANTI RAJ', from_std='17:15',
+                                                                   to_sta='10:05', duration='16:50')]},
+    'api/v1/liveTrainStatus': {'data': {'train_number': '12952', 'current_station_name': 'KOTA JN',
+                                        'status': 'Departed', 'delay': 12, 'eta': '21:52',
+                                        'upcoming_stations': SYNTHETIC_ROUTE[2:]}},
+    'api/v1/getTrainSchedule': {'data': {'train_name': 'MUMBAI RAJDHANI', 'running_days': '1111111',
+                                         'route': SYNTHETIC_ROUTE}},
+    'api/v3/getPNRStatus': {'data': {'Pnr': '1234567890', 'TrainNo': '12952', 'TrainName': 'MUMBAI RAJDHANI',
+                                     'Doj': '25-02-2025', 'From': 'NDLS', 'To': 'MMCT', 'Class': '3A',
+                                     'ChartPrepared': False,
+                                     'PassengerStatus': [{'Number': 1, 'BookingStatus': 'CNF/B2/34',
+                                                          'CurrentStatus': 'CNF/B2/34'},
+                                                         {'Number': 2, 'BookingStatus': 'RLWL/12',
+                                                          'CurrentStatus': 'RLWL/4'}]}},
+    'api/v1/checkSeatAvailability': {'data': [{'date': '25-2-2025', 'current_status': 'AVAILABLE-0042',
+                                               'total_fare': 1785},
+                                              {'date': '26-2-2025', 'current_status': 'RLWL34/WL18',
+                                               'total_fare': 1785}]},
+    'api/v1/getTrainClasses': {'data': ['1A', '2A', '3A']},
+    'api/v2/getFare': {'data': {'general': [{'classType': '3A', 'fare': 1785}, {'classType': '2A', 'fare': 2475},
+                                            {'classType': '1A', 'fare': 4150}]}}
+}
+
+# Canned prose for non-JSON chat completions
+SYNTHETIC_REPLY = ("Train 12952 Mumbai Rajdhani leaves New Delhi at 16:55 and reaches Mumbai Central "
+                   "at 08:35 the next day. Seats are available in 3A for 1785 rupees.")
+
+
+def synthetic_response(endpoint: str, params: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """Built-in payload for endpoint, None when the endpoint is unknown"""
+    body = SYNTHETIC_RESPONSES.get(endpoint)
+    if body is None:
+        return None
+    if endpoint == 'api/v1/checkSeatAvailability' and (params or {}).get('date'):
+        # Report the days from the one asked for, as the real API does
+        try:
+            start = datetime.strptime(params['date'], '%Y-%m-%d')
+        except ValueError:
+            start = None
+        if start:
+            days = []
+            for offset, day in enumerate(body['data']):
+                day_date = start + timedelta(days=offset)
+                days.append(dict(day, date=f"{day_date.day}-{day_date.month}-{day_date.year}"))
+            body = dict(body, data=days)
+    return dict(body, status=True, success=True, message='Success')
+
+
+def fake_extraction(text: str) -> Dict[str, Any]:
+    """Rough stand-in for the LLM's query extraction, driven by keywords and numbers"""
+    lowered = text.lower()
+    pnr = re.search(r'\b\d{10}\b', text)
+    train = re.search(r'\b\d{5}\b', text)
+    route = re.search(r'from\s+([a-z ]+?)\s+to\s+([a-z ]+?)(?:\s+(?:on|for|in|tomorrow|today|next)\b|[?.,]|$)',
+                      lowered)
+    details: Dict[str, Any] = {}
+
+    if pnr:
+        details.update(query_type='pnr_status', pnr_number=pnr.group())
+    elif train and ('live' in lowered or 'running' in lowered):
+        details.update(query_type='live_status', train_number=train.group())
+    elif train and 'schedule' in lowered:
+        details.update(query_type='train_schedule', train_number=train.group())
+    elif train and 'fare' in lowered:
+        details.update(query_type='fare_check', train_number=train.group())
+    elif train and ('best day' in lowered or 'which day' in lowered):
+        details.update(query_type='availability_calendar', train_number=train.group(), travel_date='tomorrow')
+    elif train and 'seat' in lowered:
+        details.update(query_type='seat_availability', train_number=train.group(), class_type='3A',
+                       travel_date='tomorrow')
+    elif route:
+        details.update(query_type='train_search', travel_date='tomorrow')
+    elif train:
+        details.update(query_type='train_search', train_number=train.group())
+    else:
+        details.update(query_type='general')
+
+    if route:
+        details['from_station'] = extract_station_code(route.group(1).strip())
+        details['to_station'] = extract_station_code(route.group(2).strip())
+    return details
+
+
+def fake_completion_text(request: Dict[str, Any]) -> str:
+    """An extraction for JSON-mode requests, canned prose otherwise"""
+    user_text = next((m.get('content', '') for m in reversed(request.get('messages', []))
+                      if m.get('role') == 'user'), '')
+    if (request.get('response_format') or {}).get('type') == 'json_object':
+        return json.dumps(fake_extraction(user_text))
+    return SYNTHETIC_REPLY
+
+
+def fake_chat_completion(request: Dict[str, Any]) -> Dict[str, Any]:
+    """OpenAI-shaped chat completion for a chat completions request body"""
+    content = fake_completion_text(request)
+
+    return {
+        'id': f"chatcmpl-standin-{random.getrandbits(32):08x}",
+        'object': 'chat.completion',
+        'created': int(time.time()),
+        'model': request.get('model', 'stand-in'),
+        'choices': [{'index': 0, 'finish_reason': 'stop',
+                     'message': {'role': 'assistant', 'content': content}}],
+        'usage': fake_usage(request, content)
+    }
+
+
+def fake_usage(request: Dict[str, Any], content: str) -> Dict[str, int]:
+    """Token counts at roughly four characters per token"""
+    prompt_tokens = sum(len(str(m.get('content', ''))) for m in request.get('messages', [])) // 4
+    completion_tokens = len(content) // 4
+    return {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+            'total_tokens': prompt_tokens + completion_tokens}
+
+
+def parse_latency(spec: str) -> Callable[[], float]:
+    """
+    Build a latency sampler (seconds) from a spec in milliseconds:
+    fixed:50, uniform:20,200, normal:120,30 or lognormal:<median>,<sigma>
+    """
+    kind, _, args = spec.partition(':')
+    values = [float(v) for v in args.split(',') if v]
+
+    if kind == 'fixed':
+        return lambda: values[0] / 1000
+    if kind == 'uniform':
+        return lambda: random.uniform(values[0], values[1]) / 1000
+    if kind == 'normal':
+        return lambda: max(0.0, random.gauss(values[0], values[1])) / 1000
+    if kind == 'lognormal':
+        # Median in ms and sigma of the underlying normal, a good fit for API tail latency
+        median, sigma = values
+        return lambda: random.lognormvariate(math.log(median / 1000), sigma)
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+class StandInState:
+    """Fixtures, fault injection settings and request counters shared by all handlers"""
+
+    def __init__(self, fixtures: Dict, latency: Callable[[], float], error_rate: float,
+                 throttle_rate: float, fallback: bool, synthetic: bool = False,
+                 llm_latency: Callable[[], float] = lambda: 0.0, llm_token_delay: float = 0.0):
+        self.fixtures = fixtures
+        self.by_endpoint: Dict[str, Any] = {}
+        for (endpoint, _), response in fixtures.items():
+            self.by_endpoint.setdefault(endpoint, response)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.fallback = fallback
+        self.synthetic = synthetic
+        self.llm_latency = llm_latency
+        self.llm_token_delay = llm_token_delay
+        self.lock = threading.Lock()
+        self.counts = {'requests': 0, 'replayed': 0, 'synthetic': 0, 'missing': 0, 'errors': 0,
+                       'throttled': 0, 'completions': 0}
+
+    def count(self, key: str):
+        with self.lock:
+            self.counts[key] += 1
+
+
+def make_handler(state: StandInState):
+    class StandInHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # Keep-alive, like the real API
+
+        def _send_json(self, status: int, body: Dict[str, Any], headers: Dict[str, str] = None):
+            payload = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            endpoint = url.path.lstrip('/')
+
+            if endpoint == '_stats':
+                with state.lock:
+                    return self._send_json(200, dict(state.counts))
+
+            state.count('requests')
+            time.sleep(state.latency())
+
+            roll = random.random()
+            if roll < state.throttle_rate:
+                state.count('throttled')
+                return self._send_json(429, {'message': 'Too many requests'}, {'Retry-After': '1'})
+            if roll < state.throttle_rate + state.error_rate:
+                state.count('errors')
+                return self._send_json(500, {'status': False, 'message': 'Injected upstream error'})
+
+            params = dict(parse_qsl(url.query))
+            response = state.fixtures.get((endpoint, make_cache_key(endpoint, params)))
+            if response is None and state.fallback:
+                response = state.by_endpoint.get(endpoint)
+            if response is None and state.synthetic:
+                response = synthetic_response(endpoint, params)
+                if response is not None:
+                    state.count('synthetic')
+                    return self._send_json(200, response)
+            if response is None:
+                state.count('missing')
+                return self._send_json(404, {'status': False, 'message': f'No fixture for {endpoint}'})
+
+            state.count('replayed')
+            self._send_json(200, response)
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            body = self.rfile.read(length)
+            if urlparse(self.path).path.rstrip('/') != '/v1/chat/completions':
+                return self._send_json(404, {'error': {'message': f'Unknown path {self.path}'}})
+
+            state.count('completions')
+            request = json.loads(body or b'{}')
+            time.sleep(state.llm_latency())
+            if request.get('stream'):
+                try:
+                    return self._send_completion_stream(request)
+                except (BrokenPipeError, ConnectionResetError):
+                    return  # Client gave up mid-stream, e.g. a cancelled voice turn
+            self._send_json(200, fake_chat_completion(request))
+
+        def _write_chunk(self, text: str):
+            data = text.encode('utf-8')
+            self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+            self.wfile.flush()
+
+        def _send_completion_stream(self, request: Dict[str, Any]):
+            """Server-sent events, one word per chunk, llm_token_delay apart"""
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+
+            base = {'id': f"chatcmpl-standin-{random.getrandbits(32):08x}", 'object': 'chat.completion.chunk',
+                    'created': int(time.time()), 'model': request.get('model', 'stand-in')}
+            content = fake_completion_text(request)
+            for piece in re.findall(r'\S+\s*', content):
+                chunk = dict(base, choices=[{'index': 0, 'delta': {'content': piece}, 'finish_reason': None}])
+                self._write_chunk(f"data: {json.dumps(chunk)}\n\n")
+                time.sleep(state.llm_token_delay)
+            chunk = dict(base, choices=[{'index': 0, 'delta': {}, 'finish_reason': 'stop'}])
+            self._write_chunk(f"data: {json.dumps(chunk)}\n\n")
+            if (request.get('stream_options') or {}).get('include_usage'):
+                chunk = dict(base, choices=[], usage=fake_usage(request, content))
+                self._write_chunk(f"data: {json.dumps(chunk)}\n\n")
+            self._write_chunk("data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+
+        def log_message(self, format, *args):
+            pass
+
+    return StandInHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay recorded IRCTC API fixtures over HTTP')
+    parser.add_argument('fixtures', nargs='?', help='Directory written via IRCTC_RECORD_DIR')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency', default='fixed:0',
+                        help='fixed:MS, uniform:MIN,MAX, normal:MEAN,STD or lognormal:MEDIAN,SIGMA')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with 500')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='Fraction of requests answered with 429')
+    parser.add_argument('--fallback', action='store_true',
+                        help='Serve any fixture of the same endpoint when params do not match exactly')
+    parser.add_argument('--synthetic', action='store_true',
+                        help='Serve built-in payloads for requests without a fixture')
+    parser.add_argument('--llm-latency', default='fixed:0', help='Latency of /v1/chat/completions, same format')
+    parser.add_argument('--llm-token-ms', type=float, default=0.0, help='Delay between streamed completion words')
+    args = parser.parse_args()
+    if not args.fixtures and not args.synthetic:
+        parser.error('a fixtures directory or --synthetic is required')
+
+    fixtures = load_fixtures(args.fixtures) if args.fixtures else {}
+    state = StandInState(fixtures, parse_latency(args.latency), args.error_rate, args.throttle_rate,
+                         args.fallback, args.synthetic, parse_latency(args.llm_latency),
+                         args.llm_token_ms / 1000)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(state))
+
+    print(f"Replaying {len(fixtures)} fixtures on http://{args.host}:{args.port}")
+    print(f"Point the services at it with IRCTC_BASE_URL=http://{args.host}:{args.port}")
+    if args.synthetic:
+        print(f"and the OpenAI client with OPENAI_BASE_URL=http://{args.host}:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\nStopped. Counters: {json.dumps(state.counts)}")
+
+if __name__ == "__main__":
+    main()
+
+# Example usage:
+# IRCTC_RECORD_DIR=fixtures python test_integration.py pnr_status      # record
+# python mock_irctc_server.py fixtures --latency lognormal:250,0.5 --throttle-rate 0.02
+# IRCTC_BASE_URL=http://127.0.0.1:8089 python test_integration.py pnr_status
+# python mock_irctc_server.py --synthetic --llm-latency lognormal:900,0.4   # no fixtures, fake OpenAI too
@@ -7,7 +7,11 @@ import threading
 import time
 import asyncio
 
-from voice_assistant import VoiceAssistant, kill_process_tree
+from voice_assistant import VoiceAssistant, get_elevenlabs_client, kill_process_tree
+from services import llm_metrics, turn_budget, warmup
+from services.date_service import date_cache_stats
+from services.openai_service import query_cache_stats
+from services.train_service import TrainService
 from utils.constants import STATUS_MESSAGES
 
 # Ensure static folder path is absolute
@@ -54,6 +58,22 @@ def index():
         pass
     return send_from_directory(app.static_folder, 'index.html')
 
+@app.route('/health')
+def health():
+    """Readiness of this worker: 503 until the startup warm-up has finished"""
+    status = warmup.readiness()
+    status['status'] = 'ok' if status['ready'] else 'warming'
+    return jsonify(status), 200 if status['ready'] else 503
+
+@app.route('/metrics')
+def metrics():
+    """LLM call histograms and cache counters of this worker"""
+    return jsonify({
+        'llm': llm_metrics.snapshot(),
+        'turns': turn_budget.fallback_stats(),
+        'caches': {'query': query_cache_stats(), 'response': TrainService.cache_stats(), 'date': date_cache_stats()}
+    })
+
 @app.route('/static/<path:path>')
 def serve_static(path):
     return send_from_directory(app.static_folder, path)
@@ -114,6 +134,13 @@ def handle_start_listening():
                         'text': text
                     }, room=session_id)
 
+                @copy_current_request_context
+                def emit_availability(cell):
+                    socketio.emit('availability', cell, room=session_id)
+
+                # Answers are pushed sentence by sentence, calendar cells one by one, through these
+                assistant.set_emitters(emit_transcript, emit_status, emit_availability)
+
                 # Start conversation
                 conversation = assistant.start_conversation()
                 if conversation:
@@ -150,6 +177,10 @@ def cleanup_and_kill():
     finally:
         kill_process_tree()
 
+# Warm up in the process that serves requests, not in werkzeug's reloader parent
+if __name__ != '__main__' or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+    warmup.start_warmup({'elevenlabs_client': get_elevenlabs_client})
+
 if __name__ == '__main__':
     try:
         # Clean start
@@ -0,0 +1,49 @@
+"""Capture live IRCTC API responses as replayable fixtures"""
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from .cache import make_cache_key
+
+
+def fixture_path(directory: str, endpoint: str, params: Dict[str, Any]) -> str:
+    """File a response for endpoint+params is stored under"""
+    digest = hashlib.sha1(make_cache_key(endpoint, params).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(directory, endpoint.replace('/', '_'), f"{digest}.json")
+
+
+def record_response(endpoint: str, params: Dict[str, Any], response: Dict[str, Any],
+                    directory: Optional[str] = None):
+    """Write one fixture; does nothing unless a directory or IRCTC_RECORD_DIR is set"""
+    directory = directory or os.getenv('IRCTC_RECORD_DIR')
+    if not directory:
+        return
+
+    try:
+        path = fixture_path(directory, endpoint, params)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'endpoint': endpoint,
+                'params': params,
+                'recorded_at': int(time.time()),
+                'response': response
+            }, f, ensure_ascii=False, indent=2)
+    except Exception as e:
+        print(f"Fixture recording error: {str(e)}")
+
+
+def load_fixtures(directory: str) -> Dict[Tuple[str, str], Dict[str, Any]]:
+    """Load every fixture under directory, keyed by (endpoint, request key)"""
+    fixtures = {}
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if not name.endswith('.json'):
+                continue
+            with open(os.path.join(root, name), 'r', encoding='utf-8') as f:
+                fixture = json.load(f)
+            key = make_cache_key(fixture['endpoint'], fixture['params'])
+            fixtures[(fixture['endpoint'], key)] = fixture['response']
+    return fixtures
@@ -0,0 +1,169 @@
+"""asyncio version of TrainService for callers running on an event loop"""
+import asyncio
+from typing import Dict, Any, Optional, Union
+
+from .api_recorder import record_response
+from .http_client import get_async_transport
+from .rate_limiter import PRIORITY_INTERACTIVE
+from .train_service import BaseTrainService, ApiCall, TIMETABLE_ENDPOINTS
+
+
+class AsyncTrainService(BaseTrainService):
+    """Same method surface as TrainService, but every call is awaitable and non-blocking"""
+
+    def __init__(self, priority: int = PRIORITY_INTERACTIVE):
+        super().__init__(priority)
+        self.transport = get_async_transport()
+
+    async def _make_request(self, endpoint: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Make a request to the IRCTC API, serving repeats from the response cache
+        Concurrent identical requests, from any event loop, share a single upstream call in the transport
+        """
+        cached = self._get_cached(endpoint, params)
+        if cached is not None:
+            return cached
+
+        try:
+            return await self._fetch(endpoint, params)
+        except Exception as e:
+            print(f"API request error: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
+
+    async def _fetch(self, endpoint: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Call the API, bypassing the response cache, and cache the response"""
+        url = f"{self.base_url}/{endpoint}"
+        result = await self.transport.get_json(url, endpoint, self.headers, params, self.priority)
+        record_response(endpoint, params, result)
+        self._store_cached(endpoint, params, result)
+        if endpoint in TIMETABLE_ENDPOINTS:
+            # Timetable store writes wait on SQLite and on background refreshes; keep them off the loop
+            await asyncio.to_thread(self._ingest_timetable, endpoint, params, result)
+        return result
+
+    async def _execute(self, prepared: Union[ApiCall, Dict[str, Any]]) -> Dict[str, Any]:
+        """Send a prepared call, or pass a validation error straight through"""
+        if not isinstance(prepared, ApiCall):
+            return prepared
+
+        # If in debug mode, return understanding instead of making API call
+        if self.debug_mode:
+            return self.format_debug_response(prepared.query_type, prepared.params)
+
+        result = await self._make_request(prepared.endpoint, prepared.params)
+        return self._finish_request(prepared, result)
+
+    async def search_train(self, train_number: str) -> Dict[str, Any]:
+        """Search train by number"""
+        try:
+            return await self._execute(self._prepare_search_train(train_number))
+        except Exception as e:
+            return {
+                'success': False,
+                'error': 'Failed to search train',
+                'details': str(e)
+            }
+
+    async def search_station(self, station_code: str) -> Dict[str, Any]:
+        """Search station by code"""
+        try:
+            return await self._execute(self._prepare_search_station(station_code))
+        except Exception as e:
+            return {
+                'success': False,
+                'error': 'Failed to search station',
+                'details': str(e)
+            }
+
+    async def get_trains_between_stations(self, from_station: str, to_station: str,
+                                          date_string: Optional[str] = None) -> Dict[str, Any]:
+        """Get trains between stations using v3 API"""
+        try:
+            # The local timetable lookup is a SQLite query, run off the loop like the store's writes
+            prepared = await asyncio.to_thread(self._prepare_trains_between_stations, from_station, to_station, date_string)
+            return await self._execute(prepared)
+        except Exception as e:
+            error_msg = str(e)
+            print(f"Error getting trains between stations: {error_msg}")
+            return {
+                'success': False,
+                'error': 'Failed to get trains between stations',
+                'details': error_msg
+            }
+
+    async def get_live_train_status(self, train_number: str, start_day: str = "1") -> Dict[str, Any]:
+        """Get live train status"""
+        try:
+            return await self._execute(self._prepare_live_train_status(train_number, start_day))
+        except Exception as e:
+            return {
+                'success': False,
+                'error': 'Failed to get live train status',
+                'details': str(e)
+            }
+
+    async def get_train_schedule(self, train_number: str) -> Dict[str, Any]:
+        """Get train schedule"""
+        try:
+            return await self._execute(self._prepare_train_schedule(train_number))
+        except Exception as e:
+            return {
+                'success': False,
+                'error': 'Failed to get train schedule',
+                'details': str(e)
+            }
+
+    async def check_pnr_status(self, pnr_number: str) -> Dict[str, Any]:
+        """Check PNR status using v3 API"""
+        try:
+            return await self._execute(self._prepare_pnr_status(pnr_number))
+        except Exception as e:
+            return {
+                'success': False,
+                'error': 'Failed to check PNR status',
+                'details': str(e)
+            }
+
+    async def check_seat_availability(self, train_number: str, from_station: str,
+                                      to_station: str, date_string: str,
+                                      class_type: str, quota: str = "GN") -> Dict[str, Any]:
+        """Check seat availability"""
+        try:
+            return await self._execute(self._prepare_seat_availability(
+                train_number, from_station, to_station, date_string, class_type, quota
+            ))
+        except Exception as e:
+            return {
+                'success': False,
+                'error': 'Failed to check seat availability',
+                'details': str(e)
+            }
+
+    async def get_train_classes(self, train_number: str) -> Dict[str, Any]:
+        """Get available classes for a train"""
+        try:
+            return await self._execute(self._prepare_train_classes(train_number))
+        except Exception as e:
+            return {
+                'success': False,
+                'error': 'Failed to get train classes',
+                'details': str(e)
+            }
+
+    async def get_fare(self, train_number: str, from_station: str, to_station: str) -> Dict[str, Any]:
+        """Get fare details using v2 API"""
+        try:
+            return await self._execute(self._prepare_fare(train_number, from_station, to_station))
+        except Exception as e:
+            return {
+                'success': False,
+                'error': 'Failed to get fare details',
+                'details': str(e)
+            }
+
+    async def close(self):
+        """Release pooled connections held by the shared async transport"""
+        await self.transport.close()
@@ -0,0 +1,171 @@
+"""
+Flexible-date seat availability: which day, in which class, is best to travel
+
+build_availability_calendar checks a train's availability over a range of
+dates for a few classes at once. One availability call usually reports several
+consecutive days, so each class is checked on its first date before the dates
+that answer did not cover are fanned out concurrently; every call still goes
+through AsyncTrainService, so cached answers are reused and in-flight ones
+shared. Each cell is handed to on_cell as soon as it is known, and the result
+is a compact grid of statuses per class and date with the best cell picked out.
+"""
+import asyncio
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .async_train_service import AsyncTrainService
+from .date_service import get_date_range, is_valid_travel_date, parse_date_time, parse_payload_date
+from utils.constants import CALENDAR
+
+Cell = Dict[str, Any]
+
+
+def seat_status_rank(status: Optional[str]) -> Tuple[int, int]:
+    """
+    Sort key for a seat status, lower is better
+    Available (more seats first), then RAC, then waitlist (shorter first), then regret or unknown
+    """
+    upper = str(status or '').strip().upper()
+    match = re.match(r'^(?:CURR_)?AVAILABLE[-\s]*0*(\d+)', upper)
+    if match:
+        return 0, -int(match.group(1))
+    if 'REGRET' in upper or 'NOT AVAILABLE' in upper or not upper:
+        return 3, 0
+    match = re.match(r'^RAC\s*0*(\d+)', upper)
+    if match:
+        return 1, int(match.group(1))
+    match = re.search(r'WL\s*0*(\d+)\s*$', upper)
+    if match:
+        return 2, int(match.group(1))
+    return 3, 0
+
+
+async def resolve_classes(train_service: AsyncTrainService, train_number: str,
+                          class_type: Optional[str] = None) -> List[str]:
+    """The class asked for, else the train's most commonly booked classes"""
+    if class_type:
+        return [class_type.upper()]
+    preference = CALENDAR['CLASS_PREFERENCE']
+    result = await train_service.get_train_classes(train_number)
+    offered = result.get('data') if result.get('success') else None
+    if isinstance(offered, list):
+        codes = {str(code).upper() for code in offered if isinstance(code, str)}
+        ordered = [code for code in preference if code in codes] + sorted(codes - set(preference))
+        if ordered:
+            return ordered[:CALENDAR['MAX_CLASSES']]
+    return preference[:CALENDAR['MAX_CLASSES']]
+
+
+async def build_availability_calendar(train_service: AsyncTrainService, train_number: str,
+                                      from_station: str, to_station: str, start_date: str,
+                                      classes: List[str], quota: str = 'GN', days: int = CALENDAR['DAYS'],
+                                      on_cell: Optional[Callable[[Cell], None]] = None,
+                                      time_limit: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Seat availability of a train for each of classes over days dates from start_date
+    Cells not known within time_limit seconds are left empty and the grid is
+    marked incomplete; cells already sent to on_cell stay valid
+    """
+    start = parse_date_time(start_date)
+    if start['success'] and not is_valid_travel_date(start):
+        # Today, the default travel date, can't be booked any more; start at the first day that can
+        tomorrow = parse_date_time('tomorrow')
+        if start['date'] < tomorrow['date']:
+            start = tomorrow
+    dates = [day for day in get_date_range(start, days) if is_valid_travel_date(parse_date_time(day['date']))]
+    if not dates:
+        return {
+            'success': False,
+            'error': 'Invalid date',
+            'details': 'Please provide a valid future date'
+        }
+
+    wanted = {day['date'] for day in dates}
+    cells: Dict[Tuple[str, str], Cell] = {}
+    errors: List[str] = []
+    calls = 0
+    semaphore = asyncio.Semaphore(CALENDAR['MAX_CONCURRENCY'])
+
+    def add_cell(class_type: str, travel_date: str, day: Dict[str, Any]):
+        if (class_type, travel_date) in cells:
+            return
+        cell = {
+            'date': travel_date,
+            'class_type': class_type,
+            'status': day.get('current_status') or day.get('currentStatus') or day.get('availability'),
+            'fare': day.get('total_fare') or day.get('totalFare') or day.get('fare'),
+        }
+        cells[(class_type, travel_date)] = cell
+        if on_cell:
+            on_cell(cell)
+
+    async def check(class_type: str, travel_date: str) -> int:
+        """Availability call for one cell, returning how many wanted dates its answer covered"""
+        nonlocal calls
+        async with semaphore:
+            # An answer for another date may have covered this one while we waited
+            if (class_type, travel_date) in cells:
+                return 0
+            calls += 1
+            result = await train_service.check_seat_availability(
+                train_number, from_station, to_station, travel_date, class_type, quota
+            )
+        if not result.get('success') or not isinstance(result.get('data'), list):
+            errors.append(result.get('details') or result.get('error') or 'No availability data')
+            return 0
+        covered = 0
+        for day in result['data']:
+            parsed = parse_payload_date(day.get('date')) if isinstance(day, dict) else None
+            if parsed and parsed.strftime('%Y-%m-%d') in wanted:
+                add_cell(class_type, parsed.strftime('%Y-%m-%d'), day)
+                covered += 1
+        return covered
+
+    async def check_class(class_type: str):
+        # A class the train does not run, or a route it does not serve, fails on the first date
+        span = await check(class_type, dates[0]['date'])
+        if not span:
+            return
+        # Each answer covers about as many days as the first one did, so ask from every span-th
+        # date at once, then fill whatever those answers left out
+        await asyncio.gather(*(check(class_type, day['date']) for day in dates[span::span]))
+        await asyncio.gather(*(check(class_type, day['date']) for day in dates
+                               if (class_type, day['date']) not in cells))
+
+    if time_limit is not None:
+        time_limit = max(0.0, time_limit - CALENDAR['DEADLINE_MARGIN_SECONDS'])
+    try:
+        await asyncio.wait_for(asyncio.gather(*(check_class(class_type) for class_type in classes)), time_limit)
+        complete = True
+    except asyncio.TimeoutError:
+        complete = False
+        print(f"Availability calendar cut short with {len(cells)} of {len(dates) * len(classes)} cells known")
+
+    if not cells:
+        return {
+            'success': False,
+            'error': 'Failed to check seat availability',
+            'details': errors[0] if errors else 'Ran out of time'
+        }
+
+    known = [cell for cell in cells.values() if cell['status']]
+    best = min(known, key=lambda cell: seat_status_rank(cell['status'])) if known else None
+    return {
+        'success': True,
+        'data': {
+            'train_number': train_number,
+            'from_station': from_station,
+            'to_station': to_station,
+            'quota': quota,
+            'classes': classes,
+            'dates': dates,
+            'grid': {class_type: [(cells.get((class_type, day['date'])) or {}).get('status') for day in dates]
+                     for class_type in classes},
+            'fares': {class_type: next((cell['fare'] for (code, _), cell in cells.items()
+                                        if code == class_type and cell['fare']), None)
+                      for class_type in classes},
+            'best': best,
+            'complete': complete,
+            'api_calls': calls,
+        }
+    }
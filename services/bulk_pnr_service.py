@@ -0,0 +1,141 @@
+"""Bulk PNR status checks with bounded concurrency, streaming JSONL output and resume"""
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+from utils.constants import LIMITS
+from utils.helpers import is_valid_pnr
+from .rate_limiter import PRIORITY_BULK
+from .train_service import TrainService
+
+
+def load_pnrs(source: Union[str, Iterable[str]]) -> Tuple[List[str], List[str]]:
+    """
+    Read PNRs from a file path or an iterable of strings
+    Returns (valid unique PNRs in input order, invalid entries)
+    """
+    if isinstance(source, str):
+        with open(source, 'r') as f:
+            lines = f.read().splitlines()
+    else:
+        lines = source
+
+    valid, invalid = [], []
+    seen = set()
+    for line in lines:
+        pnr = str(line).strip()
+        if not pnr or pnr in seen:
+            continue
+        seen.add(pnr)
+        if is_valid_pnr(pnr):
+            valid.append(pnr)
+        else:
+            invalid.append(pnr)
+    return valid, invalid
+
+
+def load_completed(output_path: str) -> Set[str]:
+    """PNRs already settled (fetched successfully or rejected as invalid) by an earlier run"""
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+
+    with open(output_path, 'r') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # Partially written last line from a crash
+            if record.get('success') or record.get('invalid'):
+                completed.add(record['pnr'])
+    return completed
+
+
+def _check_one(train_service: TrainService, pnr: str) -> Dict[str, Any]:
+    result = train_service.check_pnr_status(pnr)
+    return {
+        'pnr': pnr,
+        'success': bool(result.get('success', result.get('status', False))),
+        'checked_at': datetime.now().isoformat(timespec='seconds'),
+        'result': result
+    }
+
+
+def check_pnrs(pnrs: Iterable[str], train_service: Optional[TrainService] = None,
+               max_workers: int = LIMITS['BULK_MAX_WORKERS']) -> Iterator[Dict[str, Any]]:
+    """
+    Check PNR statuses concurrently, yielding each record as soon as it completes
+    At most max_workers lookups are queued at a time, so huge inputs are not
+    materialised as futures up front. Calls go through the shared rate limiter at
+    bulk priority, so live voice queries are served first
+    """
+    train_service = train_service or TrainService(priority=PRIORITY_BULK)
+    pending_pnrs = iter(pnrs)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        in_flight = set()
+
+        def submit_next() -> bool:
+            pnr = next(pending_pnrs, None)
+            if pnr is None:
+                return False
+            in_flight.add(executor.submit(_check_one, train_service, pnr))
+            return True
+
+        for _ in range(max_workers):
+            if not submit_next():
+                break
+
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                in_flight.remove(future)
+                submit_next()
+                yield future.result()
+
+
+def run_bulk_check(source: Union[str, Iterable[str]], output_path: str,
+                   train_service: Optional[TrainService] = None,
+                   max_workers: int = LIMITS['BULK_MAX_WORKERS']) -> Dict[str, int]:
+    """
+    Check every PNR from source, appending one JSON line per result to output_path
+    Re-running with the same output file skips PNRs that already succeeded
+    """
+    valid, invalid = load_pnrs(source)
+    completed = load_completed(output_path)
+    todo = [pnr for pnr in valid if pnr not in completed]
+
+    summary = {
+        'total': len(valid) + len(invalid),
+        'invalid': len(invalid),
+        'skipped': len(valid) - len(todo),
+        'succeeded': 0,
+        'failed': 0
+    }
+    print(f"Bulk PNR check: {len(todo)} to fetch, {summary['skipped']} already done, "
+          f"{len(invalid)} invalid")
+
+    with open(output_path, 'a+') as out:
+        # Terminate a line left half-written by a crash so new records start cleanly
+        if out.tell() > 0:
+            out.seek(out.tell() - 1)
+            if out.read(1) != '\n':
+                out.write('\n')
+
+        for pnr in invalid:
+            if pnr not in completed:
+                out.write(json.dumps({
+                    'pnr': pnr,
+                    'success': False,
+                    'invalid': True,
+                    'error': 'Invalid PNR number format'
+                }) + '\n')
+
+        for record in check_pnrs(todo, train_service, max_workers):
+            out.write(json.dumps(record, ensure_ascii=False) + '\n')
+            out.flush()
+            summary['succeeded' if record['success'] else 'failed'] += 1
+
+    return summary
@@ -0,0 +1,97 @@
+"""Bounded in-memory TTL cache shared by the service layer"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from urllib.parse import urlencode
+
+
+def make_cache_key(endpoint: str, params: Dict[str, Any], base_url: str = '') -> str:
+    """
+    Build a stable key from an endpoint and its query parameters
+    With base_url, responses from different upstreams (the stand-in and the real API) never share a key
+    """
+    key = f"{endpoint}?{urlencode(sorted(params.items()))}"
+    return f"{base_url}/{key}" if base_url else key
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache with a per-entry time to live
+    Values are stored JSON-encoded, so every hit returns a fresh copy the caller may
+    mutate, and memory is bounded by both entry count and total encoded size
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for key, or None on a miss or expired entry"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, encoded = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return json.loads(encoded)
+
+    def set(self, key: str, value: Any, ttl_seconds: float):
+        """Store a JSON-serializable value for ttl_seconds, evicting least recently used entries"""
+        encoded = json.dumps(value, default=str)
+        if len(encoded) > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl_seconds, encoded)
+            self._size += len(encoded)
+
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, key: str):
+        _, encoded = self._entries.pop(key)
+        self._size -= len(encoded)
+
+    def clear(self):
+        """Drop every entry, keeping the counters"""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss/eviction counters and current occupancy"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'entries': len(self._entries),
+                'bytes': self._size,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes
+            }
@@ -0,0 +1,141 @@
+"""
+Per-session slots for cheap follow-up turns
+
+A ConversationState keeps the slots of the last answered query (stations,
+train, PNR, date, class, quota), the result it was answered from and a bounded
+history of turns. Short follow-ups like "what about tomorrow?" or "and in 3A?"
+are read by parse_follow_up as a change to one or two slots and merged into the
+previous query, so they skip extraction entirely and re-run only that query's
+TrainService call.
+"""
+import re
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+from services.intent_parser import (QUESTION_WORDS, extract_class_type, extract_quota, extract_route,
+                                    extract_station_change, extract_travel_date, matched_intents, parse_intent)
+from services.query_router import has_required_details, used_details
+from utils.constants import CONVERSATION, INTENT_PARSER
+from utils.helpers import extract_pnr_number, is_valid_train_number
+
+SLOTS = ['query_type', 'from_station', 'to_station', 'train_number', 'pnr_number', 'travel_date',
+         'class_type', 'quota']
+
+# Openers and phrases that mark a turn as a change to the previous query
+FOLLOW_UP_MARKERS = re.compile(r'^(?:and|also|or|then|okay|ok|so)\b|\b(?:what|how) about\b|\binstead\b|\bsame\b')
+
+ORDINALS = {'first': 0, 'second': 1, 'third': 2, 'fourth': 3, 'fifth': 4, 'last': -1}
+ORDINAL_PATTERN = re.compile(rf"\b({'|'.join(ORDINALS)})\s+(?:one|train)\b")
+
+
+def _picked_train(text: str, last_result: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Train number of 'the second one' in the last train list"""
+    match = ORDINAL_PATTERN.search(text.lower())
+    trains = (last_result or {}).get('data')
+    if not match or not isinstance(trains, list):
+        return None
+    index = ORDINALS[match.group(1)]
+    if index >= len(trains) or not isinstance(trains[index], dict):
+        return None
+    return trains[index].get('train_number') or trains[index].get('train_no')
+
+
+def parse_follow_up(text: str, last_result: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Slots a follow-up turn changes, empty when it names none"""
+    delta: Dict[str, Any] = {}
+    from_station, to_station = extract_route(text)
+    if from_station:
+        delta.update(from_station=from_station, to_station=to_station)
+    else:
+        slot, code = extract_station_change(text)
+        if slot:
+            delta[slot] = code
+
+    travel_date = extract_travel_date(text)
+    if travel_date:
+        delta['travel_date'] = travel_date
+    class_type = extract_class_type(text)
+    if class_type:
+        delta['class_type'] = class_type
+    quota = extract_quota(text)
+    if quota:
+        delta['quota'] = quota
+
+    pnr_number = extract_pnr_number(text)
+    train_match = re.search(r'\b\d{5}\b', text)
+    if pnr_number:
+        delta.update(query_type='pnr_status', pnr_number=pnr_number)
+    elif train_match and is_valid_train_number(train_match.group()):
+        delta['train_number'] = train_match.group()
+    else:
+        picked = _picked_train(text, last_result)
+        if picked:
+            delta['train_number'] = str(picked)
+
+    intents = matched_intents(text)
+    if len(intents) == 1 and 'query_type' not in delta:
+        delta['query_type'] = intents[0]
+    return delta
+
+
+class ConversationState:
+    """Slots of the session's last query, its result and a bounded turn history"""
+
+    def __init__(self, max_history: int = CONVERSATION['MAX_HISTORY']):
+        self.slots: Dict[str, Any] = {}
+        self.last_result: Optional[Dict[str, Any]] = None
+        self.history: Deque[Dict[str, Any]] = deque(maxlen=max_history)
+
+    def follow_up(self, text: str) -> Optional[Dict[str, Any]]:
+        """
+        Query details for text read as a change to the previous query
+        None when there is no previous query, text reads as a complete query of its
+        own or as a question no keyword caught, names no slot the previous query
+        reads, or the merged query would miss a detail it needs
+        """
+        if not self.slots or len(text.split()) > CONVERSATION['MAX_FOLLOW_UP_WORDS']:
+            return None
+        _, confidence = parse_intent(text)
+        marked = FOLLOW_UP_MARKERS.search(text.lower())
+        if confidence >= INTENT_PARSER['MIN_CONFIDENCE'] and not marked:
+            return None
+
+        delta = parse_follow_up(text, self.last_result)
+        if not delta:
+            return None
+        if ('query_type' not in delta and not marked
+                and QUESTION_WORDS & set(re.findall(r'[a-z]+', text.lower()))):
+            # "when does 12952 leave" asks something no keyword caught; parse_intent leaves it to the LLM
+            return None
+        details = dict(self.slots, **delta)
+        if 'query_type' not in delta and not set(delta) & set(used_details(details.get('query_type'))):
+            # A train number after a PNR query changes nothing that query reads
+            return None
+        if details.get('query_type') == 'train_search':
+            # Search by the newly named train, or by the newly named route, not both
+            if 'train_number' in delta:
+                details.pop('from_station', None)
+                details.pop('to_station', None)
+            elif 'from_station' in delta or 'to_station' in delta:
+                details.pop('train_number', None)
+        if not has_required_details(details):
+            return None
+        print(f"Follow-up changes {sorted(delta)} of the previous {self.slots.get('query_type')} query")
+        return details
+
+    def remember(self, query: str, query_details: Dict[str, Any], follow_up: bool = False):
+        """Record an answered turn; a new query replaces every slot, a follow-up only the ones it changed"""
+        slots = {key: query_details[key] for key in SLOTS if query_details.get(key)}
+        self.slots = slots
+        if not follow_up:
+            self.last_result = None
+        self.history.append({'query': query, 'slots': slots, 'follow_up': follow_up})
+
+    def remember_result(self, result: Dict[str, Any]):
+        """Keep the result the last turn was answered from, for 'the second one' style picks"""
+        self.last_result = result
+
+    def clear(self):
+        self.slots = {}
+        self.last_result = None
+        self.history.clear()
@@ -1,35 +1,285 @@
+import re
+import threading
 import arrow
 import dateparser
-from typing import Optional, Dict, Any
-from datetime import datetime
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple
+from datetime import date, datetime, timedelta
 import pytz
 
+from utils.constants import DATE_CACHE
+
 # Indian timezone
 INDIA_TZ = 'Asia/Kolkata'
 
-def parse_date_time(date_string: str, reference_date: Optional[datetime] = None) -> Dict[str, Any]:
+# Words for the fast path, English, Hindi and romanized Hindi as heard from speech
+RELATIVE_DAYS = {
+    'today': 0, 'tonight': 0, 'aaj': 0, 'आज': 0,
+    'tomorrow': 1, 'kal': 1, 'कल': 1,
+    'day after tomorrow': 2, 'parso': 2, 'parson': 2, 'परसों': 2, 'परसो': 2,
+}
+
+WEEKDAY_NAMES = {
+    'monday': 0, 'mon': 0, 'somvar': 0, 'somvaar': 0, 'सोमवार': 0,
+    'tuesday': 1, 'tue': 1, 'mangalvar': 1, 'mangalvaar': 1, 'मंगलवार': 1,
+    'wednesday': 2, 'wed': 2, 'budhvar': 2, 'budhvaar': 2, 'बुधवार': 2,
+    'thursday': 3, 'thu': 3, 'guruvar': 3, 'guruvaar': 3, 'गुरुवार': 3, 'बृहस्पतिवार': 3,
+    'friday': 4, 'fri': 4, 'shukravar': 4, 'shukravaar': 4, 'शुक्रवार': 4,
+    'saturday': 5, 'sat': 5, 'shanivar': 5, 'shanivaar': 5, 'शनिवार': 5,
+    'sunday': 6, 'sun': 6, 'ravivar': 6, 'ravivaar': 6, 'रविवार': 6, 'इतवार': 6,
+}
+
+MONTH_NAMES = {
+    'jan': 1, 'january': 1, 'जनवरी': 1,
+    'feb': 2, 'february': 2, 'फ़रवरी': 2, 'फरवरी': 2,
+    'mar': 3, 'march': 3, 'मार्च': 3,
+    'apr': 4, 'april': 4, 'अप्रैल': 4, 'अप्रेल': 4,
+    'may': 5, 'मई': 5,
+    'jun': 6, 'june': 6, 'जून': 6,
+    'jul': 7, 'july': 7, 'जुलाई': 7,
+    'aug': 8, 'august': 8, 'अगस्त': 8,
+    'sep': 9, 'sept': 9, 'september': 9, 'सितंबर': 9, 'सितम्बर': 9,
+    'oct': 10, 'october': 10, 'अक्टूबर': 10, 'अक्तूबर': 10,
+    'nov': 11, 'november': 11, 'नवंबर': 11, 'नवम्बर': 11,
+    'dec': 12, 'december': 12, 'दिसंबर': 12, 'दिसम्बर': 12,
+}
+
+def _alternation(words) -> str:
+    return '|'.join(re.escape(word) for word in sorted(words, key=len, reverse=True))
+
+_WEEKDAY = _alternation(WEEKDAY_NAMES)
+_MONTH = _alternation(MONTH_NAMES)
+_ORDINAL = r'(?:st|nd|rd|th)?'
+
+FAST_PATTERNS = {
+    'relative': re.compile(rf'^(?:{_alternation(RELATIVE_DAYS)})$'),
+    'in_days': re.compile(r'^(?:in\s+(\d{1,3})\s+days?|(\d{1,3})\s+days?\s+(?:later|from now))$'),
+    'weekday': re.compile(rf'^(?:(?:this|next|coming|agle|agla|अगले|अगला|इस)\s+)?({_WEEKDAY})(?:\s+(?:ko|को))?$'),
+    'iso': re.compile(r'^(\d{4})-(\d{1,2})-(\d{1,2})$'),
+    'numeric': re.compile(r'^(\d{1,2})[-/.](\d{1,2})(?:[-/.](\d{2}|\d{4}))?$'),
+    'day_month': re.compile(rf'^(?:the\s+)?(\d{{1,2}}){_ORDINAL}\s+(?:of\s+)?({_MONTH})(?:,?\s+(\d{{4}}))?$'),
+    'month_day': re.compile(rf'^({_MONTH})\s+(\d{{1,2}}){_ORDINAL}(?:,?\s+(\d{{4}}))?$'),
+    'day_of_month': re.compile(rf'^(?:on\s+)?(?:the\s+)?(\d{{1,2}}){_ORDINAL}$'),
+}
+
+def _reference_now(reference_date: Optional[datetime]) -> datetime:
+    """reference_date (or now) as an aware India time"""
+    tz = pytz.timezone(INDIA_TZ)
+    if reference_date is None:
+        return datetime.now(tz)
+    if reference_date.tzinfo is None:
+        return tz.localize(reference_date)
+    return reference_date.astimezone(tz)
+
+def _midnight(year: int, month: int, day: int) -> Optional[datetime]:
+    """Start of a calendar day in India, None for dates like 31 February"""
+    try:
+        return pytz.timezone(INDIA_TZ).localize(datetime(year, month, day))
+    except ValueError:
+        return None
+
+def _next_day_month(now: datetime, month: int, day: int) -> Optional[datetime]:
+    """The next date on or after today with this day and month"""
+    for year in (now.year, now.year + 1, now.year + 4):
+        candidate = _midnight(year, month, day)
+        if candidate and candidate.date() >= now.date():
+            return candidate
+    return None
+
+def _next_day_of_month(now: datetime, day: int) -> Optional[datetime]:
+    """The next date on or after today falling on this day of the month"""
+    year, month = now.year, now.month
+    for _ in range(12):
+        candidate = _midnight(year, month, day)
+        if candidate and candidate.date() >= now.date():
+            return candidate
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return None
+
+def _normalize(date_string: str) -> str:
+    text = re.sub(r'\s+', ' ', date_string.strip().lower()).strip(' ,?!')
+    return re.sub(r'\.$', '', text)
+
+def _follows_now(date_string: str) -> bool:
+    """Whether fast_parse_date takes the time of day of this input from now"""
+    text = _normalize(date_string)
+    return bool(FAST_PATTERNS['relative'].match(text) or FAST_PATTERNS['in_days'].match(text))
+
+def fast_parse_date(date_string: str, now: datetime) -> Optional[datetime]:
+    """
+    Parse the common date forms without dateparser, relative to the aware datetime now
+    Relative days keep the time of day, like dateparser; calendar dates are midnight.
+    Weekdays, day-month and day-of-month dates resolve to the next occurrence.
+    Returns None for anything else
+    """
+    text = _normalize(date_string)
+
+    if FAST_PATTERNS['relative'].match(text):
+        return now + timedelta(days=RELATIVE_DAYS[text])
+
+    match = FAST_PATTERNS['in_days'].match(text)
+    if match:
+        return now + timedelta(days=int(match.group(1) or match.group(2)))
+
+    match = FAST_PATTERNS['weekday'].match(text)
+    if match:
+        days_ahead = (WEEKDAY_NAMES[match.group(1)] - now.weekday()) % 7 or 7
+        target = now + timedelta(days=days_ahead)
+        return _midnight(target.year, target.month, target.day)
+
+    match = FAST_PATTERNS['iso'].match(text)
+    if match:
+        return _midnight(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+
+    match = FAST_PATTERNS['numeric'].match(text)
+    if match:
+        day, month, year = int(match.group(1)), int(match.group(2)), match.group(3)
+        if year is None:
+            return _next_day_month(now, month, day)
+        return _midnight(int(year) + 2000 if len(year) == 2 else int(year), month, day)
+
+    for name, day_group, month_group in (('day_month', 1, 2), ('month_day', 2, 1)):
+        match = FAST_PATTERNS[name].match(text)
+        if match:
+            day, month = int(match.group(day_group)), MONTH_NAMES[match.group(month_group)]
+            if match.group(3):
+                return _midnight(int(match.group(3)), month, day)
+            return _next_day_month(now, month, day)
+
+    match = FAST_PATTERNS['day_of_month'].match(text)
+    if match:
+        return _next_day_of_month(now, int(match.group(1)))
+
+    return None
+
+def _humanize(arr: arrow.Arrow) -> str:
+    # Arrow 1.x has no en_in locale; Indian English reads the same as en
+    try:
+        return arr.humanize(locale='en_in')
+    except ValueError:
+        return arr.humanize(locale='en')
+
+class _DateCache:
+    """
+    LRU memo of parse results keyed on (input, reference date)
+    Inputs parsed against the current time are keyed on today's India date, and
+    the whole memo is emptied when that date changes, so 'tomorrow' never
+    resolves to yesterday's tomorrow. Each entry records whether its time of
+    day was taken from now ('tomorrow', 'in 3 days'); only those have their
+    time refreshed on a hit, explicit times are returned as parsed
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, Tuple[Dict[str, Any], bool]]" = OrderedDict()
+        self._day: Optional[date] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.rollovers = 0
+
+    def key(self, date_string: Any, reference_date: Optional[datetime]) -> tuple:
+        today = datetime.now(pytz.timezone(INDIA_TZ)).date()
+        with self._lock:
+            if self._day != today:
+                if self._day is not None:
+                    self.rollovers += 1
+                self._entries.clear()
+                self._day = today
+        return (date_string, reference_date if reference_date is not None else today)
+
+    def get(self, key: tuple) -> Optional[Tuple[Dict[str, Any], bool]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        result, follows_now = entry
+        return _copy_result(result), follows_now
+
+    def set(self, key: tuple, result: Dict[str, Any], follows_now: bool = False):
+        with self._lock:
+            self._entries[key] = (_copy_result(result), follows_now)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'rollovers': self.rollovers,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+def _refresh_time_fields(result: Dict[str, Any], follows_now: bool):
+    """Recompute the fields of a memoized result that depend on the current time"""
+    arr = arrow.get(result['datetime'])
+    if follows_now:
+        # 'tomorrow' and 'in 3 days' carry the time of the call, not of the first parse
+        arr = arrow.now(INDIA_TZ).replace(year=arr.year, month=arr.month, day=arr.day)
+        result['datetime'] = arr.datetime
+        result['timestamp'] = int(arr.timestamp())
+        result['formatted']['full_display'] = arr.format('DD MMM YYYY, hh:mm A')
+    result['relative'] = _humanize(arr)
+
+def _copy_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    # Dates are immutable; only the dicts need copying so callers can't edit the memo
+    copied = dict(result)
+    if 'formatted' in copied:
+        copied['formatted'] = dict(copied['formatted'])
+    return copied
+
+date_cache = _DateCache(DATE_CACHE['MAX_ENTRIES'])
+
+def date_cache_stats() -> Dict[str, Any]:
+    """Hit/miss counters of the parse_date_time memo"""
+    return date_cache.stats()
+
+def parse_date_time(date_string: str, reference_date: Optional[datetime] = None,
+                    use_fast_path: bool = True, use_cache: bool = True) -> Dict[str, Any]:
     """
     Parse date and time from natural language input
+    Common forms are read by fast_parse_date; dateparser only sees the rest.
+    Results are memoized per input and reference date for the current India day
     Returns a dictionary with parsed date information
     """
+    if not use_cache or not use_fast_path or not isinstance(date_string, str):
+        return _parse_date_time(date_string, reference_date, use_fast_path)
+
+    key = date_cache.key(date_string, reference_date)
+    entry = date_cache.get(key)
+    if entry is None:
+        result = _parse_date_time(date_string, reference_date, use_fast_path)
+        follows_now = reference_date is None and _follows_now(date_string)
+        # A dateparser time of day may be explicit ('9pm') or read off the clock ('in 2 hours');
+        # the two can't be told apart afterwards, so only its midnights are kept
+        if (reference_date is not None or follows_now or not result['success']
+                or arrow.get(result['datetime']).time() == datetime.min.time()):
+            date_cache.set(key, result, follows_now)
+        return result
+    result, follows_now = entry
+    if reference_date is None and result['success']:
+        _refresh_time_fields(result, follows_now)
+    return result
+
+def _parse_date_time(date_string: str, reference_date: Optional[datetime], use_fast_path: bool) -> Dict[str, Any]:
+    """parse_date_time without the memo"""
     try:
-        # Use dateparser for initial parsing with Indian context
-        settings = {
-            'PREFER_DATES_FROM': 'future',
-            'TIMEZONE': INDIA_TZ,
-            'RETURN_AS_TIMEZONE_AWARE': True,
-            'PREFER_DAY_OF_MONTH': 'first',
-            'DATE_ORDER': 'DMY'  # Indian date format
-        }
-        
-        if reference_date:
-            settings['RELATIVE_BASE'] = reference_date
-            
-        parsed_date = dateparser.parse(
-            date_string,
-            settings=settings,
-            languages=['en', 'hi']  # Support both English and Hindi
-        )
+        parsed_date = None
+        if use_fast_path and isinstance(date_string, str):
+            parsed_date = fast_parse_date(date_string, _reference_now(reference_date))
+        if parsed_date is None:
+            parsed_date = _parse_with_dateparser(date_string, reference_date)
         
         if not parsed_date:
             return {
@@ -54,7 +304,7 @@ def parse_date_time(date_string: str, reference_date: Optional[datetime] = None)
                 'day_of_week': arr.format('dddd')
             },
             'is_weekend': arr.weekday() in [5, 6],  # 5 = Saturday, 6 = Sunday
-            'relative': arr.humanize(locale='en_in'),
+            'relative': _humanize(arr),
             'timezone': INDIA_TZ
         }
         
@@ -65,6 +315,63 @@ def parse_date_time(date_string: str, reference_date: Optional[datetime] = None)
             'input': date_string
         }
 
+def _parse_with_dateparser(date_string: str, reference_date: Optional[datetime] = None) -> Optional[datetime]:
+    """Full natural-language parse with Indian settings, for forms the fast path does not know"""
+    # Use dateparser for initial parsing with Indian context
+    settings = {
+        'PREFER_DATES_FROM': 'future',
+        'TIMEZONE': INDIA_TZ,
+        'RETURN_AS_TIMEZONE_AWARE': True,
+        'PREFER_DAY_OF_MONTH': 'first',
+        'DATE_ORDER': 'DMY'  # Indian date format
+    }
+    
+    if reference_date:
+        settings['RELATIVE_BASE'] = reference_date
+        
+    return dateparser.parse(
+        date_string,
+        settings=settings,
+        languages=['en', 'hi']  # Support both English and Hindi
+    )
+
+# Formats API payloads use for calendar dates and clock times
+PAYLOAD_DATE_FORMATS = ['%d-%m-%Y', '%Y-%m-%d', '%d/%m/%Y', '%d %b %Y', '%d-%b-%Y', '%Y-%m-%dT%H:%M:%S']
+PAYLOAD_TIME_FORMATS = ['%H:%M', '%H:%M:%S']
+
+def parse_payload_date(value: Any) -> Optional[datetime]:
+    """'25-2-2025' style API date as a naive datetime, None when it is not a known format"""
+    for fmt in PAYLOAD_DATE_FORMATS:
+        try:
+            return datetime.strptime(str(value).strip()[:19], fmt)
+        except ValueError:
+            continue
+    return None
+
+def display_payload_date(value: Any) -> Optional[str]:
+    """'25-2-2025' style API date as '25 Feb 2025, Tuesday', None when it is not a known format"""
+    parsed = parse_payload_date(value)
+    return parsed.strftime('%d %b %Y, %A') if parsed else None
+
+def display_payload_time(value: Any) -> Optional[str]:
+    """'16:55' style API time as '04:55 PM', None for placeholders like '--'"""
+    for fmt in PAYLOAD_TIME_FORMATS:
+        try:
+            return datetime.strptime(str(value).strip(), fmt).strftime('%I:%M %p')
+        except ValueError:
+            continue
+    return None
+
+def display_timestamp(value: Any) -> Optional[str]:
+    """Epoch seconds (or milliseconds) as India time, '25 Feb 2025, 04:55 PM'"""
+    try:
+        seconds = float(value)
+    except (TypeError, ValueError):
+        return None
+    if seconds > 1e11:
+        seconds /= 1000
+    return datetime.fromtimestamp(seconds, pytz.timezone(INDIA_TZ)).strftime('%d %b %Y, %I:%M %p')
+
 def is_valid_travel_date(date_dict: Dict[str, Any]) -> bool:
     """Check if the parsed date is valid for train booking"""
     if not date_dict.get('success', False):
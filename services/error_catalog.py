@@ -0,0 +1,35 @@
+"""Prepared spoken messages for the errors the train services are known to return"""
+import re
+from typing import Optional
+
+from utils.constants import ERROR_CODES, ERROR_MESSAGES, ERROR_PATTERNS
+
+DEFAULT_LANGUAGE = 'en'
+
+_PATTERNS = [(re.compile(pattern, re.IGNORECASE), code) for pattern, code in ERROR_PATTERNS]
+
+
+def get_error_code(error: str) -> Optional[str]:
+    """Catalog code for an error string, None when the error is unknown"""
+    error = (error or '').strip()
+    code = ERROR_CODES.get(error)
+    if code:
+        return code
+    for pattern, code in _PATTERNS:
+        if pattern.search(error):
+            return code
+    return None
+
+
+def get_error_message(error: str, language: str = DEFAULT_LANGUAGE) -> Optional[str]:
+    """Prepared message for an error in language (falling back to English), None when unknown"""
+    code = get_error_code(error)
+    if code is None:
+        return None
+    return get_prepared_message(code, language)
+
+
+def get_prepared_message(code: str, language: str = DEFAULT_LANGUAGE) -> str:
+    """Catalog message for code in language, falling back to English"""
+    messages = ERROR_MESSAGES[code]
+    return messages.get(language) or messages[DEFAULT_LANGUAGE]
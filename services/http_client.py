@@ -0,0 +1,198 @@
+"""Shared HTTP transport for the IRCTC RapidAPI endpoints"""
+import asyncio
+import random
+import threading
+import time
+from typing import Any, Coroutine, Dict, Optional, Tuple
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils.constants import LIMITS, API_READ_TIMEOUTS
+from .cache import make_cache_key
+from .rate_limiter import PRIORITY_INTERACTIVE, get_rate_limiter
+from .singleflight import AsyncSingleFlight
+
+# Responses worth another attempt: rate limited or upstream trouble
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def get_timeout(endpoint: str) -> Tuple[float, float]:
+    """Return the (connect, read) timeout pair for an endpoint"""
+    read_timeout = min(
+        API_READ_TIMEOUTS.get(endpoint, LIMITS['TIMEOUT_SECONDS']),
+        LIMITS['TIMEOUT_SECONDS']
+    )
+    return LIMITS['CONNECT_TIMEOUT_SECONDS'], read_timeout
+
+
+def get_backoff_delay(attempt: int, retry_after: Optional[str] = None) -> float:
+    """
+    Delay before retry number `attempt` (1-based)
+    Honours a numeric Retry-After header, otherwise uses full-jitter exponential backoff
+    """
+    if retry_after:
+        try:
+            return min(float(retry_after), LIMITS['RETRY_BACKOFF_MAX_SECONDS'])
+        except ValueError:
+            pass
+    ceiling = min(
+        LIMITS['RETRY_BACKOFF_MAX_SECONDS'],
+        LIMITS['RETRY_BACKOFF_SECONDS'] * (2 ** (attempt - 1))
+    )
+    return random.uniform(0, ceiling)
+
+
+class HttpTransport:
+    """
+    Pooled keep-alive session with per-endpoint timeouts and jittered retries
+    Every attempt first takes a token from the shared rate limiter
+    """
+
+    def __init__(self, pool_size: int = LIMITS['HTTP_POOL_SIZE'],
+                 max_attempts: int = LIMITS['MAX_RETRY_ATTEMPTS']):
+        self.max_attempts = max(1, max_attempts)
+        self.rate_limiter = get_rate_limiter()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def get_json(self, url: str, endpoint: str, headers: Dict[str, str],
+                 params: Dict[str, Any], priority: int = PRIORITY_INTERACTIVE) -> Dict[str, Any]:
+        """GET a JSON document, retrying connection errors, timeouts and retryable statuses"""
+        timeout = get_timeout(endpoint)
+
+        for attempt in range(1, self.max_attempts + 1):
+            self.rate_limiter.acquire(priority)
+            try:
+                response = self.session.get(url, headers=headers, params=params, timeout=timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.max_attempts:
+                    raise
+                delay = get_backoff_delay(attempt)
+                print(f"API request to {endpoint} failed ({e.__class__.__name__}), "
+                      f"retrying in {delay:.2f}s (attempt {attempt}/{self.max_attempts})")
+            else:
+                if response.status_code not in RETRYABLE_STATUS_CODES or attempt == self.max_attempts:
+                    return response.json()
+                delay = get_backoff_delay(attempt, response.headers.get('Retry-After'))
+                print(f"API request to {endpoint} returned {response.status_code}, "
+                      f"retrying in {delay:.2f}s (attempt {attempt}/{self.max_attempts})")
+                response.close()
+            time.sleep(delay)
+
+    def close(self):
+        """Close all pooled connections"""
+        self.session.close()
+
+
+class AsyncHttpTransport:
+    """
+    aiohttp counterpart of HttpTransport with the same timeout and retry policy
+    An aiohttp session belongs to the loop it was created on, but callers come from
+    several loops (one per voice session, or a new one per asyncio.run). Requests
+    therefore run on a loop the transport owns, in its own thread, so one pooled
+    session serves every caller and is never left open on a finished loop. The
+    same loop holds the in-flight requests, so identical concurrent requests from
+    any caller loop share one upstream call.
+    """
+
+    def __init__(self, pool_size: int = LIMITS['HTTP_POOL_SIZE'],
+                 max_attempts: int = LIMITS['MAX_RETRY_ATTEMPTS']):
+        self.pool_size = pool_size
+        self.max_attempts = max(1, max_attempts)
+        self.rate_limiter = get_rate_limiter()
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_lock = threading.Lock()
+        self.inflight = AsyncSingleFlight()
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        """Return the transport's event loop, starting its thread on first use"""
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name='async-http-transport', daemon=True).start()
+            return self._loop
+
+    async def _run(self, coro: Coroutine[Any, Any, Any]) -> Any:
+        """Run coro on the transport loop; cancelling the caller cancels it there too"""
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self._get_loop()))
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Return the pooled session, creating it on first use (transport loop only)"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    async def get_json(self, url: str, endpoint: str, headers: Dict[str, str],
+                       params: Dict[str, Any], priority: int = PRIORITY_INTERACTIVE) -> Dict[str, Any]:
+        """
+        GET a JSON document, retrying connection errors, timeouts and retryable statuses
+        Callers asking for the same URL and params while it is in flight get a copy of its result
+        """
+        return await self._run(self.inflight.do(
+            make_cache_key(url, params),
+            lambda: self._get_json(url, endpoint, headers, params, priority)
+        ))
+
+    async def _get_json(self, url: str, endpoint: str, headers: Dict[str, str],
+                        params: Dict[str, Any], priority: int) -> Dict[str, Any]:
+        connect_timeout, read_timeout = get_timeout(endpoint)
+        timeout = aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout)
+        session = self._get_session()
+
+        for attempt in range(1, self.max_attempts + 1):
+            await self.rate_limiter.acquire_async(priority)
+            try:
+                async with session.get(url, headers=headers, params=params, timeout=timeout) as response:
+                    if response.status not in RETRYABLE_STATUS_CODES or attempt == self.max_attempts:
+                        return await response.json(content_type=None)
+                    delay = get_backoff_delay(attempt, response.headers.get('Retry-After'))
+                    print(f"API request to {endpoint} returned {response.status}, "
+                          f"retrying in {delay:.2f}s (attempt {attempt}/{self.max_attempts})")
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt == self.max_attempts:
+                    raise
+                delay = get_backoff_delay(attempt)
+                print(f"API request to {endpoint} failed ({e.__class__.__name__}), "
+                      f"retrying in {delay:.2f}s (attempt {attempt}/{self.max_attempts})")
+            await asyncio.sleep(delay)
+
+    async def close(self):
+        """Close the pooled session"""
+        if self._loop is not None:
+            await self._run(self._close_session())
+
+    async def _close_session(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+_transport: Optional[HttpTransport] = None
+_async_transport: Optional[AsyncHttpTransport] = None
+_transport_lock = threading.Lock()
+
+
+def get_transport() -> HttpTransport:
+    """Return the process-wide transport shared by every TrainService"""
+    global _transport
+    if _transport is None:
+        with _transport_lock:
+            if _transport is None:
+                _transport = HttpTransport()
+    return _transport
+
+
+def get_async_transport() -> AsyncHttpTransport:
+    """Return the process-wide transport shared by every AsyncTrainService"""
+    global _async_transport
+    if _async_transport is None:
+        with _transport_lock:
+            if _async_transport is None:
+                _async_transport = AsyncHttpTransport()
+    return _async_transport
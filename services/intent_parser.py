@@ -0,0 +1,264 @@
+"""
+Rule-based intent and slot extraction for common train queries
+
+Runs before the LLM in extract_query_details and returns the same dict shape
+(query_type, pnr_number, train_number, from_station, to_station, travel_date,
+class_type, quota) together with a confidence score. Queries it cannot read with
+confidence are left to the LLM.
+"""
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.constants import CITY_STATION_CODES, INTENT_PARSER, TRAIN_CLASSES
+from utils.helpers import extract_pnr_number, is_valid_train_number
+from utils.station_index import get_station_index, normalize_station_name
+
+# Keywords that pick the query type once a train number is known
+INTENT_KEYWORDS = {
+    'live_status': ['live', 'status', 'running status', 'running late', 'where is', 'current status',
+                    'current location', 'delay', 'delayed', 'late', 'reach', 'reaches', 'reached', 'arrive',
+                    'arrives', 'arriving', 'eta'],
+    'train_schedule': ['schedule', 'route', 'timetable', 'time table', 'stops', 'halts', 'stations'],
+    'fare_check': ['fare', 'price', 'cost', 'how much', 'ticket rate'],
+    'seat_availability': ['seat', 'seats', 'availability', 'available', 'berth', 'berths', 'vacancy'],
+    'availability_calendar': ['best day', 'which day', 'which date', 'any day', 'flexible', 'next few days',
+                              'whole week', 'calendar'],
+}
+
+CLASS_PHRASES = [
+    (r'executive chair car', 'EC'),
+    (r'chair car', 'CC'),
+    (r'second sitting', '2S'),
+    (r'sleeper', 'SL'),
+    (r'(?:first|1st) ac|ac (?:first|1st)|ac 1[\s-]?tier|(?:one|1)[\s-]?tier', '1A'),
+    (r'(?:second|2nd) ac|ac (?:second|2nd)|ac 2[\s-]?tier|(?:two|2)[\s-]?tier', '2A'),
+    (r'(?:third|3rd) ac|ac (?:third|3rd)|ac 3[\s-]?tier|(?:three|3)[\s-]?tier', '3A'),
+    (r'first class', 'FC'),
+]
+
+# Booking quotas, longest phrase first
+QUOTA_PHRASES = [
+    (r'premium tatkal', 'PT'),
+    (r'tatkal|tatkaal', 'TQ'),
+    (r'ladies', 'LD'),
+    (r'senior citizens?', 'SS'),
+    (r'general', 'GN'),
+]
+
+WEEKDAYS = r'monday|tuesday|wednesday|thursday|friday|saturday|sunday'
+MONTHS = (r'jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|jun(?:e)?|jul(?:y)?|aug(?:ust)?'
+          r'|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?')
+
+# Date phrases, kept in the user's own words like the LLM prompt asks for
+DATE_PATTERNS = [
+    (re.compile(r'\bday after tomorrow\b'), lambda m: 'day after tomorrow'),
+    (re.compile(r'\b(today|tonight|tomorrow)\b'), lambda m: 'today' if m.group(1) == 'tonight' else m.group(1)),
+    (re.compile(rf'\b(?:next|coming)\s+({WEEKDAYS})\b'), lambda m: f"next {m.group(1)}"),
+    (re.compile(rf'\b(?:this\s+)?({WEEKDAYS})\b'), lambda m: m.group(1)),
+    (re.compile(rf'\b(\d{{1,2}})(?:st|nd|rd|th)?\s+(?:of\s+)?({MONTHS})\b'), lambda m: f"{int(m.group(1))} {m.group(2)}"),
+    (re.compile(rf'\b({MONTHS})\s+(\d{{1,2}})(?:st|nd|rd|th)?\b'), lambda m: f"{int(m.group(2))} {m.group(1)}"),
+    (re.compile(r'\b(\d{4}-\d{1,2}-\d{1,2})\b'), lambda m: m.group(1)),
+    (re.compile(r'\b(\d{1,2}[/.-]\d{1,2}(?:[/.-]\d{2,4})?)\b'), lambda m: m.group(1)),
+    (re.compile(r'\bon\s+(?:the\s+)?(\d{1,2})(?:st|nd|rd|th)?\b'), lambda m: str(int(m.group(1)))),
+]
+
+# Words that never belong to a station name in a route phrase
+FILLER_WORDS = {
+    'a', 'about', 'all', 'an', 'any', 'are', 'at', 'available', 'between', 'by', 'can', 'check', 'class',
+    'coming', 'day', 'details', 'find', 'for', 'from', 'get', 'give', 'going', 'i', 'in', 'is', 'list', 'me',
+    'my', 'need', 'next', 'number', 'of', 'on', 'please', 'quota', 'search', 'seat', 'seats', 'show', 'tell',
+    'the', 'this', 'ticket', 'tickets', 'to', 'train', 'trains', 'want', 'what', 'which', 'with', 'you'
+}
+
+MAX_STATION_WORDS = 3
+
+# A train number asked about with one of these, but no intent keyword, is not a plain search
+QUESTION_WORDS = {'when', 'where', 'how', 'why', 'which', 'what'}
+
+
+def _words(text: str) -> List[str]:
+    return re.findall(r'[a-z0-9]+', text.lower())
+
+
+def _resolve_station(words: List[str]) -> Optional[str]:
+    """Station code for a phrase, only when it maps to exactly one station"""
+    if not words or any(word in FILLER_WORDS or word.isdigit() for word in words):
+        return None
+
+    phrase = normalize_station_name(' '.join(words))
+    if phrase in CITY_STATION_CODES:
+        return CITY_STATION_CODES[phrase]
+
+    index = get_station_index()
+    if len(words) == 1 and 3 <= len(phrase) <= 4:
+        entry = index.get(phrase)
+        if entry:
+            return entry['code']
+
+    matches = index.search_prefix(phrase, limit=2)
+    exact = [m for m in matches if normalize_station_name(m['name']) == phrase]
+    if exact:
+        return exact[0]['code']
+    if len(matches) == 1:
+        return matches[0]['code']
+    return None
+
+
+def _station_before(words: List[str]) -> Optional[str]:
+    """Resolve the longest station phrase ending right before 'to'"""
+    for size in range(min(MAX_STATION_WORDS, len(words)), 0, -1):
+        code = _resolve_station(words[-size:])
+        if code:
+            return code
+    return None
+
+
+def _station_after(words: List[str]) -> Optional[str]:
+    """Resolve the longest station phrase starting right after 'to'"""
+    for size in range(min(MAX_STATION_WORDS, len(words)), 0, -1):
+        code = _resolve_station(words[:size])
+        if code:
+            return code
+    return None
+
+
+def extract_route(text: str) -> Tuple[Optional[str], Optional[str]]:
+    """(from_station, to_station) codes from 'from X to Y', 'between X and Y' or 'X to Y'"""
+    words = _words(text)
+    for separator, marker in (('to', 'from'), ('and', 'between'), ('to', None)):
+        for split, word in enumerate(words):
+            if word != separator:
+                continue
+            before = words[:split]
+            if marker:
+                if marker not in before:
+                    continue
+                before = before[len(before) - before[::-1].index(marker):]
+            from_code = _station_before(before)
+            to_code = _station_after(words[split + 1:])
+            if from_code and to_code and from_code != to_code:
+                return from_code, to_code
+    return None, None
+
+
+def extract_travel_date(text: str) -> Optional[str]:
+    """The date phrase in text, worded the way convert_relative_date expects"""
+    lowered = text.lower()
+    for pattern, render in DATE_PATTERNS:
+        match = pattern.search(lowered)
+        if match:
+            return render(match)
+    return None
+
+
+def extract_class_type(text: str) -> Optional[str]:
+    """Travel class code from a code (3A) or a spoken name (third AC, sleeper)"""
+    lowered = text.lower()
+    for pattern, code in CLASS_PHRASES:
+        if re.search(rf'\b(?:{pattern})\b', lowered):
+            return code
+    match = re.search(r'\b([123]a|sl|cc|ec|2s|fc)\b', lowered)
+    if match and match.group(1).upper() in TRAIN_CLASSES:
+        return match.group(1).upper()
+    return None
+
+
+def extract_quota(text: str) -> Optional[str]:
+    """Booking quota code from a spoken quota name (tatkal, ladies)"""
+    lowered = text.lower()
+    for pattern, code in QUOTA_PHRASES:
+        if re.search(rf'\b(?:{pattern})\b', lowered):
+            return code
+    return None
+
+
+def extract_station_change(text: str) -> Tuple[Optional[str], Optional[str]]:
+    """('from_station' or 'to_station', code) for a lone 'from X' or 'to X', as in 'what about to Pune'"""
+    words = _words(text)
+    for marker, slot in (('from', 'from_station'), ('to', 'to_station')):
+        if marker in words:
+            code = _station_after(words[words.index(marker) + 1:])
+            if code:
+                return slot, code
+    return None, None
+
+
+def matched_intents(text: str) -> List[str]:
+    """Query types whose keywords appear in text"""
+    lowered = ' '.join(_words(text))
+    intents = [intent for intent, keywords in INTENT_KEYWORDS.items()
+               if any(re.search(rf'\b{re.escape(keyword)}\b', lowered) for keyword in keywords)]
+    # "Which day has seats" is a calendar question, not a seat check for one day
+    if 'availability_calendar' in intents and 'seat_availability' in intents:
+        intents.remove('seat_availability')
+    return intents
+
+
+def parse_intent(text: str) -> Tuple[Dict[str, Any], float]:
+    """
+    Extract query details from text without the LLM
+    Returns (details, confidence); details are only worth using when confidence
+    reaches INTENT_PARSER['MIN_CONFIDENCE']
+    """
+    words = _words(text)
+    if not words:
+        return {'query_type': 'general'}, 0.0
+
+    details: Dict[str, Any] = {}
+    pnr_number = extract_pnr_number(text)
+    train_match = re.search(r'\b\d{5}\b', text)
+    train_number = train_match.group() if train_match and is_valid_train_number(train_match.group()) else None
+    from_station, to_station = extract_route(text)
+    travel_date = extract_travel_date(text)
+    class_type = extract_class_type(text)
+    quota = extract_quota(text)
+    intents = matched_intents(text)
+
+    if from_station:
+        details['from_station'] = from_station
+        details['to_station'] = to_station
+    if travel_date:
+        details['travel_date'] = travel_date
+    if class_type:
+        details['class_type'] = class_type
+    if quota:
+        details['quota'] = quota
+
+    if pnr_number and not train_number:
+        details.update(query_type='pnr_status', pnr_number=pnr_number)
+        confidence = 0.95 if 'pnr' in words else 0.85
+    elif train_number and not pnr_number:
+        details['train_number'] = train_number
+        if len(intents) > 1:
+            # "is there a seat on the delayed 12952" needs more than keywords
+            details['query_type'] = intents[0]
+            confidence = 0.5
+        elif intents == ['live_status'] or intents == ['train_schedule']:
+            details['query_type'] = intents[0]
+            confidence = 0.95
+        elif intents == ['fare_check']:
+            details['query_type'] = 'fare_check'
+            confidence = 0.9 if from_station else 0.5
+        elif intents == ['seat_availability']:
+            details['query_type'] = 'seat_availability'
+            confidence = 0.9 if from_station and class_type else 0.5
+        elif intents == ['availability_calendar']:
+            details['query_type'] = 'availability_calendar'
+            confidence = 0.9 if from_station else 0.5
+        elif QUESTION_WORDS & set(words):
+            # "when does 12951 leave" asks something no keyword caught; leave it to the LLM
+            details['query_type'] = 'train_search'
+            confidence = 0.6
+        else:
+            details['query_type'] = 'train_search'
+            confidence = 0.85
+    elif from_station and not pnr_number and not intents:
+        details['query_type'] = 'train_search'
+        confidence = 0.9
+    else:
+        details['query_type'] = intents[0] if intents else 'general'
+        confidence = 0.3
+
+    if len(words) > INTENT_PARSER['MAX_WORDS']:
+        confidence -= 0.3
+    return details, round(max(confidence, 0.0), 2)
@@ -0,0 +1,189 @@
+"""
+Latency, token and cost instrumentation for chat completions
+
+Every completion in the service layer goes through one of the four wrappers
+below, which time the call (and the first streamed token), read the usage
+block and add the numbers to in-process histograms keyed by calling function
+and model. snapshot() is what the server's /metrics endpoint and the benchmark
+report.
+"""
+import bisect
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from utils.constants import LLM_METRICS, LLM_PRICING
+
+
+class Histogram:
+    """Fixed-bucket histogram; percentiles are read as the upper bound of the bucket they fall in"""
+
+    def __init__(self, bounds: List[float]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # Last bucket catches everything above the top bound
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, pct: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = max(1, round(pct / 100 * self.count))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return self.bounds[index] if index < len(self.bounds) else self.max
+        return self.max
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'mean': round(self.total / self.count, 2) if self.count else 0.0,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+            'max': round(self.max, 2),
+            'buckets': dict(zip([str(b) for b in self.bounds] + ['inf'], self.counts)),
+        }
+
+
+class CallStats:
+    """Aggregates for one (caller, model) pair"""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost_usd = 0.0
+        self.wall_ms = Histogram(LLM_METRICS['LATENCY_BUCKETS_MS'])
+        self.ttft_ms = Histogram(LLM_METRICS['LATENCY_BUCKETS_MS'])
+        self.completion_token_counts = Histogram(LLM_METRICS['TOKEN_BUCKETS'])
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'prompt_tokens': self.prompt_tokens,
+            'completion_tokens': self.completion_tokens,
+            'cost_usd': round(self.cost_usd, 6),
+            'wall_ms': self.wall_ms.summary(),
+            'ttft_ms': self.ttft_ms.summary(),
+            'completion_tokens_per_call': self.completion_token_counts.summary(),
+        }
+
+
+_stats: Dict[Tuple[str, str], CallStats] = {}
+_lock = threading.Lock()
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """US dollars for a call, 0 for models without a price entry"""
+    price = LLM_PRICING.get(model)
+    if not price:
+        return 0.0
+    return (prompt_tokens * price['prompt'] + completion_tokens * price['completion']) / 1000
+
+
+def record_call(caller: str, model: str, wall_seconds: float, usage: Any = None,
+                ttft_seconds: Optional[float] = None, error: bool = False):
+    """Add one completion to the histograms of caller and model"""
+    prompt_tokens = getattr(usage, 'prompt_tokens', 0) or 0
+    completion_tokens = getattr(usage, 'completion_tokens', 0) or 0
+    with _lock:
+        stats = _stats.setdefault((caller, model), CallStats())
+        stats.calls += 1
+        stats.wall_ms.observe(wall_seconds * 1000)
+        if ttft_seconds is not None:
+            stats.ttft_ms.observe(ttft_seconds * 1000)
+        if error:
+            stats.errors += 1
+        if usage is not None:
+            stats.prompt_tokens += prompt_tokens
+            stats.completion_tokens += completion_tokens
+            stats.completion_token_counts.observe(completion_tokens)
+            stats.cost_usd += estimate_cost(model, prompt_tokens, completion_tokens)
+
+
+def snapshot() -> Dict[str, Dict[str, Any]]:
+    """Aggregates per 'caller model' key"""
+    with _lock:
+        return {f"{caller} {model}": stats.summary() for (caller, model), stats in sorted(_stats.items())}
+
+
+def reset():
+    """Forget everything recorded so far"""
+    with _lock:
+        _stats.clear()
+
+
+def create_completion(client, caller: str, **kwargs) -> Any:
+    """client.chat.completions.create, timed and recorded under caller"""
+    started = time.perf_counter()
+    try:
+        response = client.chat.completions.create(**kwargs)
+    except Exception:
+        record_call(caller, kwargs.get('model', ''), time.perf_counter() - started, error=True)
+        raise
+    record_call(caller, kwargs.get('model', ''), time.perf_counter() - started, response.usage)
+    return response
+
+
+async def create_completion_async(client, caller: str, **kwargs) -> Any:
+    """Async form of create_completion"""
+    started = time.perf_counter()
+    try:
+        response = await client.chat.completions.create(**kwargs)
+    except BaseException:  # Cancellation by the turn budget counts as a failed call too
+        record_call(caller, kwargs.get('model', ''), time.perf_counter() - started, error=True)
+        raise
+    record_call(caller, kwargs.get('model', ''), time.perf_counter() - started, response.usage)
+    return response
+
+
+def _stream_kwargs(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    # The usage block only arrives on streams that ask for it, in a final chunk without choices
+    return dict(kwargs, stream=True, stream_options={'include_usage': True})
+
+
+def stream_completion(client, caller: str, **kwargs) -> Iterator[Any]:
+    """Streamed completion chunks, recording time to first token and the full call once drained"""
+    started = time.perf_counter()
+    ttft = usage = None
+    error = False
+    try:
+        for chunk in client.chat.completions.create(**_stream_kwargs(kwargs)):
+            if ttft is None and chunk.choices and chunk.choices[0].delta.content:
+                ttft = time.perf_counter() - started
+            usage = getattr(chunk, 'usage', None) or usage
+            yield chunk
+    except Exception:
+        error = True
+        raise
+    finally:
+        record_call(caller, kwargs.get('model', ''), time.perf_counter() - started, usage, ttft, error)
+
+
+async def stream_completion_async(client, caller: str, **kwargs) -> AsyncIterator[Any]:
+    """Async form of stream_completion"""
+    started = time.perf_counter()
+    ttft = usage = None
+    error = False
+    try:
+        async for chunk in await client.chat.completions.create(**_stream_kwargs(kwargs)):
+            if ttft is None and chunk.choices and chunk.choices[0].delta.content:
+                ttft = time.perf_counter() - started
+            usage = getattr(chunk, 'usage', None) or usage
+            yield chunk
+    except BaseException:
+        error = True
+        raise
+    finally:
+        record_call(caller, kwargs.get('model', ''), time.perf_counter() - started, usage, ttft, error)
@@ -1,24 +1,142 @@
+import asyncio
 import os
-from typing import Dict, Any, Optional
-from openai import OpenAI
+import re
+import threading
+from typing import Dict, Any, Optional, List, AsyncIterator, Awaitable
+from openai import OpenAI, AsyncOpenAI, DefaultHttpxClient, DefaultAsyncHttpxClient, Timeout, DEFAULT_CONNECTION_LIMITS
 import json
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
-from services.date_service import parse_date_time, is_valid_travel_date
+import pytz
+from services.cache import TTLCache
+from services.date_service import parse_date_time, is_valid_travel_date, INDIA_TZ
+from services.error_catalog import DEFAULT_LANGUAGE, get_error_message
+from services.intent_parser import parse_intent
+from services.llm_metrics import create_completion, create_completion_async, stream_completion_async
+from services.payload_projection import add_display_fields, project_payload
+from utils.constants import INTENT_PARSER, OPENAI_CLIENT, QUERY_CACHE
+from utils.helpers import SentenceSplitter, sanitize_input
 
 # Load environment variables
 load_dotenv()
 
-# Initialize OpenAI client
-api_key = os.getenv('OPENAI_API_KEY')
-if not api_key:
-    raise ValueError("OPENAI_API_KEY not found in environment variables")
+# openai re-exports httpx's Timeout but not Limits, so take the class from its defaults
+Limits = type(DEFAULT_CONNECTION_LIMITS)
 
-# Convert API key format if needed
-if api_key.startswith('sk-proj-'):
-    api_key = api_key.split('-o2WShBhmJnQC8JXCbSdoSQyv_lVQxJ6Bi_pDjqfpT3BlbkFJGD58LIuJdKeUXwaCfGfyz16s1t5Pr6fgdeKdRagfq3fKP81qexyz2UyOrUPTH7d_F_b9x2260A')[0]
+_client: Optional[OpenAI] = None
+_async_client: Optional[AsyncOpenAI] = None
+_llm_loop: Optional[asyncio.AbstractEventLoop] = None
+_client_lock = threading.Lock()
+_llm_loop_lock = threading.Lock()
 
-client = OpenAI(api_key=api_key)
+# Raw LLM extractions by normalized query; dates are re-resolved on every hit
+query_cache = TTLCache(QUERY_CACHE['MAX_ENTRIES'], QUERY_CACHE['MAX_BYTES'])
+
+RELATIVE_DATE_WORDS = re.compile(
+    r'\b(today|tonight|tomorrow|yesterday|day after|next|this|coming|monday|tuesday|wednesday|thursday'
+    r'|friday|saturday|sunday|aaj|kal|parso)\b'
+)
+
+def _get_api_key() -> str:
+    """Read OPENAI_API_KEY, raising only when a client is actually needed"""
+    api_key = os.getenv('OPENAI_API_KEY')
+    if not api_key:
+        raise ValueError("OPENAI_API_KEY not found in environment variables")
+
+    # Convert API key format if needed
+    if api_key.startswith('sk-proj-'):
+        api_key = api_key.split('-o2WShBhmJnQC8JXCbSdoSQyv_lVQxJ6Bi_pDjqfpT3BlbkFJGD58LIuJdKeUXwaCfGfyz16s1t5Pr6fgdeKdRagfq3fKP81qexyz2UyOrUPTH7d_F_b9x2260A')[0]
+    return api_key
+
+def _client_options() -> Dict[str, Any]:
+    return {
+        'timeout': Timeout(OPENAI_CLIENT['TIMEOUT_SECONDS'], connect=OPENAI_CLIENT['CONNECT_TIMEOUT_SECONDS']),
+        'max_retries': OPENAI_CLIENT['MAX_RETRIES']
+    }
+
+def _connection_limits() -> Limits:
+    return Limits(
+        max_connections=OPENAI_CLIENT['MAX_CONNECTIONS'],
+        max_keepalive_connections=OPENAI_CLIENT['MAX_KEEPALIVE_CONNECTIONS'],
+        keepalive_expiry=OPENAI_CLIENT['KEEPALIVE_EXPIRY_SECONDS']
+    )
+
+def get_client() -> OpenAI:
+    """Return the shared OpenAI client, creating it on first use"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = OpenAI(
+                    api_key=_get_api_key(),
+                    http_client=DefaultHttpxClient(limits=_connection_limits()),
+                    **_client_options()
+                )
+    return _client
+
+def get_async_client() -> AsyncOpenAI:
+    """
+    Return the shared AsyncOpenAI client, creating it on first use
+    Pooled connections belong to the loop that opened them, so the client is only
+    used on the LLM loop, through _on_llm_loop and _stream_on_llm_loop; callers on
+    any number of short-lived loops then share one pool that is never left open
+    on a finished loop
+    """
+    global _async_client
+    if _async_client is None:
+        with _client_lock:
+            if _async_client is None:
+                _async_client = AsyncOpenAI(
+                    api_key=_get_api_key(),
+                    http_client=DefaultAsyncHttpxClient(limits=_connection_limits()),
+                    **_client_options()
+                )
+    return _async_client
+
+def _get_llm_loop() -> asyncio.AbstractEventLoop:
+    """Return the event loop AsyncOpenAI requests run on, starting its thread on first use"""
+    global _llm_loop
+    with _llm_loop_lock:
+        if _llm_loop is None:
+            _llm_loop = asyncio.new_event_loop()
+            threading.Thread(target=_llm_loop.run_forever, name='openai-client', daemon=True).start()
+        return _llm_loop
+
+def warm_async_client():
+    """Create the async client and start its loop ahead of the first request"""
+    get_async_client()
+    _get_llm_loop()
+
+async def _on_llm_loop(coro: Awaitable[Any]) -> Any:
+    """Run coro on the LLM loop; cancelling the caller cancels it there too"""
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, _get_llm_loop()))
+
+async def _stream_on_llm_loop(stream: AsyncIterator[Any]) -> AsyncIterator[Any]:
+    """Iterate stream on the LLM loop, handing each item to the calling loop as it arrives"""
+    loop = asyncio.get_running_loop()
+    items: asyncio.Queue = asyncio.Queue()
+    finished = object()
+
+    async def pump():
+        try:
+            async for item in stream:
+                loop.call_soon_threadsafe(items.put_nowait, (item, None))
+            loop.call_soon_threadsafe(items.put_nowait, (finished, None))
+        except Exception as e:
+            loop.call_soon_threadsafe(items.put_nowait, (finished, e))
+
+    pumping = asyncio.run_coroutine_threadsafe(pump(), _get_llm_loop())
+    try:
+        while True:
+            item, error = await items.get()
+            if error is not None:
+                raise error
+            if item is finished:
+                return
+            yield item
+    finally:
+        # A reader that stops early (or is cancelled) closes the stream upstream
+        pumping.cancel()
 
 def convert_relative_date(date_str: str) -> str:
     """Convert relative dates to YYYY-MM-DD format using robust date parsing"""
@@ -41,77 +159,156 @@ def convert_relative_date(date_str: str) -> str:
     tomorrow = datetime.now() + timedelta(days=1)
     return tomorrow.strftime('%Y-%m-%d')
 
-def extract_query_details(user_query: str) -> Dict[str, Any]:
-    """Extract structured information from user's natural language query"""
-    try:
-        system_prompt = """You are a helpful train booking assistant. Extract relevant information from user queries about Indian Railways.
-        Identify the type of query (train_search, pnr_status, train_schedule, live_status, seat_availability, fare_check) and extract details like:
-        - Train numbers (5 digits)
-        - Station codes (3-4 letters, e.g., NDLS for New Delhi, CSTM for Mumbai CST)
-        - PNR numbers (10 digits)
-        - Travel dates - Extract exactly as mentioned by user:
-          * If no date mentioned, use "today"
-          * For relative dates like "today", "tomorrow", use those exact words
-          * For weekdays like "monday" or "next monday", include those exact phrases
-          * For dates like "25th", extract as "25"
-          * For dates with month like "25th February", extract as "25 february"
-        - Class preferences (1A, 2A, 3A, SL, CC, etc.)
-        - Number of passengers
-        
-        For cities without station codes provided, use these mappings:
-        - Delhi/New Delhi -> NDLS
-        - Mumbai/Bombay -> CSTM
-        - Kolkata -> KOAA
-        - Chennai -> MAS
-        - Bangalore/Bengaluru -> SBC
-        
-        Format response as JSON with query_type and relevant parameters.
-        For dates, preserve the exact way user mentioned them (today, tomorrow, monday, next monday, 25th, etc.)."""
+def _extraction_messages(user_query: str) -> List[Dict[str, str]]:
+    """Prompt asking the LLM for query details as JSON"""
+    system_prompt = """You are a helpful train booking assistant. Extract relevant information from user queries about Indian Railways.
+    Identify the type of query (train_search, pnr_status, train_schedule, live_status, seat_availability, availability_calendar, fare_check) and extract details like:
+    - Train numbers (5 digits)
+    - Station codes (3-4 letters, e.g., NDLS for New Delhi, CSTM for Mumbai CST)
+    - PNR numbers (10 digits)
+    - Travel dates - Extract exactly as mentioned by user:
+      * If no date mentioned, use "today"
+      * For relative dates like "today", "tomorrow", use those exact words
+      * For weekdays like "monday" or "next monday", include those exact phrases
+      * For dates like "25th", extract as "25"
+      * For dates with month like "25th February", extract as "25 february"
+    - Class preferences (1A, 2A, 3A, SL, CC, etc.)
+    - Number of passengers
+    
+    Use availability_calendar when the user is flexible on the date and asks which day has seats; its travel_date is the first day to check.
+    
+    For cities without station codes provided, use these mappings:
+    - Delhi/New Delhi -> NDLS
+    - Mumbai/Bombay -> CSTM
+    - Kolkata -> KOAA
+    - Chennai -> MAS
+    - Bangalore/Bengaluru -> SBC
+    
+    Format response as JSON with query_type and relevant parameters.
+    For dates, preserve the exact way user mentioned them (today, tomorrow, monday, next monday, 25th, etc.)."""
 
-        response = client.chat.completions.create(
-            model="gpt-4-turbo-preview",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Extract information from this query: {user_query}"}
-            ],
-            response_format={"type": "json_object"}
-        )
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": f"Extract information from this query: {user_query}"}
+    ]
+
+def _extract_with_llm(user_query: str) -> Dict[str, Any]:
+    """Ask the LLM for query details, for queries the intent parser cannot read"""
+    response = create_completion(
+        get_client(), '_extract_with_llm',
+        model="gpt-4-turbo-preview",
+        messages=_extraction_messages(user_query),
+        response_format={"type": "json_object"}
+    )
+    
+    # Parse the JSON response
+    return json.loads(response.choices[0].message.content)
+
+async def _extract_with_llm_async(user_query: str) -> Dict[str, Any]:
+    """Async form of _extract_with_llm"""
+    response = await _on_llm_loop(create_completion_async(
+        get_async_client(), '_extract_with_llm_async',
+        model="gpt-4-turbo-preview",
+        messages=_extraction_messages(user_query),
+        response_format={"type": "json_object"}
+    ))
+    return json.loads(response.choices[0].message.content)
+
+def finish_query_details(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Fill in query_type and resolve travel dates on extracted query details"""
+    # Add query type if not present
+    if 'query_type' not in result:
+        result['query_type'] = 'general'
+    
+    # Add query type if not present
+    query_type = result.get('query_type', 'general')
+    
+    # Handle dates for train search queries using improved date handling
+    if query_type == 'train_search':
+        # Extract any date-related field
+        date_field = next((field for field in ['travel_date', 'date', 'dateOfJourney'] 
+                         if field in result), None)
         
-        # Parse the JSON response
-        result = json.loads(response.choices[0].message.content)
+        if date_field:
+            # Use robust date parsing for the found date field
+            date_value = convert_relative_date(result[date_field])
+        else:
+            # If no date mentioned, default to tomorrow for better user experience
+            date_value = convert_relative_date('tomorrow')
         
-        # Add query type if not present
-        if 'query_type' not in result:
-            result['query_type'] = 'general'
+        # Update all date fields to maintain consistency
+        result['travel_date'] = date_value
+        result['date'] = date_value
+        result['dateOfJourney'] = date_value
         
-        # Add query type if not present
-        query_type = result.get('query_type', 'general')
+        # Add human readable format
+        parsed_date = parse_date_time(date_value)
+        if parsed_date['success']:
+            result['date_display'] = parsed_date['formatted']['display_format']
+            result['day_of_week'] = parsed_date['formatted']['day_of_week']
         
-        # Handle dates for train search queries using improved date handling
-        if query_type == 'train_search':
-            # Extract any date-related field
-            date_field = next((field for field in ['travel_date', 'date', 'dateOfJourney'] 
-                             if field in result), None)
-            
-            if date_field:
-                # Use robust date parsing for the found date field
-                date_value = convert_relative_date(result[date_field])
-            else:
-                # If no date mentioned, default to tomorrow for better user experience
-                date_value = convert_relative_date('tomorrow')
-            
-            # Update all date fields to maintain consistency
-            result['travel_date'] = date_value
-            result['date'] = date_value
-            result['dateOfJourney'] = date_value
-            
-            # Add human readable format
-            parsed_date = parse_date_time(date_value)
-            if parsed_date['success']:
-                result['date_display'] = parsed_date['formatted']['display_format']
-                result['day_of_week'] = parsed_date['formatted']['day_of_week']
-            
+    return result
+
+def _parse_locally(user_query: str) -> Optional[Dict[str, Any]]:
+    """Query details from the intent parser, None when it is not confident enough"""
+    result, confidence = parse_intent(user_query)
+    if confidence >= INTENT_PARSER['MIN_CONFIDENCE']:
+        print(f"Intent parser matched {result['query_type']} (confidence {confidence}), skipping OpenAI")
         return result
+    return None
+
+def query_cache_key(user_query: str) -> str:
+    """
+    Cache key for a query: sanitized, lowercased and whitespace-collapsed
+    Queries with relative date words also carry today's IST date, so an extraction
+    the LLM resolved to an absolute date is never reused after midnight
+    """
+    normalized = sanitize_input(user_query).lower().strip(' .,')
+    if RELATIVE_DATE_WORDS.search(normalized):
+        return f"{normalized}@{datetime.now(pytz.timezone(INDIA_TZ)).strftime('%Y-%m-%d')}"
+    return normalized
+
+def query_cache_stats() -> Dict[str, Any]:
+    """Hit-rate counters of the extraction cache"""
+    return query_cache.stats()
+
+def _extract_with_llm_cached(user_query: str) -> Dict[str, Any]:
+    key = query_cache_key(user_query)
+    result = query_cache.get(key)
+    if result is None:
+        result = _extract_with_llm(user_query)
+        query_cache.set(key, result, QUERY_CACHE['TTL_SECONDS'])
+    return result
+
+async def _extract_with_llm_cached_async(user_query: str) -> Dict[str, Any]:
+    key = query_cache_key(user_query)
+    result = query_cache.get(key)
+    if result is None:
+        result = await _extract_with_llm_async(user_query)
+        query_cache.set(key, result, QUERY_CACHE['TTL_SECONDS'])
+    return result
+
+def extract_query_details(user_query: str) -> Dict[str, Any]:
+    """
+    Extract structured information from user's natural language query
+    Common queries are read by the local intent parser; the LLM only sees the rest,
+    and its raw answers are cached per normalized query
+    """
+    try:
+        result = _parse_locally(user_query) or _extract_with_llm_cached(user_query)
+        return finish_query_details(result)
+    except Exception as e:
+        print(f"Error extracting query details: {str(e)}")
+        return {
+            'query_type': 'error',
+            'error': str(e)
+        }
+
+async def extract_query_details_async(user_query: str) -> Dict[str, Any]:
+    """Async form of extract_query_details, using the shared AsyncOpenAI client"""
+    try:
+        result = _parse_locally(user_query) or await _extract_with_llm_cached_async(user_query)
+        return finish_query_details(result)
     except Exception as e:
         print(f"Error extracting query details: {str(e)}")
         return {
@@ -147,7 +344,8 @@ def generate_train_response(train_data: Dict[str, Any], user_query: Optional[str
         
         Keep responses clear, informative, and user-friendly."""
         
-        response = client.chat.completions.create(
+        response = create_completion(
+            get_client(), 'generate_train_response',
             model="gpt-4-turbo-preview",
             messages=[
                 {"role": "system", "content": system_prompt},
@@ -160,58 +358,80 @@ def generate_train_response(train_data: Dict[str, Any], user_query: Optional[str
         print(f"Error generating response: {str(e)}")
         return "I apologize, but I'm having trouble processing the train information right now. Please try again."
 
-def handle_error_response(error: str) -> str:
-    """Generate user-friendly error messages"""
+def _error_messages(error: str) -> List[Dict[str, str]]:
+    """Prompt for a user-friendly version of an error"""
+    system_prompt = """You are a helpful Indian Railways assistant. Generate user-friendly error messages that:
+    - Explain the issue clearly
+    - Suggest possible solutions
+    - Maintain a helpful tone
+    - Guide users on next steps
+    Keep responses concise and actionable."""
+
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": f"Generate a user-friendly error message for: {error}"}
+    ]
+
+async def handle_error_response_async(error: str, language: str = DEFAULT_LANGUAGE) -> str:
+    """
+    Generate user-friendly error messages
+    Known errors come from the prepared catalog; only unknown ones reach the LLM
+    """
+    message = get_error_message(error, language)
+    if message:
+        return message
+
     try:
-        system_prompt = """You are a helpful Indian Railways assistant. Generate user-friendly error messages that:
-        - Explain the issue clearly
-        - Suggest possible solutions
-        - Maintain a helpful tone
-        - Guide users on next steps
-        Keep responses concise and actionable."""
-        
-        response = client.chat.completions.create(
+        response = await _on_llm_loop(create_completion_async(
+            get_async_client(), 'handle_error_response_async',
             model="gpt-4-turbo-preview",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Generate a user-friendly error message for: {error}"}
-            ]
-        )
-        
+            messages=_error_messages(error)
+        ))
         return response.choices[0].message.content
     except Exception as e:
         print(f"Error generating error response: {str(e)}")
         return "I apologize, but something went wrong. Please try your request again or rephrase it differently."
 
-def format_train_details(train_data: Dict[str, Any], query_type: str) -> str:
-    """Format train details based on query type"""
+def project_for_llm(train_data: Dict[str, Any], query_type: str) -> Dict[str, Any]:
+    """Trim train data to its speakable fields and add display dates and times"""
+    payload, tokens = project_payload(train_data, query_type)
+    print(f"Projected {query_type} payload: {tokens['tokens_before']} -> {tokens['tokens_after']} tokens")
+    return add_display_fields(payload, query_type)
+
+def _compose_messages(train_data: Dict[str, Any], query_type: str, user_query: Optional[str]) -> List[Dict[str, str]]:
+    """Prompt for a voice-ready answer from the projected train data"""
+    train_data = project_for_llm(train_data, query_type)
+
+    system_prompt = f"""You are a helpful Indian Railways voice assistant. Answer the user's {query_type} question from the train data provided.
+    - Use the provided formatted dates and times (fields ending in _display) and mention the day of week for dates
+    - For train searches, mention train numbers, names, departure and arrival times, duration and available classes
+    - For PNR status, clearly state each passenger's booking status and the train details
+    - For schedules and live status, mention the important stations, times and any delays
+    - Reply in a few short conversational sentences that read well aloud: no markdown, lists or tables
+    Keep responses clear, informative, and user-friendly."""
+
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": json.dumps({"user_query": user_query, "train_data": train_data})}
+    ]
+
+async def stream_train_response_async(train_data: Dict[str, Any], query_type: str,
+                                      user_query: Optional[str] = None) -> AsyncIterator[str]:
+    """Stream the spoken answer for train data, one complete sentence at a time"""
     try:
-        # Format any dates in the train data
-        for key in train_data:
-            if isinstance(train_data[key], str) and any(date_word in key.lower() for date_word in ['date', 'time', 'departure', 'arrival']):
-                parsed_date = parse_date_time(train_data[key])
-                if parsed_date['success']:
-                    train_data[f"{key}_display"] = parsed_date['formatted']['display_format']
-                    if 'time' in key.lower():
-                        train_data[f"{key}_display"] = parsed_date['formatted']['full_display']
-
-        system_prompt = f"""Format the following {query_type} information in a clear, organized way.
-        - Include relevant details and format times, dates, and statuses clearly
-        - Use the provided formatted dates and times (fields ending in _display)
-        - Add helpful context like day of week for dates
-        - For journey times, include duration when available
-        - Highlight any weekend travel dates
-        Add helpful context where appropriate."""
-        
-        response = client.chat.completions.create(
+        stream = _stream_on_llm_loop(stream_completion_async(
+            get_async_client(), 'stream_train_response_async',
             model="gpt-4-turbo-preview",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Format this train data: {json.dumps(train_data)}"}
-            ]
-        )
-        
-        return response.choices[0].message.content
+            messages=_compose_messages(train_data, query_type, user_query)
+        ))
+        splitter = SentenceSplitter()
+        async for chunk in stream:
+            if chunk.choices:
+                for sentence in splitter.feed(chunk.choices[0].delta.content):
+                    yield sentence
+        rest = splitter.flush()
+        if rest:
+            yield rest
     except Exception as e:
-        print(f"Error formatting train details: {str(e)}")
-        return str(train_data)  # Fallback to raw data if formatting fails
+        print(f"Error streaming response: {str(e)}")
+        yield "I apologize, but I'm having trouble processing the train information right now. Please try again."
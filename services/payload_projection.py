@@ -0,0 +1,200 @@
+"""
+Trim API payloads down to the fields worth speaking before they reach the LLM
+
+Each query type lists the fields kept from its 'data' document and caps the
+length of its lists. Fields that are not listed are dropped; if a payload has
+none of the listed fields (an unfamiliar response shape) it is passed on whole.
+DATE_FIELDS then names the date, time and timestamp fields of each query type,
+which add_display_fields formats directly, nested lists included.
+"""
+import copy
+import json
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+from services.date_service import display_payload_date, display_payload_time, display_timestamp
+from utils.constants import PROJECTION_LIMITS
+
+TRAIN_FIELDS = [
+    'train_number', 'train_no', 'train_name', 'train_type', 'train_date',
+    'from_station_name', 'from_station_code', 'from', 'to_station_name', 'to_station_code', 'to',
+    'from_std', 'from_sta', 'to_sta', 'to_std', 'departure_time', 'arrival_time',
+    'duration', 'run_days', 'running_days', 'class_type', 'special_train', 'has_pantry'
+]
+
+STOP_FIELDS = [
+    'station_name', 'station_code', 'stationName', 'stationCode',
+    'sta', 'std', 'arrival_time', 'departure_time', 'eta', 'etd',
+    'day', 'distance_from_source', 'platform_number', 'halt', 'delay', 'arrival_delay'
+]
+
+PASSENGER_FIELDS = [
+    'Number', 'BookingStatus', 'CurrentStatus', 'Coach', 'Berth',
+    'number', 'bookingStatus', 'currentStatus', 'passengerSerialNumber'
+]
+
+FARE_FIELDS = ['classType', 'class_type', 'fare', 'total_fare', 'totalFare', 'quota']
+
+AVAILABILITY_FIELDS = ['date', 'current_status', 'currentStatus', 'total_fare', 'ticket_fare',
+                       'confirm_probability', 'confirm_probability_percent']
+
+# fields: kept keys of a dict payload; items: kept keys of each entry of a list payload;
+# lists: nested lists of a dict payload, as (kept keys, cap name)
+PROJECTIONS: Dict[str, Dict[str, Any]] = {
+    'train_search': {
+        'items': TRAIN_FIELDS,
+        'max_items': 'MAX_TRAINS',
+    },
+    'train_schedule': {
+        'fields': ['train_number', 'train_name', 'running_days', 'run_days', 'origin', 'destination',
+                   'source_stn_name', 'dstn_stn_name', 'total_distance', 'duration'],
+        'lists': {'route': (STOP_FIELDS, 'MAX_STOPS')},
+    },
+    'live_status': {
+        'fields': ['train_number', 'train_name', 'current_station_name', 'current_station_code',
+                   'status', 'delay', 'eta', 'etd', 'ahead_distance_text', 'status_as_of',
+                   'journey_time', 'at_src', 'at_dstn', 'platform_number', 'train_start_date', 'updated_time'],
+        'lists': {'upcoming_stations': (STOP_FIELDS, 'MAX_UPCOMING_STOPS'),
+                  'previous_stations': (STOP_FIELDS, 'MAX_PREVIOUS_STOPS')},
+    },
+    'pnr_status': {
+        'fields': ['Pnr', 'TrainNo', 'TrainName', 'Doj', 'From', 'To', 'BoardingPoint', 'ReservationUpto',
+                   'Class', 'ChartPrepared', 'DepartureTime', 'ArrivalTime', 'Duration', 'Quota',
+                   'ExpectedPlatformNo', 'TicketFare', 'BookingDate'],
+        'lists': {'PassengerStatus': (PASSENGER_FIELDS, 'MAX_PASSENGERS')},
+    },
+    'seat_availability': {
+        'items': AVAILABILITY_FIELDS,
+        'max_items': 'MAX_DAYS',
+    },
+    'fare_check': {
+        'lists': {'general': (FARE_FIELDS, 'MAX_FARES'), 'tatkal': (FARE_FIELDS, 'MAX_FARES')},
+    },
+}
+
+
+STOP_TIMES = {'sta': 'time', 'std': 'time', 'arrival_time': 'time', 'departure_time': 'time',
+              'eta': 'time', 'etd': 'time'}
+
+# Same layout as PROJECTIONS, mapping each field to the kind of value it holds
+DATE_FIELDS: Dict[str, Dict[str, Any]] = {
+    'train_search': {
+        'items': {'from_std': 'time', 'from_sta': 'time', 'to_sta': 'time', 'to_std': 'time',
+                  'departure_time': 'time', 'arrival_time': 'time', 'train_date': 'date'},
+    },
+    'train_schedule': {
+        'lists': {'route': STOP_TIMES},
+    },
+    'live_status': {
+        'fields': {'eta': 'time', 'etd': 'time', 'train_start_date': 'date', 'updated_time': 'timestamp'},
+        'lists': {'upcoming_stations': STOP_TIMES, 'previous_stations': STOP_TIMES},
+    },
+    'pnr_status': {
+        'fields': {'Doj': 'date', 'DepartureTime': 'time', 'ArrivalTime': 'time', 'BookingDate': 'date'},
+    },
+    'seat_availability': {
+        'items': {'date': 'date'},
+    },
+}
+
+DISPLAY_FORMATTERS = {
+    'date': display_payload_date,
+    'time': display_payload_time,
+    'timestamp': display_timestamp,
+}
+
+
+def estimate_tokens(payload: Any) -> int:
+    """Rough prompt token count of a JSON payload (about four characters per token)"""
+    return math.ceil(len(json.dumps(payload, default=str)) / 4)
+
+
+def _pick(item: Any, fields: List[str]) -> Any:
+    if not isinstance(item, dict):
+        return item
+    return {key: item[key] for key in fields if item.get(key) not in (None, '')}
+
+
+def _cap(items: List[Any], limit: int) -> List[Any]:
+    """At most limit items, spread evenly and always keeping the first and last"""
+    if len(items) <= limit:
+        return items
+    if limit < 2:
+        return items[:limit]
+    step = (len(items) - 1) / (limit - 1)
+    return [items[round(i * step)] for i in range(limit)]
+
+
+def _project_data(data: Any, schema: Dict[str, Any]) -> Optional[Any]:
+    """Projected data, or None when the payload has none of the schema's fields"""
+    if isinstance(data, list) and 'items' in schema:
+        limit = PROJECTION_LIMITS[schema['max_items']]
+        projected = [_pick(item, schema['items']) for item in _cap(data, limit)]
+        return projected if any(projected) else None
+
+    if not isinstance(data, dict):
+        return None
+
+    projected = _pick(data, schema.get('fields', []))
+    for key, (fields, limit_name) in schema.get('lists', {}).items():
+        items = data.get(key)
+        if isinstance(items, list) and items:
+            projected[key] = [_pick(item, fields) for item in _cap(items, PROJECTION_LIMITS[limit_name])]
+            if len(items) > len(projected[key]):
+                projected[f"{key}_total"] = len(items)
+    return projected or None
+
+
+def project_payload(result: Dict[str, Any], query_type: str) -> Tuple[Dict[str, Any], Dict[str, int]]:
+    """
+    Keep only the speakable parts of an API result for query_type
+    Returns (payload, {'tokens_before': ..., 'tokens_after': ...})
+    """
+    tokens_before = estimate_tokens(result)
+    schema = PROJECTIONS.get(query_type)
+    data = _project_data(result.get('data'), schema) if schema else None
+    if data is None:
+        return result, {'tokens_before': tokens_before, 'tokens_after': tokens_before}
+
+    payload = {'data': data}
+    if isinstance(data, list) and len(result['data']) > len(data):
+        payload['total_results'] = len(result['data'])
+    date_info = result.get('date_info')
+    if isinstance(date_info, dict) and date_info.get('formatted'):
+        payload['travel_date'] = date_info['formatted']['display_format']
+        payload['travel_day'] = date_info['formatted']['day_of_week']
+    return payload, {'tokens_before': tokens_before, 'tokens_after': estimate_tokens(payload)}
+
+
+def _add_display(item: Any, fields: Dict[str, str]):
+    if not isinstance(item, dict):
+        return
+    for key, kind in fields.items():
+        value = item.get(key)
+        if isinstance(value, (str, int, float)) and not isinstance(value, bool):
+            shown = DISPLAY_FORMATTERS[kind](value)
+            if shown:
+                item[f"{key}_display"] = shown
+
+
+def add_display_fields(payload: Dict[str, Any], query_type: str) -> Dict[str, Any]:
+    """
+    Copy of payload with *_display fields next to the schema's date and time fields
+    Payloads of query types without date fields are returned as they are
+    """
+    schema = DATE_FIELDS.get(query_type)
+    if not schema:
+        return payload
+    # An unfamiliar payload comes through project_payload whole, so it may still be the caller's result
+    payload = copy.deepcopy(payload)
+    data = payload.get('data')
+    if isinstance(data, list):
+        for item in data:
+            _add_display(item, schema.get('items', {}))
+    elif isinstance(data, dict):
+        _add_display(data, schema.get('fields', {}))
+        for key, fields in schema.get('lists', {}).items():
+            if isinstance(data.get(key), list):
+                for item in data[key]:
+                    _add_display(item, fields)
+    return payload
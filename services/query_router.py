@@ -0,0 +1,109 @@
+"""Route extracted query details to the matching AsyncTrainService call"""
+from typing import Dict, Any, Callable, List, Optional
+
+from .async_train_service import AsyncTrainService
+from .availability_calendar import build_availability_calendar, resolve_classes
+
+# Details each query type needs before its TrainService call can be made
+REQUIRED_DETAILS = {
+    'pnr_status': ['pnr_number'],
+    'train_schedule': ['train_number'],
+    'live_status': ['train_number'],
+    'seat_availability': ['train_number', 'from_station', 'to_station', 'class_type'],
+    'fare_check': ['train_number', 'from_station', 'to_station'],
+    'availability_calendar': ['train_number', 'from_station', 'to_station'],
+}
+
+# Details a query type reads when they are given, on top of the ones it needs
+OPTIONAL_DETAILS = {
+    'train_search': ['train_number', 'from_station', 'to_station', 'travel_date'],
+    'seat_availability': ['travel_date', 'quota'],
+    'availability_calendar': ['travel_date', 'class_type', 'quota'],
+}
+
+
+def used_details(query_type: Optional[str]) -> List[str]:
+    """Every detail fetch_train_data reads for query_type"""
+    return REQUIRED_DETAILS.get(query_type, []) + OPTIONAL_DETAILS.get(query_type, [])
+
+
+def has_required_details(query_details: Dict[str, Any]) -> bool:
+    """Whether fetch_train_data can serve query_details"""
+    query_type = query_details.get('query_type')
+    if query_type == 'train_search':
+        return 'train_number' in query_details or all(k in query_details for k in ['from_station', 'to_station'])
+    required = REQUIRED_DETAILS.get(query_type)
+    return required is not None and all(query_details.get(k) for k in required)
+
+
+async def fetch_train_data(train_service: AsyncTrainService, query_details: Dict[str, Any],
+                           on_cell: Optional[Callable[[Dict[str, Any]], None]] = None,
+                           time_limit: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """
+    Call the TrainService method for the query type
+    Returns None when the query lacks the details that method needs. on_cell and
+    time_limit only apply to availability calendars, which are built from many calls
+    """
+    result = None
+    query_type = query_details.get('query_type')
+
+    if query_type == 'train_search':
+        print("Processing train search query...")
+        if 'train_number' in query_details:
+            print(f"Searching for train number: {query_details['train_number']}")
+            result = await train_service.search_train(query_details['train_number'])
+        elif all(k in query_details for k in ['from_station', 'to_station']):
+            print(f"Searching trains between stations: {query_details['from_station']} to {query_details['to_station']}")
+            result = await train_service.get_trains_between_stations(
+                query_details['from_station'],
+                query_details['to_station'],
+                query_details.get('travel_date', 'tomorrow')
+            )
+
+    elif query_type == 'pnr_status' and 'pnr_number' in query_details:
+        print(f"Checking PNR status: {query_details['pnr_number']}")
+        result = await train_service.check_pnr_status(query_details['pnr_number'])
+
+    elif query_type == 'train_schedule' and 'train_number' in query_details:
+        print(f"Getting train schedule: {query_details['train_number']}")
+        result = await train_service.get_train_schedule(query_details['train_number'])
+
+    elif query_type == 'live_status' and 'train_number' in query_details:
+        print(f"Getting live status: {query_details['train_number']}")
+        result = await train_service.get_live_train_status(query_details['train_number'])
+
+    elif query_type == 'seat_availability' and all(k in query_details for k in ['train_number', 'from_station', 'to_station', 'class_type']):
+        print(f"Checking seat availability: Train {query_details['train_number']}, {query_details['from_station']} to {query_details['to_station']}, Class {query_details['class_type']}")
+        result = await train_service.check_seat_availability(
+            query_details['train_number'],
+            query_details['from_station'],
+            query_details['to_station'],
+            query_details.get('travel_date', 'tomorrow'),
+            query_details['class_type'],
+            query_details.get('quota', 'GN')
+        )
+
+    elif query_type == 'fare_check' and all(k in query_details for k in ['train_number', 'from_station', 'to_station']):
+        print(f"Checking fare: Train {query_details['train_number']}, {query_details['from_station']} to {query_details['to_station']}")
+        result = await train_service.get_fare(
+            query_details['train_number'],
+            query_details['from_station'],
+            query_details['to_station']
+        )
+
+    elif query_type == 'availability_calendar' and all(k in query_details for k in ['train_number', 'from_station', 'to_station']):
+        print(f"Building availability calendar: Train {query_details['train_number']}, {query_details['from_station']} to {query_details['to_station']}")
+        classes = await resolve_classes(train_service, query_details['train_number'], query_details.get('class_type'))
+        result = await build_availability_calendar(
+            train_service,
+            query_details['train_number'],
+            query_details['from_station'],
+            query_details['to_station'],
+            query_details.get('travel_date', 'tomorrow'),
+            classes,
+            query_details.get('quota', 'GN'),
+            on_cell=on_cell,
+            time_limit=time_limit
+        )
+
+    return result
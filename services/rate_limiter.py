@@ -0,0 +1,213 @@
+"""Client-side token bucket that keeps all IRCTC calls under the RapidAPI quota"""
+import asyncio
+import heapq
+import itertools
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional, Tuple
+
+from utils.constants import RATE_LIMITS
+
+# Priority classes, lower value is served first
+PRIORITY_INTERACTIVE = 0  # Live voice turns
+PRIORITY_BULK = 1         # Bulk PNR checks and other batch jobs
+PRIORITY_PREFETCH = 2     # Speculative warming and background refreshes
+
+
+class LocalBucketState:
+    """Token count kept in this process only"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """Take one token; returns 0 on success, else seconds until one is available"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class SqliteBucketState:
+    """
+    Token count shared by every process pointing at the same SQLite file
+    BEGIN IMMEDIATE takes the database write lock, so refill-and-take is atomic
+    across processes
+    """
+
+    def __init__(self, path: str, rate: float, capacity: float, name: str = 'rapidapi'):
+        self.rate = rate
+        self.capacity = capacity
+        self.name = name
+        self.conn = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS token_bucket "
+            "(name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+
+    def take(self) -> float:
+        """Take one token; returns 0 on success, else seconds until one is available"""
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.conn.execute(
+                "SELECT tokens, updated FROM token_bucket WHERE name = ?", (self.name,)
+            ).fetchone()
+            tokens, updated = row if row else (self.capacity, now)
+            tokens = min(self.capacity, tokens + max(0.0, now - updated) * self.rate)
+
+            wait_time = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait_time = (1 - tokens) / self.rate
+
+            self.conn.execute(
+                "INSERT OR REPLACE INTO token_bucket (name, tokens, updated) VALUES (?, ?, ?)",
+                (self.name, tokens, now)
+            )
+            self.conn.execute("COMMIT")
+            return wait_time
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+
+class TokenBucket:
+    """
+    Priority-aware token bucket
+    Only the highest-priority (then oldest) waiter may take a token, so interactive
+    requests overtake queued bulk and prefetch work. Priority ordering applies within
+    a process; the token count itself can be shared across processes via SQLite
+    """
+
+    def __init__(self, rate: float, capacity: float, state_path: Optional[str] = None):
+        self.rate = rate
+        self.capacity = capacity
+        if state_path:
+            self._state = SqliteBucketState(state_path, rate, capacity)
+        else:
+            self._state = LocalBucketState(rate, capacity)
+        # _cond guards only the waiter heap and counters and is never held across a take;
+        # _take_lock serializes takes, which for SQLite can wait on another process's lock
+        self._cond = threading.Condition()
+        self._take_lock = threading.Lock()
+        self._waiters = []
+        self._sequence = itertools.count()
+        self.granted = 0
+        self.waited_seconds = 0.0
+
+    def _enqueue(self, priority: int) -> Tuple[int, int]:
+        ticket = (priority, next(self._sequence))
+        with self._cond:
+            heapq.heappush(self._waiters, ticket)
+        return ticket
+
+    def _dequeue(self, ticket: Tuple[int, int]):
+        with self._cond:
+            self._waiters.remove(ticket)
+            heapq.heapify(self._waiters)
+            self._cond.notify_all()
+
+    def _at_head(self, ticket: Tuple[int, int]) -> bool:
+        with self._cond:
+            return self._waiters[0] == ticket
+
+    def _take(self) -> float:
+        """Take a token from the state; 0 on success, else seconds until one is available"""
+        with self._take_lock:
+            wait_time = self._state.take()
+        if wait_time == 0:
+            with self._cond:
+                self.granted += 1
+        return wait_time
+
+    def acquire(self, priority: int = PRIORITY_INTERACTIVE, timeout: Optional[float] = None) -> bool:
+        """Block until a token is granted; returns False if timeout expires first"""
+        start = time.monotonic()
+        ticket = self._enqueue(priority)
+        try:
+            while True:
+                # Only the highest-priority (then oldest) waiter may take a token
+                wait_time = self._take() if self._at_head(ticket) else None
+                if wait_time == 0:
+                    return True
+                if timeout is not None:
+                    remaining = timeout - (time.monotonic() - start)
+                    if remaining <= 0:
+                        return False
+                    wait_time = remaining if wait_time is None else min(wait_time, remaining)
+                with self._cond:
+                    # The waiter ahead may have left since we looked; only sleep if it has not
+                    if self._waiters[0] != ticket or wait_time is not None:
+                        self._cond.wait(wait_time)
+        finally:
+            self._dequeue(ticket)
+            self.waited_seconds += time.monotonic() - start
+
+    async def acquire_async(self, priority: int = PRIORITY_INTERACTIVE,
+                            timeout: Optional[float] = None) -> bool:
+        """Awaitable acquire that polls instead of blocking the event loop"""
+        start = time.monotonic()
+        ticket = self._enqueue(priority)
+        try:
+            while True:
+                wait_time = None
+                if self._at_head(ticket):
+                    # A SQLite take can wait up to its busy timeout, so it runs off the loop
+                    if isinstance(self._state, SqliteBucketState):
+                        wait_time = await asyncio.to_thread(self._take)
+                    else:
+                        wait_time = self._take()
+                if wait_time == 0:
+                    return True
+                # Waiters ahead of us notify threads, not coroutines, so poll briefly
+                wait_time = RATE_LIMITS['ASYNC_POLL_SECONDS'] if wait_time is None else wait_time
+                if timeout is not None:
+                    remaining = timeout - (time.monotonic() - start)
+                    if remaining <= 0:
+                        return False
+                    wait_time = min(wait_time, remaining)
+                await asyncio.sleep(wait_time)
+        finally:
+            self._dequeue(ticket)
+            self.waited_seconds += time.monotonic() - start
+
+    def stats(self):
+        with self._cond:
+            return {
+                'rate': self.rate,
+                'capacity': self.capacity,
+                'granted': self.granted,
+                'waiting': len(self._waiters),
+                'waited_seconds': round(self.waited_seconds, 3)
+            }
+
+
+_limiter: Optional[TokenBucket] = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> TokenBucket:
+    """
+    Return the process-wide limiter shared by every TrainService
+    Set RAPIDAPI_RATE_LIMIT_DB to a SQLite path to share the quota between processes
+    """
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = TokenBucket(
+                    RATE_LIMITS['REQUESTS_PER_SECOND'],
+                    RATE_LIMITS['BURST'],
+                    os.getenv('RAPIDAPI_RATE_LIMIT_DB')
+                )
+    return _limiter
@@ -0,0 +1,292 @@
+"""
+Spoken answers rendered straight from API payloads, without the LLM
+
+Each renderer returns None when the payload does not have the fields it needs,
+in which case the caller falls back to LLM generation.
+"""
+import re
+from typing import Any, Callable, Dict, List, Optional
+
+from services.availability_calendar import seat_status_rank
+from utils.constants import TRAIN_CLASSES
+from utils.helpers import format_train_name
+
+MAX_SPOKEN_ITEMS = 4  # Passengers, classes or dates read out per answer
+
+
+def _first(item: Dict[str, Any], *keys: str) -> Any:
+    for key in keys:
+        if item.get(key) not in (None, ''):
+            return item[key]
+    return None
+
+
+def _class_name(code: str) -> str:
+    return TRAIN_CLASSES.get(str(code).upper(), str(code))
+
+
+def _rupees(amount: Any) -> str:
+    return f"{int(float(amount)):,} rupees"
+
+
+def _join(parts: List[str]) -> str:
+    if len(parts) <= 1:
+        return ''.join(parts)
+    return f"{', '.join(parts[:-1])} and {parts[-1]}"
+
+
+def _sentence(text: str) -> str:
+    return text[:1].upper() + text[1:]
+
+
+def _train_label(number: Any, name: Any) -> str:
+    return f"train {number} {format_train_name(str(name))}" if name else f"train {number}"
+
+
+def speak_booking_status(status: str) -> str:
+    """Read a booking status like CNF/B2/34, RLWL/4 or RAC 12 out loud"""
+    parts = [p for p in re.split(r'[/\s,]+', status.strip().upper()) if p]
+    if not parts:
+        return status
+    head = parts[0]
+    if head.startswith('CNF') or head == 'CONFIRMED':
+        seat = parts[1:3]
+        return f"confirmed, coach {seat[0]} berth {seat[1]}" if len(seat) == 2 else "confirmed"
+    if head.startswith('RAC'):
+        number = re.sub(r'\D', '', ''.join(parts[:2]))
+        return f"RAC {number}" if number else "RAC"
+    match = re.match(r'^([A-Z]*WL)(\d*)$', head)
+    if match:
+        number = match.group(2) or (parts[1] if len(parts) > 1 and parts[1].isdigit() else '')
+        return f"waitlisted at {int(number)}" if number else "waitlisted"
+    if head.startswith('CAN'):
+        return "cancelled"
+    return status
+
+
+def speak_seat_status(status: str) -> str:
+    """Read a seat availability status like AVAILABLE-0042 or GNWL45/WL20 out loud"""
+    upper = status.strip().upper()
+    match = re.match(r'^(?:CURR_)?AVAILABLE[-\s]*0*(\d+)', upper)
+    if match:
+        return f"{int(match.group(1))} seats available"
+    if 'REGRET' in upper or 'NOT AVAILABLE' in upper:
+        return "not available"
+    match = re.search(r'WL\s*0*(\d+)\s*$', upper)
+    if match:
+        return f"waitlist {int(match.group(1))}"
+    match = re.match(r'^RAC\s*0*(\d+)', upper)
+    if match:
+        return f"RAC {int(match.group(1))}"
+    return status.lower()
+
+
+def render_pnr_status(data: Dict[str, Any], details: Dict[str, Any]) -> Optional[str]:
+    passengers = _first(data, 'PassengerStatus', 'passengerList', 'passengers')
+    train_number = _first(data, 'TrainNo', 'trainNumber', 'train_number')
+    if not isinstance(passengers, list) or not passengers or not train_number:
+        return None
+
+    statuses = []
+    for position, passenger in enumerate(passengers[:MAX_SPOKEN_ITEMS], start=1):
+        current = _first(passenger, 'CurrentStatus', 'currentStatus', 'current_status')
+        if not current:
+            return None
+        number = _first(passenger, 'Number', 'passengerSerialNumber', 'number') or position
+        statuses.append(f"passenger {number} is {speak_booking_status(str(current))}")
+
+    pnr = _first(data, 'Pnr', 'pnrNumber', 'pnr') or details.get('pnr_number')
+    journey = _train_label(train_number, _first(data, 'TrainName', 'trainName', 'train_name'))
+    route = [_first(data, 'From', 'sourceStation', 'from'), _first(data, 'To', 'destinationStation', 'to')]
+    if all(route):
+        journey += f" from {route[0]} to {route[1]}"
+    travel_date = _first(data, 'Doj', 'dateOfJourney', 'doj')
+    if travel_date:
+        journey += f" on {travel_date}"
+
+    response = f"PNR {pnr} is for {journey}. {_sentence(_join(statuses))}."
+    if len(passengers) > MAX_SPOKEN_ITEMS:
+        response += f" There are {len(passengers) - MAX_SPOKEN_ITEMS} more passengers on this booking."
+    chart = _first(data, 'ChartPrepared', 'chartStatus', 'chart_prepared')
+    if chart is True:
+        response += " The chart has been prepared."
+    elif chart is False:
+        response += " The chart is not prepared yet."
+    return response
+
+
+def render_live_status(data: Dict[str, Any], details: Dict[str, Any]) -> Optional[str]:
+    station = _first(data, 'current_station_name', 'currentStationName', 'current_station')
+    train_number = _first(data, 'train_number', 'trainNumber') or details.get('train_number')
+    if not station or not train_number:
+        return None
+
+    label = _sentence(_train_label(train_number, _first(data, 'train_name', 'trainName')))
+    response = f"{label} is at {format_train_name(str(station))}"
+    delay = _first(data, 'delay', 'delay_in_minutes', 'late_minutes')
+    if delay is not None:
+        minutes = int(float(delay))
+        response += f", running {minutes} minutes late" if minutes > 0 else ", running on time"
+    response += "."
+
+    upcoming = _first(data, 'upcoming_stations', 'upcomingStations')
+    if isinstance(upcoming, list) and upcoming:
+        next_stop = upcoming[0]
+        name = _first(next_stop, 'station_name', 'stationName', 'station_code')
+        eta = _first(next_stop, 'eta', 'sta', 'arrival_time')
+        if name:
+            response += f" Next stop is {format_train_name(str(name))}"
+            response += f", expected at {eta}." if eta and eta != '--' else "."
+    return response
+
+
+def render_fare(data: Any, details: Dict[str, Any]) -> Optional[str]:
+    fares = data.get('general') if isinstance(data, dict) else data
+    if not isinstance(fares, list) or not fares:
+        return None
+
+    spoken = []
+    for fare in fares[:MAX_SPOKEN_ITEMS]:
+        class_type = _first(fare, 'classType', 'class_type', 'class')
+        amount = _first(fare, 'fare', 'total_fare', 'totalFare')
+        if not class_type or amount is None:
+            return None
+        spoken.append(f"{_class_name(class_type)} is {_rupees(amount)}")
+
+    label = f"train {details['train_number']}" if details.get('train_number') else "this train"
+    route = ''
+    if details.get('from_station') and details.get('to_station'):
+        route = f" from {details['from_station']} to {details['to_station']}"
+    return f"General quota fares on {label}{route}: {_join(spoken)}."
+
+
+def render_seat_availability(data: Any, details: Dict[str, Any]) -> Optional[str]:
+    if not isinstance(data, list) or not data:
+        return None
+
+    spoken = []
+    for day in data[:MAX_SPOKEN_ITEMS]:
+        travel_date = _first(day, 'date', 'travel_date')
+        status = _first(day, 'current_status', 'currentStatus', 'availability')
+        if not travel_date or not status:
+            return None
+        spoken.append(f"on {travel_date}, {speak_seat_status(str(status))}")
+
+    label = f"train {details['train_number']}" if details.get('train_number') else "this train"
+    class_name = f" in {_class_name(details['class_type'])}" if details.get('class_type') else ''
+    response = f"For {label}{class_name}: {_join(spoken)}."
+    fare = _first(data[0], 'total_fare', 'totalFare', 'fare')
+    if fare is not None:
+        response += f" The fare is {_rupees(fare)}."
+    return response
+
+
+def render_availability_calendar(data: Dict[str, Any], details: Dict[str, Any]) -> Optional[str]:
+    best = data.get('best')
+    dates = data.get('dates')
+    if not best or not isinstance(dates, list):
+        return None
+    day_names = {day['date']: f"{day['day']} {day['display']}" for day in dates}
+
+    label = f"train {data.get('train_number') or details.get('train_number')}"
+    best_text = f"{day_names.get(best['date'], best['date'])} in {_class_name(best['class_type'])}"
+    status = speak_seat_status(str(best['status']))
+    if seat_status_rank(best['status'])[0] == 0:
+        response = f"The best day on {label} is {best_text}, with {status}."
+    else:
+        response = f"No day on {label} has confirmed seats. The best option is {best_text}, {status}."
+
+    spoken = []
+    for class_type, statuses in list(data.get('grid', {}).items())[:MAX_SPOKEN_ITEMS]:
+        open_days = sum(1 for status in statuses if status and seat_status_rank(status)[0] == 0)
+        spoken.append(f"{_class_name(class_type)} has seats on {open_days} of {len(dates)} days")
+    if spoken:
+        response += f" {_sentence(_join(spoken))}."
+    if data.get('complete') is False:
+        response += " Some days could not be checked in time."
+    return response
+
+
+def render_train_search(data: Any, details: Dict[str, Any]) -> Optional[str]:
+    trains = data if isinstance(data, list) else [data]
+    spoken = []
+    for train in trains[:MAX_SPOKEN_ITEMS]:
+        number = _first(train, 'train_number', 'train_no')
+        if not number:
+            return None
+        train_text = _train_label(number, _first(train, 'train_name'))
+        departure = _first(train, 'from_std', 'departure_time')
+        if departure:
+            train_text += f" leaving at {departure}"
+        spoken.append(train_text)
+
+    route = ''
+    if details.get('from_station') and details.get('to_station'):
+        route = f" from {details['from_station']} to {details['to_station']}"
+    count = f"{len(trains)} trains" if len(trains) != 1 else "one train"
+    return f"I found {count}{route}: {_join(spoken)}."
+
+
+def render_train_schedule(data: Dict[str, Any], details: Dict[str, Any]) -> Optional[str]:
+    stops = _first(data, 'route', 'stations')
+    if not isinstance(stops, list) or len(stops) < 2:
+        return None
+    first, last = stops[0], stops[-1]
+    origin = _first(first, 'station_name', 'stationName', 'station_code')
+    destination = _first(last, 'station_name', 'stationName', 'station_code')
+    if not origin or not destination:
+        return None
+
+    number = details.get('train_number') or _first(data, 'train_number')
+    label = _sentence(_train_label(number, _first(data, 'train_name')) if number else "this train")
+    response = f"{label} runs from {format_train_name(str(origin))} to {format_train_name(str(destination))}"
+    response += f" with {len(stops) - 2} stops in between." if len(stops) > 2 else "."
+    departure = _first(first, 'std', 'departure_time')
+    arrival = _first(last, 'sta', 'arrival_time')
+    if departure and departure != '--' and arrival and arrival != '--':
+        response += f" It leaves at {departure} and arrives at {arrival}."
+    return response
+
+
+TEMPLATE_RENDERERS: Dict[str, Callable[[Any, Dict[str, Any]], Optional[str]]] = {
+    'pnr_status': render_pnr_status,
+    'live_status': render_live_status,
+    'fare_check': render_fare,
+    'seat_availability': render_seat_availability,
+    'availability_calendar': render_availability_calendar,
+}
+
+
+def render_template_response(query_type: str, result: Dict[str, Any],
+                             details: Optional[Dict[str, Any]] = None) -> Optional[str]:
+    """Voice-ready answer for a successful API result, None when no template fits"""
+    renderer = TEMPLATE_RENDERERS.get(query_type)
+    data = result.get('data')
+    if renderer is None or not data:
+        return None
+    try:
+        return renderer(data, details or {})
+    except (AttributeError, KeyError, TypeError, ValueError) as e:
+        print(f"Template rendering failed for {query_type}: {str(e)}")
+        return None
+
+
+# Plainer answers for query types normally left to the LLM, used when it runs out of time
+FALLBACK_RENDERERS: Dict[str, Callable[[Any, Dict[str, Any]], Optional[str]]] = {
+    'train_search': render_train_search,
+    'train_schedule': render_train_schedule,
+}
+
+
+def render_fallback_response(query_type: str, result: Dict[str, Any],
+                             details: Optional[Dict[str, Any]] = None) -> Optional[str]:
+    """Deterministic answer when LLM generation misses the turn budget, None when nothing fits"""
+    response = render_template_response(query_type, result, details)
+    renderer = FALLBACK_RENDERERS.get(query_type)
+    if response is not None or renderer is None or not result.get('data'):
+        return response
+    try:
+        return renderer(result['data'], details or {})
+    except (AttributeError, KeyError, TypeError, ValueError) as e:
+        print(f"Fallback rendering failed for {query_type}: {str(e)}")
+        return None
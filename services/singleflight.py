@@ -0,0 +1,104 @@
+"""Coalesce concurrent identical upstream calls into a single request"""
+import asyncio
+import copy
+import threading
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+
+class _Call:
+    """An in-flight call that other threads can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Any = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Thread-based single-flight group
+    The first caller for a key runs the function; callers that arrive while it is
+    running block until it finishes and receive their own copy of its result
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self.executed = 0
+        self.shared = 0
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = _Call()
+                self._calls[key] = call
+                self.executed += 1
+            else:
+                call.waiters += 1
+                self.shared += 1
+
+        if not is_leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                has_waiters = call.waiters > 0
+            call.done.set()
+
+        # Keep the shared result pristine while waiters are still copying it
+        return copy.deepcopy(call.result) if has_waiters else call.result
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'executed': self.executed,
+                'shared': self.shared,
+                'in_flight': len(self._calls)
+            }
+
+
+class AsyncSingleFlight:
+    """
+    asyncio single-flight group
+    The shared work runs as its own task, so a caller being cancelled (for example by
+    a timeout) does not cancel the request for everyone else waiting on it
+    """
+
+    def __init__(self):
+        self._tasks: Dict[Tuple[int, str], asyncio.Task] = {}
+        self.executed = 0
+        self.shared = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        # Tasks belong to one loop, so keep separate groups per running loop
+        task_key = (id(asyncio.get_running_loop()), key)
+        task = self._tasks.get(task_key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._tasks[task_key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(task_key, None))
+            self.executed += 1
+        else:
+            self.shared += 1
+
+        # Every caller gets its own copy so nobody mutates the shared result
+        return copy.deepcopy(await asyncio.shield(task))
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'executed': self.executed,
+            'shared': self.shared,
+            'in_flight': len(self._tasks)
+        }
@@ -0,0 +1,262 @@
+"""
+Persistent timetable store that answers trains-between-stations queries locally
+
+Filled from API responses as they pass through the train services:
+- getTrainSchedule gives each train's stops and, when present, its running days
+- trainBetweenStations gives the list of trains serving a station pair on a date
+
+A dated response may leave out trains that do not run that day, so it is kept as
+the pair's snapshot for that weekday only. A pair is answered locally only for the
+weekdays a trainBetweenStations response has been seen for, because schedules
+alone cannot prove that no other train serves the pair.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Optional
+
+from utils.constants import TIMETABLE
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'timetable.db')
+
+DAY_NAMES = ['MON', 'TUE', 'WED', 'THU', 'FRI', 'SAT', 'SUN']
+ALL_DAYS = 0b1111111
+
+
+def parse_running_days(value: Any) -> Optional[int]:
+    """
+    Convert the API's running-days field to a bitmap (bit 0 = Monday)
+    Accepts lists of day names, {'Mon': True, ...} dicts and 7-character strings
+    such as '1111100' or 'YYYYYNN'
+    """
+    if not value:
+        return None
+
+    if isinstance(value, dict):
+        value = [day for day, runs in value.items() if runs in (True, 1, '1', 'Y', 'y')]
+
+    if isinstance(value, str):
+        compact = value.replace(',', '').replace(' ', '')
+        if len(compact) == 7 and all(ch in '01YNyn' for ch in compact):
+            return sum(1 << i for i, ch in enumerate(compact) if ch in '1Yy')
+        if compact.upper() in ('DAILY', 'ALL'):
+            return ALL_DAYS
+        value = value.replace(',', ' ').split()
+
+    bitmap = 0
+    for day in value:
+        prefix = str(day).strip().upper()[:3]
+        if prefix in DAY_NAMES:
+            bitmap |= 1 << DAY_NAMES.index(prefix)
+    return bitmap or None
+
+
+def _first(item: Dict[str, Any], *keys: str) -> Any:
+    for key in keys:
+        if item.get(key) not in (None, ''):
+            return item[key]
+    return None
+
+
+class TimetableStore:
+    """SQLite-backed timetable with a station-pair index and running-day bitmaps"""
+
+    def __init__(self, path: str = DEFAULT_DB_PATH):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        with self._lock, self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS trains (
+                    train_no TEXT PRIMARY KEY,
+                    train_name TEXT,
+                    running_days INTEGER,
+                    updated_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS stops (
+                    train_no TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    station_code TEXT NOT NULL,
+                    arrival TEXT,
+                    departure TEXT,
+                    day INTEGER NOT NULL,
+                    PRIMARY KEY (train_no, seq)
+                );
+                CREATE INDEX IF NOT EXISTS stops_by_station ON stops (station_code, train_no);
+                -- Pair snapshots from before they were kept per weekday
+                DROP TABLE IF EXISTS pairs;
+                DROP TABLE IF EXISTS pair_trains;
+                CREATE TABLE IF NOT EXISTS pair_days (
+                    from_code TEXT NOT NULL,
+                    to_code TEXT NOT NULL,
+                    weekday INTEGER NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (from_code, to_code, weekday)
+                );
+                CREATE TABLE IF NOT EXISTS pair_day_trains (
+                    from_code TEXT NOT NULL,
+                    to_code TEXT NOT NULL,
+                    weekday INTEGER NOT NULL,
+                    train_no TEXT NOT NULL,
+                    running_days INTEGER,
+                    snapshot TEXT NOT NULL,
+                    PRIMARY KEY (from_code, to_code, weekday, train_no)
+                );
+            """)
+
+    def ingest_schedule(self, train_number: str, response: Dict[str, Any]):
+        """Store the stops and running days from a getTrainSchedule response"""
+        data = response.get('data') or {}
+        route = data.get('route') if isinstance(data, dict) else data
+        if not isinstance(route, list) or not route:
+            return
+
+        stops = []
+        for seq, stop in enumerate(route):
+            code = _first(stop, 'station_code', 'stationCode', 'code')
+            if not code:
+                continue
+            day = _first(stop, 'day', 'day_count', 'dayCount') or 1
+            stops.append((train_number, seq, str(code).upper(),
+                          _first(stop, 'sta', 'arrival_time', 'arrivalTime'),
+                          _first(stop, 'std', 'departure_time', 'departureTime'),
+                          int(day)))
+
+        info = data if isinstance(data, dict) else {}
+        running_days = parse_running_days(_first(info, 'running_days', 'run_days', 'runningDays', 'days_of_run'))
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO trains (train_no, train_name, running_days, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(train_no) DO UPDATE SET "
+                "train_name = COALESCE(excluded.train_name, train_name), "
+                "running_days = COALESCE(excluded.running_days, running_days), "
+                "updated_at = excluded.updated_at",
+                (train_number, _first(info, 'train_name', 'trainName'), running_days, time.time())
+            )
+            self._conn.execute("DELETE FROM stops WHERE train_no = ?", (train_number,))
+            self._conn.executemany("INSERT INTO stops VALUES (?, ?, ?, ?, ?, ?)", stops)
+
+    def ingest_trains_between(self, from_code: str, to_code: str, journey_date: str, response: Dict[str, Any]):
+        """Record the trains serving a pair on journey_date's weekday from a trainBetweenStations response"""
+        trains = response.get('data')
+        if not isinstance(trains, list):
+            return
+        weekday = datetime.strptime(journey_date, '%Y-%m-%d').weekday()
+
+        rows = []
+        for train in trains:
+            train_no = _first(train, 'train_number', 'train_no', 'trainNumber')
+            if not train_no:
+                continue
+            rows.append((from_code, to_code, weekday, str(train_no),
+                         parse_running_days(_first(train, 'run_days', 'running_days', 'runningDays')),
+                         json.dumps(train)))
+
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM pair_day_trains WHERE from_code = ? AND to_code = ? AND weekday = ?",
+                               (from_code, to_code, weekday))
+            self._conn.executemany("INSERT INTO pair_day_trains VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self._conn.execute("INSERT OR REPLACE INTO pair_days VALUES (?, ?, ?, ?)",
+                               (from_code, to_code, weekday, time.time()))
+
+    def _departure_weekday_ok(self, train_no: str, from_code: str, pair_days: Optional[int],
+                              journey_date: date) -> Optional[bool]:
+        """Whether the train leaves from_code on journey_date, None when unknown"""
+        if pair_days is not None:
+            return bool(pair_days & (1 << journey_date.weekday()))
+
+        # Fall back to origin running days shifted by the day the train reaches from_code
+        row = self._conn.execute(
+            "SELECT t.running_days, s.day FROM trains t JOIN stops s ON s.train_no = t.train_no "
+            "WHERE t.train_no = ? AND s.station_code = ?", (train_no, from_code)
+        ).fetchone()
+        if not row or row[0] is None:
+            return None
+        origin_date = journey_date - timedelta(days=row[1] - 1)
+        return bool(row[0] & (1 << origin_date.weekday()))
+
+    def trains_between(self, from_code: str, to_code: str, journey_date: str) -> Optional[Dict[str, Any]]:
+        """
+        Answer a trainBetweenStations query locally
+        Returns None when the pair has not been seen on journey_date's weekday, that
+        snapshot is too old, or a train's running days are unknown
+        """
+        day = datetime.strptime(journey_date, '%Y-%m-%d').date()
+        with self._lock:
+            pair = self._conn.execute(
+                "SELECT updated_at FROM pair_days WHERE from_code = ? AND to_code = ? AND weekday = ?",
+                (from_code, to_code, day.weekday())
+            ).fetchone()
+            if not pair:
+                return None
+            age = time.time() - pair[0]
+            if age > TIMETABLE['MAX_AGE_SECONDS']:
+                return None
+
+            running = []
+            for train_no, pair_days, snapshot in self._conn.execute(
+                "SELECT train_no, running_days, snapshot FROM pair_day_trains "
+                "WHERE from_code = ? AND to_code = ? AND weekday = ?",
+                (from_code, to_code, day.weekday())
+            ).fetchall():
+                train = json.loads(snapshot)
+                runs = self._departure_weekday_ok(train_no, from_code, pair_days, day)
+                if runs is None:
+                    return None
+                if runs:
+                    train['train_date'] = day.strftime('%d-%m-%Y')
+                    running.append(train)
+
+        if age > TIMETABLE['REFRESH_AFTER_SECONDS']:
+            self.refresh_in_background(from_code, to_code, journey_date)
+
+        return {
+            'success': True,
+            'status': True,
+            'source': 'timetable',
+            'data': running
+        }
+
+    def refresh_in_background(self, from_code: str, to_code: str, journey_date: str):
+        """Re-fetch a stale pair snapshot from the API at prefetch priority, at most once at a time"""
+        key = (from_code, to_code, datetime.strptime(journey_date, '%Y-%m-%d').weekday())
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            # Imported here because train_service feeds this store
+            from .rate_limiter import PRIORITY_PREFETCH
+            from .train_service import TrainService
+            try:
+                service = TrainService(priority=PRIORITY_PREFETCH)
+                params = {"fromStationCode": from_code, "toStationCode": to_code, "dateOfJourney": journey_date}
+                # Straight to the API: a cached answer would just be the stale snapshot again.
+                # _fetch feeds a good answer back into this store
+                service._fetch("api/v3/trainBetweenStations", params)
+            except Exception as e:
+                print(f"Timetable refresh error for {from_code}-{to_code}: {str(e)}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+
+_store: Optional[TimetableStore] = None
+_store_lock = threading.Lock()
+
+
+def get_timetable_store() -> TimetableStore:
+    """Return the shared timetable store (TIMETABLE_DB_PATH, default data/timetable.db)"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = TimetableStore(os.getenv('TIMETABLE_DB_PATH', DEFAULT_DB_PATH))
+    return _store
@@ -1,29 +1,71 @@
 import os
 import json
-import requests
 from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Optional, NamedTuple, Union
 from dotenv import load_dotenv
 from .date_service import parse_date_time, is_valid_travel_date
+from .api_recorder import record_response
+from .cache import TTLCache, make_cache_key
+from .http_client import get_transport
+from .rate_limiter import PRIORITY_INTERACTIVE
+from .timetable_store import get_timetable_store
+from .singleflight import SingleFlight
+from utils.constants import API_CACHE_TTL_SECONDS, API_CACHE_LIMITS
 from utils.helpers import is_valid_station_code, is_valid_train_number, is_valid_pnr
+from utils.station_index import get_station_index
 
 # Load environment variables
 load_dotenv()
 DEBUG_MODE = os.getenv('DEBUG_MODE', 'False').lower() == 'true'
 
-class TrainService:
-    def __init__(self):
+# Responses shared by every TrainService/AsyncTrainService in the process
+response_cache = TTLCache(API_CACHE_LIMITS['MAX_ENTRIES'], API_CACHE_LIMITS['MAX_BYTES'])
+
+# Identical requests already on the wire from other threads
+inflight_requests = SingleFlight()
+
+
+def is_cacheable_response(result: Any) -> bool:
+    """
+    Only keep well-formed responses that the API did not flag as failures
+    RapidAPI error bodies ({'message': 'Too many requests'}) carry no success, status
+    or data at all, so one of those must be present and truthy
+    """
+    return (isinstance(result, dict)
+            and result.get('success', True) is not False
+            and result.get('status', True) is not False
+            and any(result.get(key) for key in ('success', 'status', 'data')))
+
+
+class ApiCall(NamedTuple):
+    """A validated IRCTC API request, ready to be sent by a sync or async service"""
+    query_type: str
+    endpoint: str
+    params: Dict[str, Any]
+    date_info: Optional[Dict[str, Any]] = None
+
+# Responses _finish_request writes to the timetable store
+TIMETABLE_ENDPOINTS = ("api/v1/getTrainSchedule", "api/v3/trainBetweenStations")
+
+
+class BaseTrainService:
+    """Validation and request building shared by TrainService and AsyncTrainService"""
+
+    def __init__(self, priority: int = PRIORITY_INTERACTIVE):
         self.api_key = os.getenv('RAPIDAPI_KEY')
-        self.base_url = "https://irctc1.p.rapidapi.com"
+        # IRCTC_BASE_URL can point the services at a local replay server
+        self.base_url = os.getenv('IRCTC_BASE_URL', "https://irctc1.p.rapidapi.com").rstrip('/')
         self.headers = {
             "x-rapidapi-key": self.api_key,
             "x-rapidapi-host": "irctc1.p.rapidapi.com"
         }
         self.debug_mode = DEBUG_MODE
+        # Rate limiter priority class for calls made by this instance
+        self.priority = priority
 
     def format_debug_response(self, query_type: str, params: Dict[str, Any]) -> Dict[str, Any]:
         """Format a debug response explaining what would be sent to the API"""
-        
+
         # Map query types to human readable descriptions
         query_descriptions = {
             'train_search': 'search for trains',
@@ -36,7 +78,7 @@ class TrainService:
 
         # Build understanding explanation
         understanding = f"I understand you want to {query_descriptions.get(query_type, 'make a query')}.\n\n"
-        
+
         # Add parameter explanations
         if 'fromStationCode' in params and 'toStationCode' in params:
             understanding += f"From: {params['fromStationCode']}\n"
@@ -57,12 +99,12 @@ class TrainService:
             understanding += f"Quota: {params['quota']}\n"
         if 'date' in params:
             understanding += f"Date: {params['date']}\n"
-        
+
         # Add API request details
         understanding += f"\nIn non-debug mode, I would make an API request to:\n"
         understanding += f"Endpoint: {self.base_url}/api/v3/{query_type}\n"
         understanding += f"Parameters: {json.dumps(params, indent=2)}"
-        
+
         return {
             'success': True,
             'debug': True,
@@ -71,12 +113,229 @@ class TrainService:
             'params': params
         }
 
+    def _get_cached(self, endpoint: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Return a cached response for this request, if the endpoint is cacheable and fresh"""
+        if endpoint not in API_CACHE_TTL_SECONDS:
+            return None
+        return response_cache.get(self._request_key(endpoint, params))
+
+    def _store_cached(self, endpoint: str, params: Dict[str, Any], result: Dict[str, Any]):
+        """Cache a response under the endpoint's TTL"""
+        ttl = API_CACHE_TTL_SECONDS.get(endpoint)
+        if ttl and is_cacheable_response(result):
+            response_cache.set(self._request_key(endpoint, params), result, ttl)
+
+    def _request_key(self, endpoint: str, params: Dict[str, Any]) -> str:
+        """Identity of a request, for the response cache and in-flight deduplication"""
+        return make_cache_key(endpoint, params, self.base_url)
+
+    @staticmethod
+    def cache_stats() -> Dict[str, Any]:
+        """Hit/miss/eviction counters of the shared response cache"""
+        return response_cache.stats()
+
+    def _ingest_timetable(self, endpoint: str, params: Dict[str, Any], result: Dict[str, Any]):
+        """Feed a fresh timetable response to the local store so later queries skip the API"""
+        if not is_cacheable_response(result):
+            return
+        if endpoint == "api/v1/getTrainSchedule":
+            get_timetable_store().ingest_schedule(params['trainNo'], result)
+        elif endpoint == "api/v3/trainBetweenStations":
+            get_timetable_store().ingest_trains_between(
+                params['fromStationCode'], params['toStationCode'], params['dateOfJourney'], result
+            )
+
+    def _finish_request(self, call: ApiCall, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Attach request context to a successful API result"""
+        if call.date_info and result.get('success', False):
+            result['date_info'] = call.date_info
+        return result
+
+    def _prepare_search_train(self, train_number: str) -> Union[ApiCall, Dict[str, Any]]:
+        if not is_valid_train_number(train_number):
+            return {
+                'success': False,
+                'error': 'Invalid train number format'
+            }
+
+        return ApiCall('train_search', "api/v1/searchTrain", {"query": train_number})
+
+    def _prepare_search_station(self, station_code: str) -> Union[ApiCall, Dict[str, Any]]:
+        # Answer known stations from the offline index; only misses go to the API
+        station = None if self.debug_mode else get_station_index().get(station_code)
+        if station:
+            return {
+                'success': True,
+                'status': True,
+                'source': 'station_index',
+                'data': [{'code': station['code'], 'name': station['name'], 'eng_name': station['name']}]
+            }
+
+        return ApiCall('station_search', "api/v1/searchStation", {"query": station_code.upper()})
+
+    def _prepare_trains_between_stations(self, from_station: str, to_station: str,
+                                         date_string: Optional[str] = None) -> Union[ApiCall, Dict[str, Any]]:
+        # Validate station codes
+        if not all(is_valid_station_code(code) for code in [from_station, to_station]):
+            return {
+                'success': False,
+                'error': 'Invalid station code format'
+            }
+
+        # Base params
+        params = {
+            "fromStationCode": from_station.upper(),
+            "toStationCode": to_station.upper()
+        }
+
+        # Handle date parameter
+        try:
+            # If no date provided, use today
+            if not date_string:
+                date_string = 'today'
+
+            # Convert date to required format (YYYY-MM-DD)
+            if isinstance(date_string, str):
+                if date_string.lower() == 'tomorrow':
+                    target_date = datetime.now() + timedelta(days=1)
+                elif date_string.lower() == 'today':
+                    target_date = datetime.now()
+                else:
+                    # Try to parse the provided date
+                    target_date = datetime.strptime(date_string, '%Y-%m-%d')
+
+                params["dateOfJourney"] = target_date.strftime('%Y-%m-%d')
+        except Exception as e:
+            print(f"Date conversion error: {str(e)}")
+            # If date conversion fails, use today's date
+            params["dateOfJourney"] = datetime.now().strftime('%Y-%m-%d')
+
+        # Timetables rarely change, so answer known station pairs from the local store
+        if not self.debug_mode:
+            local_result = get_timetable_store().trains_between(
+                params["fromStationCode"], params["toStationCode"], params["dateOfJourney"]
+            )
+            if local_result:
+                return local_result
+
+        print(f"Making API request with params: {json.dumps(params, indent=2)}")
+        return ApiCall('train_search', "api/v3/trainBetweenStations", params)
+
+    def _prepare_live_train_status(self, train_number: str, start_day: str = "1") -> Union[ApiCall, Dict[str, Any]]:
+        if not is_valid_train_number(train_number):
+            return {
+                'success': False,
+                'error': 'Invalid train number format'
+            }
+
+        params = {
+            "trainNo": train_number,
+            "startDay": start_day
+        }
+        return ApiCall('live_status', "api/v1/liveTrainStatus", params)
+
+    def _prepare_train_schedule(self, train_number: str) -> Union[ApiCall, Dict[str, Any]]:
+        if not is_valid_train_number(train_number):
+            return {
+                'success': False,
+                'error': 'Invalid train number format'
+            }
+
+        return ApiCall('train_schedule', "api/v1/getTrainSchedule", {"trainNo": train_number})
+
+    def _prepare_pnr_status(self, pnr_number: str) -> Union[ApiCall, Dict[str, Any]]:
+        if not is_valid_pnr(pnr_number):
+            return {
+                'success': False,
+                'error': 'Invalid PNR number format'
+            }
+
+        return ApiCall('pnr_status', "api/v3/getPNRStatus", {"pnrNumber": pnr_number})
+
+    def _prepare_seat_availability(self, train_number: str, from_station: str,
+                                   to_station: str, date_string: str,
+                                   class_type: str, quota: str = "GN") -> Union[ApiCall, Dict[str, Any]]:
+        # Validate inputs
+        if not is_valid_train_number(train_number):
+            return {
+                'success': False,
+                'error': 'Invalid train number format'
+            }
+
+        if not all(is_valid_station_code(code) for code in [from_station, to_station]):
+            return {
+                'success': False,
+                'error': 'Invalid station code format'
+            }
+
+        # Parse and validate date
+        date_info = parse_date_time(date_string)
+        if not date_info['success'] or not is_valid_travel_date(date_info):
+            return {
+                'success': False,
+                'error': 'Invalid date',
+                'details': 'Please provide a valid future date'
+            }
+
+        params = {
+            "classType": class_type.upper(),
+            "fromStationCode": from_station.upper(),
+            "quota": quota.upper(),
+            "toStationCode": to_station.upper(),
+            "trainNo": train_number,
+            "date": date_info['formatted']['api_format']
+        }
+        return ApiCall('seat_availability', "api/v1/checkSeatAvailability", params, date_info)
+
+    def _prepare_train_classes(self, train_number: str) -> Union[ApiCall, Dict[str, Any]]:
+        if not is_valid_train_number(train_number):
+            return {
+                'success': False,
+                'error': 'Invalid train number format'
+            }
+
+        return ApiCall('train_classes', "api/v1/getTrainClasses", {"trainNo": train_number})
+
+    def _prepare_fare(self, train_number: str, from_station: str, to_station: str) -> Union[ApiCall, Dict[str, Any]]:
+        # Validate inputs
+        if not is_valid_train_number(train_number):
+            return {
+                'success': False,
+                'error': 'Invalid train number format'
+            }
+
+        if not all(is_valid_station_code(code) for code in [from_station, to_station]):
+            return {
+                'success': False,
+                'error': 'Invalid station code format'
+            }
+
+        params = {
+            "trainNo": train_number,
+            "fromStationCode": from_station.upper(),
+            "toStationCode": to_station.upper()
+        }
+        return ApiCall('fare_check', "api/v2/getFare", params)
+
+class TrainService(BaseTrainService):
+    def __init__(self, priority: int = PRIORITY_INTERACTIVE):
+        super().__init__(priority)
+        self.transport = get_transport()
+
     def _make_request(self, endpoint: str, params: Dict[str, Any]) -> Dict[str, Any]:
-        """Make a request to the IRCTC API"""
+        """
+        Make a request to the IRCTC API, serving repeats from the response cache
+        Concurrent identical requests from other threads share a single upstream call
+        """
+        cached = self._get_cached(endpoint, params)
+        if cached is not None:
+            return cached
+
         try:
-            url = f"{self.base_url}/{endpoint}"
-            response = requests.get(url, headers=self.headers, params=params)
-            return response.json()
+            return inflight_requests.do(
+                self._request_key(endpoint, params),
+                lambda: self._fetch(endpoint, params)
+            )
         except Exception as e:
             print(f"API request error: {str(e)}")
             return {
@@ -84,22 +343,32 @@ class TrainService:
                 'error': str(e)
             }
 
+    def _fetch(self, endpoint: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Call the API, bypassing the response cache, and cache the response"""
+        url = f"{self.base_url}/{endpoint}"
+        result = self.transport.get_json(url, endpoint, self.headers, params, self.priority)
+        record_response(endpoint, params, result)
+        self._store_cached(endpoint, params, result)
+        if endpoint in TIMETABLE_ENDPOINTS:
+            self._ingest_timetable(endpoint, params, result)
+        return result
+
+    def _execute(self, prepared: Union[ApiCall, Dict[str, Any]]) -> Dict[str, Any]:
+        """Send a prepared call, or pass a validation error straight through"""
+        if not isinstance(prepared, ApiCall):
+            return prepared
+
+        # If in debug mode, return understanding instead of making API call
+        if self.debug_mode:
+            return self.format_debug_response(prepared.query_type, prepared.params)
+
+        result = self._make_request(prepared.endpoint, prepared.params)
+        return self._finish_request(prepared, result)
+
     def search_train(self, train_number: str) -> Dict[str, Any]:
         """Search train by number"""
         try:
-            if not is_valid_train_number(train_number):
-                return {
-                    'success': False,
-                    'error': 'Invalid train number format'
-                }
-
-            params = {"query": train_number}
-            
-            # If in debug mode, return understanding instead of making API call
-            if self.debug_mode:
-                return self.format_debug_response('train_search', params)
-                
-            return self._make_request("api/v1/searchTrain", params)
+            return self._execute(self._prepare_search_train(train_number))
         except Exception as e:
             return {
                 'success': False,
@@ -110,13 +379,7 @@ class TrainService:
     def search_station(self, station_code: str) -> Dict[str, Any]:
         """Search station by code"""
         try:
-            params = {"query": station_code.upper()}
-            
-            # If in debug mode, return understanding instead of making API call
-            if self.debug_mode:
-                return self.format_debug_response('station_search', params)
-                
-            return self._make_request("api/v1/searchStation", params)
+            return self._execute(self._prepare_search_station(station_code))
         except Exception as e:
             return {
                 'success': False,
@@ -127,52 +390,7 @@ class TrainService:
     def get_trains_between_stations(self, from_station: str, to_station: str, date_string: Optional[str] = None) -> Dict[str, Any]:
         """Get trains between stations using v3 API"""
         try:
-            # Validate station codes
-            if not all(is_valid_station_code(code) for code in [from_station, to_station]):
-                return {
-                    'success': False,
-                    'error': 'Invalid station code format'
-                }
-
-            # Base params
-            params = {
-                "fromStationCode": from_station.upper(),
-                "toStationCode": to_station.upper()
-            }
-
-            # Handle date parameter
-            try:
-                # If no date provided, use today
-                if not date_string:
-                    date_string = 'today'
-                
-                # Convert date to required format (YYYY-MM-DD)
-                if isinstance(date_string, str):
-                    if date_string.lower() == 'tomorrow':
-                        target_date = datetime.now() + timedelta(days=1)
-                    elif date_string.lower() == 'today':
-                        target_date = datetime.now()
-                    else:
-                        # Try to parse the provided date
-                        target_date = datetime.strptime(date_string, '%Y-%m-%d')
-                    
-                    params["dateOfJourney"] = target_date.strftime('%Y-%m-%d')
-            except Exception as e:
-                print(f"Date conversion error: {str(e)}")
-                # If date conversion fails, use today's date
-                params["dateOfJourney"] = datetime.now().strftime('%Y-%m-%d')
-
-            # If in debug mode, return understanding instead of making API call
-            if self.debug_mode:
-                return self.format_debug_response('train_search', params)
-
-            print(f"Making API request with params: {json.dumps(params, indent=2)}")
-            url = f"{self.base_url}/api/v3/trainBetweenStations"
-            response = requests.get(url, headers=self.headers, params=params)
-            result = response.json()
-            print(f"API response: {json.dumps(result, indent=2)}")
-            return result
-
+            return self._execute(self._prepare_trains_between_stations(from_station, to_station, date_string))
         except Exception as e:
             error_msg = str(e)
             print(f"Error getting trains between stations: {error_msg}")
@@ -185,22 +403,7 @@ class TrainService:
     def get_live_train_status(self, train_number: str, start_day: str = "1") -> Dict[str, Any]:
         """Get live train status"""
         try:
-            if not is_valid_train_number(train_number):
-                return {
-                    'success': False,
-                    'error': 'Invalid train number format'
-                }
-
-            params = {
-                "trainNo": train_number,
-                "startDay": start_day
-            }
-            
-            # If in debug mode, return understanding instead of making API call
-            if self.debug_mode:
-                return self.format_debug_response('live_status', params)
-                
-            return self._make_request("api/v1/liveTrainStatus", params)
+            return self._execute(self._prepare_live_train_status(train_number, start_day))
         except Exception as e:
             return {
                 'success': False,
@@ -211,19 +414,7 @@ class TrainService:
     def get_train_schedule(self, train_number: str) -> Dict[str, Any]:
         """Get train schedule"""
         try:
-            if not is_valid_train_number(train_number):
-                return {
-                    'success': False,
-                    'error': 'Invalid train number format'
-                }
-
-            params = {"trainNo": train_number}
-            
-            # If in debug mode, return understanding instead of making API call
-            if self.debug_mode:
-                return self.format_debug_response('train_schedule', params)
-                
-            return self._make_request("api/v1/getTrainSchedule", params)
+            return self._execute(self._prepare_train_schedule(train_number))
         except Exception as e:
             return {
                 'success': False,
@@ -234,19 +425,7 @@ class TrainService:
     def check_pnr_status(self, pnr_number: str) -> Dict[str, Any]:
         """Check PNR status using v3 API"""
         try:
-            if not is_valid_pnr(pnr_number):
-                return {
-                    'success': False,
-                    'error': 'Invalid PNR number format'
-                }
-
-            params = {"pnrNumber": pnr_number}
-            
-            # If in debug mode, return understanding instead of making API call
-            if self.debug_mode:
-                return self.format_debug_response('pnr_status', params)
-                
-            return self._make_request("api/v3/getPNRStatus", params)
+            return self._execute(self._prepare_pnr_status(pnr_number))
         except Exception as e:
             return {
                 'success': False,
@@ -254,51 +433,14 @@ class TrainService:
                 'details': str(e)
             }
 
-    def check_seat_availability(self, train_number: str, from_station: str, 
-                              to_station: str, date_string: str, 
+    def check_seat_availability(self, train_number: str, from_station: str,
+                              to_station: str, date_string: str,
                               class_type: str, quota: str = "GN") -> Dict[str, Any]:
         """Check seat availability"""
         try:
-            # Validate inputs
-            if not is_valid_train_number(train_number):
-                return {
-                    'success': False,
-                    'error': 'Invalid train number format'
-                }
-
-            if not all(is_valid_station_code(code) for code in [from_station, to_station]):
-                return {
-                    'success': False,
-                    'error': 'Invalid station code format'
-                }
-
-            # Parse and validate date
-            date_info = parse_date_time(date_string)
-            if not date_info['success'] or not is_valid_travel_date(date_info):
-                return {
-                    'success': False,
-                    'error': 'Invalid date',
-                    'details': 'Please provide a valid future date'
-                }
-
-            params = {
-                "classType": class_type.upper(),
-                "fromStationCode": from_station.upper(),
-                "quota": quota.upper(),
-                "toStationCode": to_station.upper(),
-                "trainNo": train_number,
-                "date": date_info['formatted']['api_format']
-            }
-            
-            # If in debug mode, return understanding instead of making API call
-            if self.debug_mode:
-                return self.format_debug_response('seat_availability', params)
-
-            result = self._make_request("api/v1/checkSeatAvailability", params)
-            if result.get('success', False):
-                result['date_info'] = date_info
-            return result
-
+            return self._execute(self._prepare_seat_availability(
+                train_number, from_station, to_station, date_string, class_type, quota
+            ))
         except Exception as e:
             return {
                 'success': False,
@@ -309,19 +451,7 @@ class TrainService:
     def get_train_classes(self, train_number: str) -> Dict[str, Any]:
         """Get available classes for a train"""
         try:
-            if not is_valid_train_number(train_number):
-                return {
-                    'success': False,
-                    'error': 'Invalid train number format'
-                }
-
-            params = {"trainNo": train_number}
-            
-            # If in debug mode, return understanding instead of making API call
-            if self.debug_mode:
-                return self.format_debug_response('train_classes', params)
-                
-            return self._make_request("api/v1/getTrainClasses", params)
+            return self._execute(self._prepare_train_classes(train_number))
         except Exception as e:
             return {
                 'success': False,
@@ -332,30 +462,7 @@ class TrainService:
     def get_fare(self, train_number: str, from_station: str, to_station: str) -> Dict[str, Any]:
         """Get fare details using v2 API"""
         try:
-            # Validate inputs
-            if not is_valid_train_number(train_number):
-                return {
-                    'success': False,
-                    'error': 'Invalid train number format'
-                }
-
-            if not all(is_valid_station_code(code) for code in [from_station, to_station]):
-                return {
-                    'success': False,
-                    'error': 'Invalid station code format'
-                }
-
-            params = {
-                "trainNo": train_number,
-                "fromStationCode": from_station.upper(),
-                "toStationCode": to_station.upper()
-            }
-            
-            # If in debug mode, return understanding instead of making API call
-            if self.debug_mode:
-                return self.format_debug_response('fare_check', params)
-                
-            return self._make_request("api/v2/getFare", params)
+            return self._execute(self._prepare_fare(train_number, from_station, to_station))
         except Exception as e:
             return {
                 'success': False,
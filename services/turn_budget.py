@@ -0,0 +1,94 @@
+"""
+Latency budget for one voice turn
+
+A TurnBudget is started when a query arrives; each slow stage (LLM extraction,
+the IRCTC call, answer generation) is awaited through run(), which cancels it
+when the budget runs out. The caller then answers from whatever data it
+already has. Fallbacks are counted per stage so the budget can be tuned from
+/metrics and the benchmark.
+"""
+import asyncio
+import math
+import threading
+import time
+from typing import Any, Awaitable, Dict, Optional
+
+from utils.constants import TURN_BUDGET
+
+_counts = {'turns': 0, 'fallbacks': {}}
+_lock = threading.Lock()
+
+
+class BudgetExceeded(Exception):
+    """A stage was cancelled (or never started) because the turn ran out of time"""
+
+    def __init__(self, stage: str):
+        super().__init__(f"Turn budget exceeded during {stage}")
+        self.stage = stage
+
+
+def record_fallback(stage: str):
+    """Count a fallback answer for stage"""
+    with _lock:
+        _counts['fallbacks'][stage] = _counts['fallbacks'].get(stage, 0) + 1
+
+
+def fallback_stats() -> Dict[str, Any]:
+    """Turns started and fallbacks per stage"""
+    with _lock:
+        turns = _counts['turns']
+        fallbacks = dict(_counts['fallbacks'])
+    total = sum(fallbacks.values())
+    return {
+        'turns': turns,
+        'fallbacks': fallbacks,
+        'fallback_rate': round(total / turns, 4) if turns else 0.0,
+    }
+
+
+def reset_fallback_stats():
+    """Zero the turn and fallback counters"""
+    with _lock:
+        _counts['turns'] = 0
+        _counts['fallbacks'] = {}
+
+
+class TurnBudget:
+    """Deadline shared by the stages of one turn"""
+
+    def __init__(self, seconds: Optional[float] = None):
+        self.seconds = TURN_BUDGET['TOTAL_SECONDS'] if seconds is None else seconds
+        self.deadline = time.monotonic() + self.seconds
+        # Time held back from the earlier stages so the answer can still be generated
+        self.answer_reserve = self.seconds * TURN_BUDGET['ANSWER_SHARE'] if math.isfinite(self.seconds) else 0.0
+        with _lock:
+            _counts['turns'] += 1
+
+    def remaining(self) -> float:
+        """Seconds left before the deadline, never negative"""
+        return max(0.0, self.deadline - time.monotonic())
+
+    def stage_timeout(self, reserve_answer: bool = False) -> Optional[float]:
+        """Seconds a stage started now may take, None when the budget is unlimited"""
+        if not math.isfinite(self.seconds):
+            return None
+        return self.remaining() - (self.answer_reserve if reserve_answer else 0.0)
+
+    async def run(self, stage: str, awaitable: Awaitable, reserve_answer: bool = False) -> Any:
+        """
+        Await awaitable within the time left, less the answer reserve when reserve_answer is set
+        Raises BudgetExceeded, after counting the fallback, when it would not finish in time
+        """
+        timeout = self.stage_timeout(reserve_answer)
+        if timeout is None:
+            return await awaitable
+        if timeout < TURN_BUDGET['MIN_STAGE_SECONDS']:
+            if asyncio.iscoroutine(awaitable):
+                awaitable.close()
+            record_fallback(stage)
+            raise BudgetExceeded(stage)
+        try:
+            return await asyncio.wait_for(awaitable, timeout)
+        except asyncio.TimeoutError:
+            record_fallback(stage)
+            raise BudgetExceeded(stage)
@@ -0,0 +1,86 @@
+"""
+Startup warm-up of the slow first-use work, off the request path
+
+dateparser loads its language data, arrow its locales, the station index and
+timetable store their files, and the API clients their connection pools the
+first time they are used. start_warmup runs all of that once in a background
+thread at server start, timing each step; readiness() reports progress for
+the health endpoint so traffic only goes to warmed workers.
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from services.date_service import parse_date_time
+from services.openai_service import warm_async_client
+from services.timetable_store import get_timetable_store
+from utils.station_index import get_station_index
+
+def _warm_dateparser():
+    # English and Hindi language data load separately, each on its first parse
+    for phrase in ('next week', 'अगले हफ्ते'):
+        parse_date_time(phrase, use_fast_path=False, use_cache=False)
+
+
+WARMUP_STEPS: Dict[str, Callable[[], Any]] = {
+    'dateparser': _warm_dateparser,
+    'arrow_humanize': lambda: parse_date_time('tomorrow', use_cache=False),
+    'station_index': get_station_index,
+    'timetable_store': get_timetable_store,
+    'openai_client': warm_async_client,
+}
+
+_state: Dict[str, Any] = {'ready': False, 'seconds': None, 'steps': {}}
+_lock = threading.Lock()
+_thread: Optional[threading.Thread] = None
+
+
+def run_warmup(steps: Dict[str, Callable[[], Any]]):
+    """Run each step in order, recording how long it took and whether it failed"""
+    started = time.perf_counter()
+    with _lock:
+        _state.update(ready=False, seconds=None, steps={})
+
+    for name, step in steps.items():
+        step_started = time.perf_counter()
+        try:
+            step()
+            outcome = {'ok': True}
+        except Exception as e:
+            # A failed step is reported but does not hold the worker back; its
+            # first real use will simply be slow or fail the way it would have anyway
+            outcome = {'ok': False, 'error': str(e)}
+        outcome['seconds'] = round(time.perf_counter() - step_started, 3)
+        print(f"Warm-up {name}: {outcome['seconds']:.3f}s" + ('' if outcome['ok'] else f" ({outcome['error']})"))
+        with _lock:
+            _state['steps'][name] = outcome
+
+    with _lock:
+        _state.update(ready=True, seconds=round(time.perf_counter() - started, 3))
+    print(f"Warm-up finished in {_state['seconds']:.3f}s")
+
+
+def start_warmup(extra_steps: Optional[Dict[str, Callable[[], Any]]] = None) -> threading.Thread:
+    """Start the warm-up in a daemon thread (once per process) and return it"""
+    global _thread
+    with _lock:
+        if _thread is None:
+            steps = dict(WARMUP_STEPS, **(extra_steps or {}))
+            _thread = threading.Thread(target=run_warmup, args=(steps,), name='warmup', daemon=True)
+            _thread.start()
+        return _thread
+
+
+def is_ready() -> bool:
+    with _lock:
+        return _state['ready']
+
+
+def readiness() -> Dict[str, Any]:
+    """Ready flag, total time and per-step timings of the warm-up"""
+    with _lock:
+        return {
+            'ready': _state['ready'],
+            'seconds': _state['seconds'],
+            'steps': {name: dict(outcome) for name, outcome in _state['steps'].items()},
+        }
@@ -56,6 +56,9 @@ document.addEventListener('DOMContentLoaded', () => {
         });
 
         socket.on('transcript', (data) => {
+            // The answer closes the calendar being filled; the next query starts a new one
+            transcript.querySelectorAll('.message.calendar').forEach((el) => el.classList.remove('calendar'));
+
             const messageDiv = document.createElement('div');
             messageDiv.className = `message ${data.type}`;
             messageDiv.innerHTML = `<strong>${data.type === 'user' ? 'You' : 'Assistant'}:</strong> ${data.text}`;
@@ -87,6 +90,20 @@ document.addEventListener('DOMContentLoaded', () => {
             }, 30000);
         });
 
+        // Calendar cells arrive one by one while a flexible-date query is checked
+        socket.on('availability', (cell) => {
+            let calendar = transcript.querySelector('.message.calendar');
+            if (!calendar) {
+                calendar = document.createElement('div');
+                calendar.className = 'message assistant calendar';
+                calendar.innerHTML = '<strong>Availability:</strong>';
+                transcript.appendChild(calendar);
+            }
+            const line = document.createElement('div');
+            line.textContent = `${cell.date} ${cell.class_type}: ${cell.status || 'unknown'}`;
+            calendar.appendChild(line);
+        });
+
         socket.on('error', (error) => {
             console.error('Error:', error);
             resetUI();
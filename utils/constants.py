@@ -67,4 +67,240 @@ LIMITS = {
     'MAX_FUTURE_DAYS': 120,  # Maximum days in advance for train booking
     'MAX_RETRY_ATTEMPTS': 3,  # Maximum API retry attempts
     'TIMEOUT_SECONDS': 30,    # API timeout in seconds
+    'CONNECT_TIMEOUT_SECONDS': 3.05,  # TCP/TLS connect timeout for API calls
+    'HTTP_POOL_SIZE': 20,     # Keep-alive connections kept per host
+    'RETRY_BACKOFF_SECONDS': 0.5,     # Base delay for jittered retry backoff
+    'RETRY_BACKOFF_MAX_SECONDS': 4,   # Upper bound for a single retry delay
+    'BULK_MAX_WORKERS': 4,    # Concurrent lookups for bulk PNR checks
+}
+
+# Client-side RapidAPI quota, shared by every TrainService in the process
+RATE_LIMITS = {
+    'REQUESTS_PER_SECOND': 5,
+    'BURST': 10,                 # Tokens available after an idle period
+    'ASYNC_POLL_SECONDS': 0.05,  # How often queued coroutines re-check the bucket
+}
+
+# Per-endpoint read timeouts in seconds (capped by LIMITS['TIMEOUT_SECONDS'])
+API_READ_TIMEOUTS = {
+    'api/v1/searchStation': 5,
+    'api/v1/searchTrain': 5,
+    'api/v1/getTrainClasses': 8,
+    'api/v1/liveTrainStatus': 10,
+    'api/v3/getPNRStatus': 10,
+    'api/v2/getFare': 10,
+    'api/v1/getTrainSchedule': 15,
+    'api/v1/checkSeatAvailability': 15,
+    'api/v3/trainBetweenStations': 20,
+}
+
+# Response cache lifetimes in seconds; endpoints not listed here are never cached
+API_CACHE_TTL_SECONDS = {
+    'api/v1/searchStation': 7 * 24 * 3600,   # Station names practically never change
+    'api/v1/searchTrain': 24 * 3600,
+    'api/v1/getTrainSchedule': 6 * 3600,
+    'api/v1/getTrainClasses': 6 * 3600,
+    'api/v2/getFare': 6 * 3600,
+    'api/v3/trainBetweenStations': 3600,
+    'api/v3/getPNRStatus': 5 * 60,           # Waitlists move, but not every second
+    'api/v1/checkSeatAvailability': 2 * 60,
+    'api/v1/liveTrainStatus': 30,            # Position updates roughly every half minute
+}
+
+# Local timetable store used to answer trainBetweenStations without the API
+TIMETABLE = {
+    'MAX_AGE_SECONDS': 7 * 24 * 3600,        # Older station-pair data is not served
+    'REFRESH_AFTER_SECONDS': 24 * 3600,      # Served, but refreshed in the background
+}
+
+# Response cache bounds
+API_CACHE_LIMITS = {
+    'MAX_ENTRIES': 5000,
+    'MAX_BYTES': 64 * 1024 * 1024,
+}
+
+# Local intent parser that answers common queries without the LLM
+INTENT_PARSER = {
+    'MIN_CONFIDENCE': 0.8,   # Below this the query is sent to the LLM instead
+    'MAX_WORDS': 25,         # Longer queries are left to the LLM
+}
+
+# City names resolved to a station code the same way the extraction prompt does
+CITY_STATION_CODES = {
+    'DELHI': 'NDLS',
+    'NEW DELHI': 'NDLS',
+    'MUMBAI': 'CSTM',
+    'BOMBAY': 'CSTM',
+    'KOLKATA': 'KOAA',
+    'CALCUTTA': 'KOAA',
+    'CHENNAI': 'MAS',
+    'MADRAS': 'MAS',
+    'BANGALORE': 'SBC',
+    'BENGALURU': 'SBC',
+    'AGRA': 'AGC',
+    'ALLAHABAD': 'PRYJ',
+    'BANARAS': 'BSB',
+    'CALICUT': 'CLT',
+    'COCHIN': 'ERS',
+    'KOCHI': 'ERS',
+    'GOA': 'MAO',
+    'HUBLI': 'UBL',
+    'MANGALORE': 'MAQ',
+    'MYSORE': 'MYS',
+    'TRIVANDRUM': 'TVC',
+}
+
+# OpenAI client connection settings, shared by the sync and async clients
+OPENAI_CLIENT = {
+    'TIMEOUT_SECONDS': 30,            # Whole request, including a streamed answer
+    'CONNECT_TIMEOUT_SECONDS': 3.05,
+    'MAX_RETRIES': 2,
+    'MAX_CONNECTIONS': 20,
+    'MAX_KEEPALIVE_CONNECTIONS': 10,  # Warm connections kept between voice turns
+    'KEEPALIVE_EXPIRY_SECONDS': 60,
+}
+
+# Cache of LLM query extractions, keyed on the normalized query text
+QUERY_CACHE = {
+    'MAX_ENTRIES': 2000,
+    'MAX_BYTES': 2 * 1024 * 1024,
+    'TTL_SECONDS': 6 * 3600,
+}
+
+# Codes for the fixed error strings returned by the train services
+ERROR_CODES = {
+    'Invalid train number format': 'INVALID_TRAIN_NUMBER',
+    'Invalid PNR number format': 'INVALID_PNR',
+    'Invalid station code format': 'INVALID_STATION_CODE',
+    'Invalid date': 'INVALID_DATE',
+    'Could not parse date': 'INVALID_DATE',
+    'Failed to search train': 'LOOKUP_FAILED',
+    'Failed to search station': 'LOOKUP_FAILED',
+    'Failed to get trains between stations': 'LOOKUP_FAILED',
+    'Failed to get live train status': 'LIVE_STATUS_FAILED',
+    'Failed to get train schedule': 'LOOKUP_FAILED',
+    'Failed to check PNR status': 'PNR_STATUS_FAILED',
+    'Failed to check seat availability': 'AVAILABILITY_FAILED',
+    'Failed to get train classes': 'LOOKUP_FAILED',
+    'Failed to get fare details': 'FARE_FAILED',
+}
+
+# Patterns for upstream and transport errors, checked when the exact string is unknown
+ERROR_PATTERNS = [
+    (r'rate limit|too many requests|\b429\b|exceeded the', 'RATE_LIMITED'),
+    (r'timed? ?out|timeout', 'UPSTREAM_TIMEOUT'),
+    (r'connection|unreachable|name resolution|max retries', 'UPSTREAM_UNAVAILABLE'),
+    (r'\b50[0234]\b|server error|service unavailable', 'UPSTREAM_UNAVAILABLE'),
+]
+
+# Spoken error messages per code and language
+ERROR_MESSAGES = {
+    'INVALID_TRAIN_NUMBER': {
+        'en': "That doesn't look like a train number. Train numbers have five digits, like 12951. Could you say it again?",
+        'hi': "यह ट्रेन नंबर सही नहीं लग रहा। ट्रेन नंबर पाँच अंकों का होता है, जैसे 12951। कृपया फिर से बताइए।",
+    },
+    'INVALID_PNR': {
+        'en': "That PNR number doesn't look right. A PNR has ten digits and is printed at the top of your ticket. Could you read it out again?",
+        'hi': "यह PNR नंबर सही नहीं लग रहा। PNR दस अंकों का होता है और आपके टिकट पर सबसे ऊपर लिखा होता है। कृपया फिर से बताइए।",
+    },
+    'INVALID_STATION_CODE': {
+        'en': "I couldn't work out one of the stations. Could you tell me the station name or its code, like NDLS for New Delhi?",
+        'hi': "मैं स्टेशन नहीं पहचान पाया। कृपया स्टेशन का नाम या कोड बताइए, जैसे नई दिल्ली के लिए NDLS।",
+    },
+    'INVALID_DATE': {
+        'en': "I need a future travel date within the next 120 days. Which day are you planning to travel?",
+        'hi': "यात्रा की तारीख आने वाले 120 दिनों के भीतर होनी चाहिए। आप किस दिन यात्रा करना चाहते हैं?",
+    },
+    'LOOKUP_FAILED': {
+        'en': "I couldn't get that train information from Indian Railways just now. Please try again in a moment.",
+        'hi': "अभी भारतीय रेल से यह जानकारी नहीं मिल पाई। कृपया थोड़ी देर बाद फिर से कोशिश करें।",
+    },
+    'LIVE_STATUS_FAILED': {
+        'en': "I couldn't get the live running status right now. Please try again in a minute.",
+        'hi': "अभी ट्रेन की लाइव स्थिति नहीं मिल पाई। कृपया एक मिनट बाद फिर से पूछें।",
+    },
+    'PNR_STATUS_FAILED': {
+        'en': "I couldn't fetch the status for that PNR right now. Please check the number and try again shortly.",
+        'hi': "अभी इस PNR की स्थिति नहीं मिल पाई। कृपया नंबर जाँचकर थोड़ी देर बाद फिर से कोशिश करें।",
+    },
+    'AVAILABILITY_FAILED': {
+        'en': "I couldn't check seat availability just now. Please try again, or try a different date or class.",
+        'hi': "अभी सीटों की उपलब्धता नहीं जाँच पाया। कृपया फिर से कोशिश करें, या कोई दूसरी तारीख या क्लास चुनें।",
+    },
+    'FARE_FAILED': {
+        'en': "I couldn't get the fare for that journey right now. Please try again shortly.",
+        'hi': "अभी इस यात्रा का किराया नहीं मिल पाया। कृपया थोड़ी देर बाद फिर से कोशिश करें।",
+    },
+    'RATE_LIMITED': {
+        'en': "Railway information is very busy right now. Please give me a few seconds and ask again.",
+        'hi': "अभी रेलवे जानकारी पर बहुत ज़्यादा अनुरोध हैं। कृपया कुछ सेकंड बाद फिर से पूछें।",
+    },
+    'UPSTREAM_TIMEOUT': {
+        'en': "Indian Railways is taking too long to respond. Please try again in a moment.",
+        'hi': "भारतीय रेल से जवाब आने में बहुत समय लग रहा है। कृपया थोड़ी देर बाद फिर से कोशिश करें।",
+    },
+    'UPSTREAM_UNAVAILABLE': {
+        'en': "I can't reach the railway information service right now. Please try again in a little while.",
+        'hi': "अभी रेलवे जानकारी सेवा से संपर्क नहीं हो पा रहा। कृपया कुछ देर बाद फिर से कोशिश करें।",
+    },
+    'TURN_TIMEOUT': {
+        'en': "Sorry, that is taking longer than it should. Could you ask me again, perhaps a little more simply?",
+        'hi': "माफ़ कीजिए, इसमें ज़रूरत से ज़्यादा समय लग रहा है। कृपया फिर से पूछिए, हो सके तो थोड़ा सरल तरीके से।",
+    },
+    'ANSWER_TIMEOUT': {
+        'en': "I have the details, but I couldn't put the answer together in time. Please ask me again in a moment.",
+        'hi': "मेरे पास जानकारी है, पर मैं समय पर जवाब तैयार नहीं कर पाया। कृपया थोड़ी देर बाद फिर से पूछिए।",
+    },
+}
+
+# List caps applied when API payloads are trimmed for the LLM
+PROJECTION_LIMITS = {
+    'MAX_TRAINS': 8,
+    'MAX_STOPS': 12,            # Schedule stops, sampled evenly between origin and destination
+    'MAX_UPCOMING_STOPS': 4,
+    'MAX_PREVIOUS_STOPS': 2,
+    'MAX_PASSENGERS': 6,
+    'MAX_DAYS': 6,
+    'MAX_FARES': 8,
+}
+
+# Chat completion instrumentation
+LLM_METRICS = {
+    'LATENCY_BUCKETS_MS': [50, 100, 250, 500, 750, 1000, 1500, 2000, 3000, 5000, 8000, 15000, 30000],
+    'TOKEN_BUCKETS': [16, 32, 64, 128, 256, 512, 1024, 2048, 4096],
+}
+
+# US dollars per 1K tokens, for the cost estimates in the LLM metrics
+LLM_PRICING = {
+    'gpt-4-turbo-preview': {'prompt': 0.01, 'completion': 0.03},
+    'gpt-4-turbo': {'prompt': 0.01, 'completion': 0.03},
+    'gpt-4o': {'prompt': 0.0025, 'completion': 0.01},
+    'gpt-4o-mini': {'prompt': 0.00015, 'completion': 0.0006},
+}
+
+# Latency budget of one voice turn, shared by extraction, the IRCTC call and answer generation
+TURN_BUDGET = {
+    'TOTAL_SECONDS': 6.0,
+    'MIN_STAGE_SECONDS': 0.25,      # Don't start a stage with less time than this left
+    'ANSWER_SHARE': 0.35,           # Share of the budget kept back from extraction and fetch for the answer
+}
+
+# Per-session conversation state
+CONVERSATION = {
+    'MAX_HISTORY': 10,           # Turns kept per session
+    'MAX_FOLLOW_UP_WORDS': 8,    # Longer turns are always treated as new queries
+}
+
+# Memo of parse_date_time results, emptied when the India calendar day changes
+DATE_CACHE = {
+    'MAX_ENTRIES': 1024,
+}
+
+# Flexible-date availability calendar
+CALENDAR = {
+    'DAYS': 7,                                        # Dates checked from the start date
+    'MAX_CLASSES': 3,                                 # Classes checked when the query names none
+    'CLASS_PREFERENCE': ['SL', '3A', '2A', '3E', 'CC', '1A', 'EC', '2S'],
+    'MAX_CONCURRENCY': 4,                             # Availability calls in flight per calendar
+    'DEADLINE_MARGIN_SECONDS': 0.2,                   # Stop this long before the turn budget's fetch deadline
 }
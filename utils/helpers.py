@@ -1,7 +1,8 @@
 """Helper functions used throughout the application"""
 import re
-from typing import Dict, Any, Optional, List
-from .constants import MAJOR_STATIONS, TRAIN_CLASSES
+from typing import Dict, Any, Optional, List, Iterable, Iterator
+from .constants import CITY_STATION_CODES, MAJOR_STATIONS, TRAIN_CLASSES
+from .station_index import get_station_index, normalize_station_name
 
 def extract_station_code(station_input: str) -> str:
     """
@@ -15,7 +16,17 @@ def extract_station_code(station_input: str) -> str:
     # Convert to uppercase for comparison
     station_upper = station_input.upper()
     
-    # Check if the input matches any known station names
+    # City names go to the city's main station ("Delhi" is NDLS, not Delhi Junction)
+    code = CITY_STATION_CODES.get(normalize_station_name(station_input))
+    if code:
+        return code
+
+    # Look the name up in the offline station index (exact code, name prefix, then fuzzy)
+    code = get_station_index().find_code(station_input)
+    if code:
+        return code
+
+    # Then for any known station name contained in the input, or containing it
     for code, name in MAJOR_STATIONS.items():
         if name.upper() in station_upper or station_upper in name.upper():
             return code
@@ -81,6 +92,54 @@ def chunk_message(message: str, chunk_size: int = 1000) -> List[str]:
     """Split long messages into smaller chunks for API limits"""
     return [message[i:i + chunk_size] for i in range(0, len(message), chunk_size)]
 
+# Words whose trailing period does not end a sentence ("Kota Jn. at 21:40")
+SENTENCE_ABBREVIATIONS = {'jn', 'no', 'nos', 'rs', 'mr', 'mrs', 'ms', 'dr', 'st', 'stn', 'approx', 'vs', 'exp', 'spl'}
+SENTENCE_END = re.compile(r'([.!?\u0964]+)["\')\]]*(?:\s+|$)|\n+')
+
+class SentenceSplitter:
+    """
+    Regroup streamed text fragments into whole sentences
+    A sentence is released once the whitespace after its end mark arrives, so
+    "1,785.50" and "Kota Jn. at 21:40" are not cut short
+    """
+
+    def __init__(self):
+        self.buffer = ''
+
+    def feed(self, delta: Optional[str]) -> List[str]:
+        """Add a fragment and return the sentences it completed"""
+        self.buffer += delta or ''
+        sentences = []
+        start = 0
+        for match in SENTENCE_END.finditer(self.buffer):
+            if match.group(1) and match.end() == len(self.buffer) and not self.buffer[-1].isspace():
+                break  # The end mark may still be followed by more text
+            if match.group(1) == '.':
+                words = self.buffer[start:match.start()].split()
+                last_word = words[-1].lower() if words else ''
+                if last_word in SENTENCE_ABBREVIATIONS or (len(last_word) == 1 and last_word.isalpha()):
+                    continue
+            sentence = self.buffer[start:match.end()].strip()
+            if sentence:
+                sentences.append(sentence)
+            start = match.end()
+        self.buffer = self.buffer[start:]
+        return sentences
+
+    def flush(self) -> Optional[str]:
+        """Whatever is left once the stream has ended"""
+        rest, self.buffer = self.buffer.strip(), ''
+        return rest or None
+
+def split_sentences(deltas: Iterable[str]) -> Iterator[str]:
+    """Regroup streamed text fragments into whole sentences (see SentenceSplitter)"""
+    splitter = SentenceSplitter()
+    for delta in deltas:
+        yield from splitter.feed(delta)
+    rest = splitter.flush()
+    if rest:
+        yield rest
+
 def is_valid_station_code(code: str) -> bool:
     """Check if the station code format is valid"""
     return bool(re.match(r'^[A-Z]{3,4}$', code))
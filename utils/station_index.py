@@ -0,0 +1,260 @@
+"""
+Offline station index stored as a compact memory-mapped binary file
+
+Layout (little-endian):
+    header      magic b'RSIX', version u16, reserved u16, station count u32,
+                name entry count u32
+    code table  one record per station, sorted by code:
+                code (8 bytes, NUL padded), name offset u32, name length u16,
+                key offset u32, key length u16
+    name table  one entry per word of every normalized name, sorted by the key text
+                from that word onwards: record index u32, key offset u32, key length u16
+                ("NEW DELHI" is reachable as both "NEW DELHI" and "DELHI")
+    strings     UTF-8 display names and normalized keys
+
+Lookups binary-search the mapped tables directly, so opening the index costs one
+mmap call regardless of how many stations it holds.
+"""
+import argparse
+import csv
+import difflib
+import mmap
+import os
+import re
+import struct
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from .constants import MAJOR_STATIONS
+
+MAGIC = b'RSIX'
+VERSION = 1
+HEADER = struct.Struct('<4sHHII')
+RECORD = struct.Struct('<8sIHIH')
+NAME_ENTRY = struct.Struct('<IIH')
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+DEFAULT_INDEX_PATH = os.path.join(DATA_DIR, 'stations.idx')
+DEFAULT_CSV_PATH = os.path.join(DATA_DIR, 'stations.csv')  # Builder input shipped with the repo
+
+
+def normalize_station_name(name: str) -> str:
+    """Uppercase, drop punctuation and collapse whitespace so names compare consistently"""
+    return ' '.join(re.sub(r'[^A-Z0-9 ]', ' ', name.upper()).split())
+
+
+def build_station_index(stations: Iterable[Tuple[str, str]]) -> bytes:
+    """Serialize (code, name) pairs into the binary index format"""
+    unique: Dict[str, str] = {}
+    for code, name in stations:
+        code = code.strip().upper()
+        if code and len(code) <= 8:
+            unique[code] = name.strip()
+
+    codes = sorted(unique)
+    keys = [normalize_station_name(unique[code]) for code in codes]
+
+    # Every word start of a name is a searchable suffix of its key
+    suffixes = []
+    for i, key in enumerate(keys):
+        for match in re.finditer(r'\S+', key):
+            suffixes.append((key[match.start():], codes[i], i, match.start()))
+    suffixes.sort()
+
+    strings_start = HEADER.size + len(codes) * RECORD.size + len(suffixes) * NAME_ENTRY.size
+    strings = bytearray()
+    records = bytearray()
+    key_offsets = []
+    for code, key in zip(codes, keys):
+        name_bytes = unique[code].encode('utf-8')
+        key_bytes = key.encode('utf-8')
+        name_offset = strings_start + len(strings)
+        strings += name_bytes
+        key_offset = strings_start + len(strings)
+        strings += key_bytes
+        key_offsets.append(key_offset)
+        records += RECORD.pack(code.encode('ascii'), name_offset, len(name_bytes), key_offset, len(key_bytes))
+
+    # Normalized keys are ASCII, so character positions equal byte positions
+    name_entries = b''.join(
+        NAME_ENTRY.pack(i, key_offsets[i] + start, len(suffix))
+        for suffix, _, i, start in suffixes
+    )
+    header = HEADER.pack(MAGIC, VERSION, 0, len(codes), len(suffixes))
+    return header + bytes(records) + name_entries + bytes(strings)
+
+
+def read_station_csv(path: str) -> List[Tuple[str, str]]:
+    """MAJOR_STATIONS plus the (code, name) rows of a CSV with a code,name header"""
+    stations = list(MAJOR_STATIONS.items())
+    with open(path, newline='', encoding='utf-8') as f:
+        stations.extend((row['code'], row['name']) for row in csv.DictReader(f))
+    return stations
+
+
+def write_station_index(stations: Iterable[Tuple[str, str]], path: str = DEFAULT_INDEX_PATH):
+    """Build the index and atomically replace the file at path"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(build_station_index(stations))
+    os.replace(tmp_path, path)
+
+
+class StationIndex:
+    """Read-only view over a serialized station index (mmap or in-memory bytes)"""
+
+    def __init__(self, buffer: Union[bytes, mmap.mmap]):
+        self._buf = buffer
+        magic, version, _, self.count, self.name_count = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a station index file")
+        self._names_start = HEADER.size + self.count * RECORD.size
+
+    @classmethod
+    def open(cls, path: str) -> 'StationIndex':
+        with open(path, 'rb') as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _record(self, i: int) -> Tuple[bytes, int, int, int, int]:
+        return RECORD.unpack_from(self._buf, HEADER.size + i * RECORD.size)
+
+    def _code(self, i: int) -> str:
+        return self._record(i)[0].rstrip(b'\0').decode('ascii')
+
+    def _name(self, i: int) -> str:
+        _, offset, length, _, _ = self._record(i)
+        return bytes(self._buf[offset:offset + length]).decode('utf-8')
+
+    def _key_at(self, position: int) -> Tuple[str, int]:
+        """Key text and record index of a name table entry"""
+        i, offset, length = NAME_ENTRY.unpack_from(self._buf, self._names_start + position * NAME_ENTRY.size)
+        return bytes(self._buf[offset:offset + length]).decode('ascii'), i
+
+    def _entry(self, i: int) -> Dict[str, str]:
+        return {'code': self._code(i), 'name': self._name(i)}
+
+    def get(self, code: str) -> Optional[Dict[str, str]]:
+        """Exact lookup by station code"""
+        target = code.strip().upper().encode('ascii', 'ignore')[:8].ljust(8, b'\0')
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            current = self._record(mid)[0]
+            if current < target:
+                lo = mid + 1
+            elif current > target:
+                hi = mid
+            else:
+                return self._entry(mid)
+        return None
+
+    def _lower_bound(self, key: str) -> int:
+        lo, hi = 0, self.name_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key_at(mid)[0] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def search_prefix(self, text: str, limit: int = 10) -> List[Dict[str, str]]:
+        """Stations with a name word starting with text, whole-name matches first"""
+        prefix = normalize_station_name(text)
+        if not prefix:
+            return []
+
+        full_matches, word_matches = [], []
+        seen = set()
+        position = self._lower_bound(prefix)
+        while position < self.name_count:
+            key, i = self._key_at(position)
+            if not key.startswith(prefix):
+                break
+            if i not in seen:
+                seen.add(i)
+                is_full = self._record(i)[4] == len(key)
+                (full_matches if is_full else word_matches).append(i)
+            position += 1
+        return [self._entry(i) for i in (full_matches + word_matches)[:limit]]
+
+    def search_fuzzy(self, text: str, limit: int = 5, cutoff: float = 0.75) -> List[Dict[str, str]]:
+        """
+        Closest names by similarity ratio
+        Candidates are limited to names sharing the query's first letter, which keeps
+        the scan to a small slice of the name table
+        """
+        query = normalize_station_name(text)
+        if not query:
+            return []
+
+        start = self._lower_bound(query[0])
+        end = self._lower_bound(chr(ord(query[0]) + 1))
+        matcher = difflib.SequenceMatcher(b=query, autojunk=False)
+        scored = []
+        for position in range(start, end):
+            key, i = self._key_at(position)
+            if self._record(i)[4] != len(key):
+                continue  # Only compare whole names
+            matcher.set_seq1(key)
+            if matcher.real_quick_ratio() < cutoff or matcher.quick_ratio() < cutoff:
+                continue
+            score = matcher.ratio()
+            if score >= cutoff:
+                scored.append((score, i))
+
+        scored.sort(key=lambda item: -item[0])
+        return [self._entry(i) for _, i in scored[:limit]]
+
+    def find_code(self, text: str) -> Optional[str]:
+        """Best station code for a code or free-form station name"""
+        entry = self.get(text)
+        if entry:
+            return entry['code']
+
+        query = normalize_station_name(text)
+        matches = self.search_prefix(query, limit=1) or self.search_fuzzy(query, limit=1)
+        return matches[0]['code'] if matches else None
+
+
+_index: Optional[StationIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_station_index() -> StationIndex:
+    """
+    Return the shared station index
+    Maps STATION_INDEX_PATH (default data/stations.idx) when present, otherwise builds an
+    in-memory index from data/stations.csv, or from MAJOR_STATIONS alone without it
+    """
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                path = os.getenv('STATION_INDEX_PATH', DEFAULT_INDEX_PATH)
+                if os.path.exists(path):
+                    _index = StationIndex.open(path)
+                elif os.path.exists(DEFAULT_CSV_PATH):
+                    _index = StationIndex(build_station_index(read_station_csv(DEFAULT_CSV_PATH)))
+                else:
+                    _index = StationIndex(build_station_index(MAJOR_STATIONS.items()))
+    return _index
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the offline station index')
+    parser.add_argument('csv_file', nargs='?', default=DEFAULT_CSV_PATH,
+                        help='CSV with station code and name columns (header: code,name)')
+    parser.add_argument('-o', '--output', default=DEFAULT_INDEX_PATH, help='Index file to write')
+    args = parser.parse_args()
+
+    write_station_index(read_station_csv(args.csv_file), args.output)
+    print(f"Wrote {len(StationIndex.open(args.output))} stations to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,22 +3,46 @@ import signal
 import sys
 import time
 import asyncio
-from typing import Callable, Optional
+from typing import Any, Callable, Dict, Optional
 import threading
 import atexit
 import psutil
 import json
+import queue
 
 from elevenlabs.client import ElevenLabs
 from elevenlabs.conversational_ai.conversation import Conversation
 from elevenlabs.conversational_ai.default_audio_interface import DefaultAudioInterface
 
-from services.train_service import TrainService
-from services.openai_service import extract_query_details, generate_train_response, handle_error_response, format_train_details
-from utils.helpers import sanitize_input, is_valid_train_number, is_valid_pnr, is_valid_station_code
+from services.async_train_service import AsyncTrainService
+from services.conversation_state import ConversationState
+from services.query_router import fetch_train_data
+from services.error_catalog import get_error_message, get_prepared_message
+from services.openai_service import (extract_query_details_async, finish_query_details, stream_train_response_async,
+                                     handle_error_response_async)
+from services.response_templates import render_fallback_response, render_template_response
+from services.turn_budget import BudgetExceeded, TurnBudget
+from utils.constants import TURN_BUDGET
+from utils.helpers import sanitize_input, split_sentences
 
 AGENT_ID = '0Vbhs0IWORdApcEGENIb'
 API_KEY = os.getenv('ELEVEN_LABS_API_KEY')
+VOICE_ID = os.getenv('ELEVEN_LABS_VOICE_ID', '21m00Tcm4TlvDq8ikWCM')
+TTS_MODEL_ID = os.getenv('ELEVEN_LABS_TTS_MODEL', 'eleven_turbo_v2_5')
+LANGUAGE = os.getenv('ASSISTANT_LANGUAGE', 'en')  # Language of prepared messages (en or hi)
+TURN_BUDGET_SECONDS = float(os.getenv('TURN_BUDGET_SECONDS', TURN_BUDGET['TOTAL_SECONDS']))
+
+_elevenlabs_client = None
+_elevenlabs_lock = threading.Lock()
+
+def get_elevenlabs_client() -> ElevenLabs:
+    """Return the ElevenLabs client shared by all sessions, creating it on first use"""
+    global _elevenlabs_client
+    if _elevenlabs_client is None:
+        with _elevenlabs_lock:
+            if _elevenlabs_client is None:
+                _elevenlabs_client = ElevenLabs(api_key=API_KEY)
+    return _elevenlabs_client
 
 def kill_process_tree():
     """Kill all child processes including audio processes"""
@@ -61,15 +85,75 @@ class SafeAudioInterface(DefaultAudioInterface):
 class VoiceAssistant:
     def __init__(self):
         self.conversation = None
-        self.client = ElevenLabs(api_key=API_KEY)
+        self.client = get_elevenlabs_client()
         self.audio_interface = None
         self._shutdown = threading.Event()
-        self.train_service = TrainService()
-        self.conversation_context = {}
+        self.train_service = AsyncTrainService()
+        self.state = ConversationState()
+        self.language = LANGUAGE
         
         # Event emitters for socket.io events
         self._emit_transcript = None
         self._emit_status = None
+        self._emit_availability = None
+
+        # Sentences waiting for text-to-speech, spoken in order by one worker thread
+        self._speech_queue = None
+
+    def set_emitters(self, emit_transcript: Optional[Callable[[str, bool], None]] = None,
+                     emit_status: Optional[Callable[[str, str], None]] = None,
+                     emit_availability: Optional[Callable[[Dict[str, Any]], None]] = None):
+        """Register the socket.io callbacks used to push transcripts, status updates and calendar cells"""
+        self._emit_transcript = emit_transcript
+        self._emit_status = emit_status
+        self._emit_availability = emit_availability
+
+    def _deliver_cell(self, cell: Dict[str, Any]):
+        """Push one availability calendar cell to the client as soon as it is known"""
+        if self._emit_availability:
+            try:
+                self._emit_availability(cell)
+            except Exception as e:
+                print(f"Availability emit error: {str(e)}", file=sys.stderr)
+
+    def _deliver_sentence(self, sentence: str):
+        """Send one finished sentence to the transcript and queue it for speech"""
+        if self._emit_transcript:
+            try:
+                self._emit_transcript(sentence, False)
+            except Exception as e:
+                print(f"Transcript emit error: {str(e)}", file=sys.stderr)
+
+        if self.audio_interface and not self._shutdown.is_set():
+            if self._speech_queue is None:
+                self._speech_queue = queue.Queue()
+                threading.Thread(target=self._speech_worker, args=(self._speech_queue,), daemon=True).start()
+            self._speech_queue.put(sentence)
+
+    def _speech_worker(self, sentences: queue.Queue):
+        """Synthesize queued sentences and play them through the conversation's audio output"""
+        while True:
+            sentence = sentences.get()
+            if sentence is None or self._shutdown.is_set():
+                return
+            try:
+                audio = self.client.text_to_speech.convert(
+                    voice_id=VOICE_ID,
+                    text=sentence,
+                    model_id=TTS_MODEL_ID,
+                    output_format='pcm_16000'
+                )
+                if self.audio_interface:
+                    self.audio_interface.output(b''.join(audio))
+            except Exception as e:
+                print(f"Speech synthesis error: {str(e)}", file=sys.stderr)
+
+    async def _stream_response(self, result, query_type: str, query: str, delivered: list) -> str:
+        """Deliver each sentence of the generated answer as soon as it is complete"""
+        async for sentence in stream_train_response_async(result, query_type, query):
+            delivered.append(sentence)
+            self._deliver_sentence(sentence)
+        return ' '.join(delivered)
 
     def force_cleanup(self):
         """Force cleanup of all resources"""
@@ -77,7 +161,10 @@ class VoiceAssistant:
         try:
             self._shutdown.set()
             
-            # Stop audio interface first
+            # Stop pending speech, then the audio interface
+            if self._speech_queue is not None:
+                self._speech_queue.put(None)
+                self._speech_queue = None
             if self.audio_interface:
                 self.audio_interface.stop()
                 self.audio_interface = None
@@ -94,8 +181,8 @@ class VoiceAssistant:
                     pass
                 self.conversation = None
 
-            # Reset context
-            self.conversation_context = {}
+            # Reset conversation state
+            self.state.clear()
 
             # Kill any remaining processes
             kill_process_tree()
@@ -136,7 +223,25 @@ class VoiceAssistant:
             print("Cleanup completed")
 
     async def process_train_query(self, query: str) -> str:
-        """Process train-related queries"""
+        """
+        Process train-related queries
+        Each sentence of the answer goes to the transcript and TTS as soon as it is
+        ready; the full answer text is returned. The whole turn runs within
+        TURN_BUDGET_SECONDS, falling back to a prepared or templated answer
+        """
+        delivered = []
+        response = await self._answer_train_query(query, delivered, TurnBudget(TURN_BUDGET_SECONDS))
+        if not delivered:
+            for sentence in split_sentences([response]):
+                self._deliver_sentence(sentence)
+        return response
+
+    async def _answer_train_query(self, query: str, delivered: list, budget: TurnBudget) -> str:
+        """
+        Work out the answer to a train query, streaming generated answers into delivered
+        IRCTC and OpenAI calls are both awaited on shared async clients, so the event
+        loop keeps serving other sessions; each is cancelled if it would overrun budget
+        """
         try:
             print("\n=== Processing Train Query ===")
             print(f"Original query: {query}")
@@ -145,66 +250,39 @@ class VoiceAssistant:
             clean_query = sanitize_input(query)
             print(f"Cleaned query: {clean_query}")
             
-            # Extract query details using OpenAI
-            print("Calling OpenAI to extract query details...")
-            query_details = extract_query_details(clean_query)
-            print(f"OpenAI response: {json.dumps(query_details, indent=2)}")
+            # Follow-ups ("what about tomorrow?") only change slots of the previous query
+            follow_up = self.state.follow_up(clean_query)
+            if follow_up:
+                query_details = finish_query_details(follow_up)
+            else:
+                # Extract query details using OpenAI
+                print("Calling OpenAI to extract query details...")
+                try:
+                    query_details = await budget.run('extract', extract_query_details_async(clean_query), reserve_answer=True)
+                except BudgetExceeded:
+                    print("Extraction ran out of time")
+                    return get_prepared_message('TURN_TIMEOUT', self.language)
+            print(f"Query details: {json.dumps(query_details, indent=2)}")
             
             if not query_details or query_details.get('query_type') == 'error':
                 print("Error in query details")
                 return "I'm having trouble understanding your query. Could you please rephrase it?"
             
-            # Update conversation context
-            self.conversation_context.update(query_details)
-            print(f"Updated context: {json.dumps(self.conversation_context, indent=2)}")
+            # Update conversation state
+            self.state.remember(clean_query, query_details, follow_up=follow_up is not None)
+            print(f"Conversation slots: {json.dumps(self.state.slots)}")
             
             # Handle different types of queries
-            result = None
             query_type = query_details.get('query_type')
             print(f"Query type: {query_type}")
-
-            if query_type == 'train_search':
-                print("Processing train search query...")
-                if 'train_number' in query_details:
-                    print(f"Searching for train number: {query_details['train_number']}")
-                    result = self.train_service.search_train(query_details['train_number'])
-                elif all(k in query_details for k in ['from_station', 'to_station']):
-                    print(f"Searching trains between stations: {query_details['from_station']} to {query_details['to_station']}")
-                    result = self.train_service.get_trains_between_stations(
-                        query_details['from_station'],
-                        query_details['to_station'],
-                        query_details.get('travel_date', 'tomorrow')
-                    )
-
-            elif query_type == 'pnr_status' and 'pnr_number' in query_details:
-                print(f"Checking PNR status: {query_details['pnr_number']}")
-                result = self.train_service.check_pnr_status(query_details['pnr_number'])
-
-            elif query_type == 'train_schedule' and 'train_number' in query_details:
-                print(f"Getting train schedule: {query_details['train_number']}")
-                result = self.train_service.get_train_schedule(query_details['train_number'])
-
-            elif query_type == 'live_status' and 'train_number' in query_details:
-                print(f"Getting live status: {query_details['train_number']}")
-                result = self.train_service.get_live_train_status(query_details['train_number'])
-
-            elif query_type == 'seat_availability' and all(k in query_details for k in ['train_number', 'from_station', 'to_station', 'class_type']):
-                print(f"Checking seat availability: Train {query_details['train_number']}, {query_details['from_station']} to {query_details['to_station']}, Class {query_details['class_type']}")
-                result = self.train_service.check_seat_availability(
-                    query_details['train_number'],
-                    query_details['from_station'],
-                    query_details['to_station'],
-                    query_details.get('travel_date', 'tomorrow'),
-                    query_details['class_type']
-                )
-
-            elif query_type == 'fare_check' and all(k in query_details for k in ['train_number', 'from_station', 'to_station']):
-                print(f"Checking fare: Train {query_details['train_number']}, {query_details['from_station']} to {query_details['to_station']}")
-                result = self.train_service.get_fare(
-                    query_details['train_number'],
-                    query_details['from_station'],
-                    query_details['to_station']
-                )
+            try:
+                result = await budget.run('fetch', fetch_train_data(
+                    self.train_service, query_details, on_cell=self._deliver_cell,
+                    time_limit=budget.stage_timeout(reserve_answer=True)
+                ), reserve_answer=True)
+            except BudgetExceeded:
+                print("Train data request ran out of time")
+                return get_prepared_message('UPSTREAM_TIMEOUT', self.language)
 
             print(f"API Result: {json.dumps(result, indent=2) if result else 'No result'}")
 
@@ -242,18 +320,24 @@ Just ask me naturally, for example 'Find trains from Delhi to Mumbai' or 'Check
                     return "I understand your request. In debug mode, I'm showing you what I understood, but normally I would fetch the actual information for you."
 
             if not result.get('success', False):
-                error_msg = result.get('error', 'Unknown error occurred')
+                error_msg = result.get('error') or result.get('message') or 'Unknown error occurred'
                 print(f"Error in result: {error_msg}")
-                return handle_error_response(error_msg)
+                return await self._error_response(error_msg, budget)
+            self.state.remember_result(result)
 
-            # Format the response based on query type
-            print("Formatting train details...")
-            formatted_data = format_train_details(result, query_type)
-            print(f"Formatted data: {formatted_data}")
-            
-            # Generate natural language response
-            print("Generating natural language response...")
-            response = generate_train_response(formatted_data, clean_query)
+            # Answer well-formed payloads from a template, anything else with one LLM call
+            response = render_template_response(query_type, result, query_details)
+            if response is None:
+                print("Streaming natural language response...")
+                try:
+                    response = await budget.run('respond', self._stream_response(result, query_type, clean_query, delivered))
+                except BudgetExceeded:
+                    # Keep whatever was already spoken, otherwise answer from the data in hand
+                    print(f"Answer generation ran out of time after {len(delivered)} sentences")
+                    if delivered:
+                        return ' '.join(delivered)
+                    response = (render_fallback_response(query_type, result, query_details)
+                                or get_prepared_message('ANSWER_TIMEOUT', self.language))
             print(f"Final response: {response}")
             
             return response
@@ -264,7 +348,17 @@ Just ask me naturally, for example 'Find trains from Delhi to Mumbai' or 'Check
             print("Stack trace:", file=sys.stderr)
             import traceback
             traceback.print_exc()
-            return handle_error_response(error_msg)
+            return await self._error_response(error_msg, budget)
+
+    async def _error_response(self, error_msg: str, budget: TurnBudget) -> str:
+        """Spoken form of an error; only errors the catalog lacks spend what is left of the turn budget"""
+        message = get_error_message(error_msg, self.language)
+        if message:
+            return message
+        try:
+            return await budget.run('error', handle_error_response_async(error_msg, self.language))
+        except BudgetExceeded:
+            return get_prepared_message('TURN_TIMEOUT', self.language)
 
     def start_conversation(self) -> Optional[Conversation]:
         """Start a new conversation session"""